@@ -1,22 +1,45 @@
 
+import asyncio
+import time
+from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
-from django.core.exceptions import ObjectDoesNotExist
-from asgiref.sync import sync_to_async
-from .models import StudySession
-import json
+from django.conf import settings
+from .models import SessionUser
+from .realtime import room_rosters, participants_broadcaster, typing_throttle
+from .realtime import MSGPACK_SUBPROTOCOL, group_event, event_frame, encode_frame, pack_frame, decode_message
+from .realtime import event_topic, parse_topics, initial_topics
+from .realtime import room_events, room_snapshot, resume_since
+from .realtime import AUTH_SUBPROTOCOL, OutboundQueue
+from .realtime import room_timers, room_shards
+from .realtime import room_metrics
 
 class RoomConsumer(AsyncWebsocketConsumer):
 
     """
     WebSocket consumer for handling study room interactions.
-    Manages chat, participant updates, and shared materials in real-time.
+    Manages chat, participant updates, shared materials and the room's timer in real-time.
+    Only users authenticated by JWTAuthMiddleware can connect. Each socket subscribes
+    to the topics it renders and is sent their events as JSON, or msgpack if it asked
+    for that subprotocol, through a bounded outbound queue. Sequenced events are
+    replayed to reconnecting clients, and rooms owned by another worker have their
+    events, timer commands and resumes served by that worker (see api/realtime).
     """
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.room_group_name = None
         self.room_code = None
-        self.study_session = None
+        self.binary = False
+        self.topics = set()
+        # Events up to this sequence number were replayed on connect
+        self.replayed_seq = 0
+        # Senders whose typing indicator was relayed from this socket
+        self.typing_senders = set()
+        self.outbound = None
+        self.writer = None
+        # Sequenced events held back while the owning worker replays missed ones
+        self.held_events = None
+        self.resume_deadline = None
         #self.username = None
         #self.list_id = None
 
@@ -25,185 +48,380 @@ class RoomConsumer(AsyncWebsocketConsumer):
         self.room_code = self.scope["url_route"]["kwargs"]["room_code"]
         print(f"Connecting to room: {self.room_code}")
 
-        try:
-            self.study_session = await sync_to_async(StudySession.objects.get)(roomCode=self.room_code)
-        except ObjectDoesNotExist:
+        # The auth middleware sets an anonymous user when the access token is missing or invalid
+        user = self.scope.get("user")
+        if user is not None and not user.is_authenticated:
+            room_metrics.connects.inc(result="rejected")
             await self.close()
             return
 
+        # Only the first socket for a room reads the roster from the database
+        if not room_rosters.attach(self.room_code):
+            if await room_rosters.load(self.room_code, attach=True) is None:
+                room_metrics.connects.inc(result="rejected")
+                await self.close()
+                return
+
         self.room_group_name = f"room_{self.room_code}"
+        self.topics = initial_topics(self.scope)
 
         # Add the user to the room's group
         await self.channel_layer.group_add(self.room_group_name, self.channel_name)
-        await self.accept()
 
-        # Broadcast updated participants list
-        await self.update_participants()
+        subprotocols = self.scope.get("subprotocols", [])
+        if MSGPACK_SUBPROTOCOL in subprotocols:
+            self.binary = True
+            await self.accept(subprotocol=MSGPACK_SUBPROTOCOL)
+        elif AUTH_SUBPROTOCOL in subprotocols:
+            # Browsers drop the connection unless one of the offered subprotocols is accepted
+            await self.accept(subprotocol=AUTH_SUBPROTOCOL)
+        else:
+            await self.accept()
+
+        self.outbound = OutboundQueue()
+        self.writer = asyncio.ensure_future(self.write_outbound())
+        room_metrics.connects.inc(result="accepted")
+        room_metrics.sockets.inc()
+        await self.touch_presence()
+
+        # Joining the socket does not change the roster, so with delta broadcasts
+        # only the new client needs the current list
+        if participants_broadcaster.deltas:
+            if "participants" in self.topics:
+                await self.send_encoded(encode_frame({
+                    "type": "participants_update",
+                    "participants": self.get_participants(),
+                }), key="participants")
+        else:
+            # Broadcast updated participants list
+            await self.update_participants()
+
+        # Late joiners pick up the room's timer where it is
+        if room_shards.owns(self.room_code):
+            timer = room_timers.snapshot(self.room_code)
+            if timer is not None:
+                await self.send_frame(timer, key="timer")
+        else:
+            # The owning worker replies with the timer
+            await room_shards.forward(self.channel_layer, self.room_code, "shard.join", reply_to=self.channel_name)
+
+        since = resume_since(self.scope)
+        if since is not None:
+            await self.resume(since)
 
     async def disconnect(self, close_code):
         """Handles WebSocket disconnection."""
+        if self.writer is not None:
+            self.writer.cancel()
+        if self.resume_deadline is not None:
+            self.resume_deadline.cancel()
+
+        if self.room_group_name is None:
+            return
+        room_metrics.disconnects.inc()
+        room_metrics.sockets.dec()
+
         await self.channel_layer.group_discard(self.room_group_name, self.channel_name)
-        await self.update_participants()
 
-    @sync_to_async
+        # Clear typing indicators straight away instead of waiting for them to expire
+        for sender in list(self.typing_senders):
+            if typing_throttle.stop(self.room_code, sender):
+                await self.typing_stopped_broadcast(sender)
+
+        if not participants_broadcaster.deltas:
+            await self.update_participants()
+        room_rosters.detach(self.room_code)
+
+    def get_sender(self, data):
+        """Return the authenticated user's username, or the sender given by the client."""
+        user = self.scope.get("user")
+        if user is not None and user.is_authenticated:
+            return user.username
+        return data["sender"]
+
+    async def touch_presence(self):
+        """Records that the authenticated user is still connected to the room."""
+        user = self.scope.get("user")
+        if user is not None and user.is_authenticated:
+            await database_sync_to_async(SessionUser.heartbeat)(user, self.room_code)
+
     def get_participants(self):
-        """Fetch the list of participants in the study room."""
-        
-        if not self.study_session:
-            return []
+        """Return the cached list of participants in the study room."""
+        return room_rosters.get(self.room_code) or []
 
-        try:
-            study_session = StudySession.objects.get(roomCode=self.room_code)
-            participants = study_session.participants.all()
-            return [participant.username for participant in participants]
-        except StudySession.DoesNotExist:
-            print(f"StudySession {self.room_code} not found.")
-            return [] 
-
-    async def receive(self, text_data):
-        """Handles incoming WebSocket messages."""
-        data = json.loads(text_data)
+    async def receive(self, text_data=None, bytes_data=None):
+        """Handles incoming WebSocket messages, recording their size and handling time."""
+        started = time.perf_counter()
+        data = decode_message(text_data, bytes_data)
         message_type = data.get("type")
+        size = len(bytes_data) if bytes_data is not None else len(text_data.encode())
+        try:
+            await self.handle_message(message_type, data)
+        finally:
+            room_metrics.received(message_type, size, time.perf_counter() - started)
 
+    async def handle_message(self, message_type, data):
+        """Handles a message received from the client."""
         # Handle chat messages sent by users
         if message_type == "chat_message":
-            await self.channel_layer.group_send(
-                self.room_group_name,
-                {
-                    "type": "chat_message",
-                    "message": data["message"],
-                    "sender": data["sender"],
-                }
+            await room_shards.publish(
+                self.channel_layer, self.room_code, "chat_message",
+                message=data["message"], sender=self.get_sender(data)
             )
         
-        # Handle request to update the list of participants
+        # Handle request to update the list of participants, re-reading it from the database
         elif message_type == "update_participants":
+            await room_rosters.load(self.room_code)
             await self.update_participants()
         
         # Handle study-related updates sent to the group
         elif message_type == "study_update":
-            await self.channel_layer.group_send(
-                self.room_group_name,
-                {
-                    "type": "study_update",
-                    "update": data["update"],
-                }
-            )
+            await room_shards.publish(self.channel_layer, self.room_code, "study_update", update=data["update"])
         
-        # Handle user typing indicator
+        # Handle commands for the room's shared timer: start, pause, resume, reset or stop
+        elif message_type == "timer":
+            timer_settings = {
+                "study_length": data.get("study_length"),
+                "break_length": data.get("break_length"),
+                "rounds": data.get("rounds"),
+            }
+            if room_shards.owns(self.room_code):
+                await room_timers.command(self.channel_layer, self.room_code, data.get("action"), **timer_settings)
+            else:
+                await room_shards.forward(
+                    self.channel_layer, self.room_code, "shard.timer",
+                    action=data.get("action"), settings=timer_settings
+                )
+
+        # Handle user typing indicator, relayed at most once per typing interval per sender
         elif message_type == "typing":
-            await self.channel_layer.group_send(
-                self.room_group_name,
-                {
-                    "type": "typing",
-                    "sender":data["sender"],
-                }
-            )
+            sender = self.get_sender(data)
+            self.typing_senders.add(sender)
+            if typing_throttle.typing(self.room_code, sender, lambda: self.typing_stopped_broadcast(sender)):
+                await room_shards.group_send(
+                    self.channel_layer, self.room_code,
+                    group_event("typing", keep_payload=True, sender=sender)
+                )
+
+        # Handle the heartbeat that keeps the user in the room's participants
+        elif message_type == "heartbeat":
+            await self.touch_presence()
+            await self.send_encoded(encode_frame({"type": "heartbeat"}), key="heartbeat")
+
+        # Handle topic subscription changes for this socket
+        elif message_type == "subscribe":
+            self.topics |= parse_topics(data.get("topics"))
+            await self.send_subscriptions()
+
+        elif message_type == "unsubscribe":
+            self.topics -= parse_topics(data.get("topics"))
+            await self.send_subscriptions()
 
         # Handle file upload notification
         elif message_type == "file_uploaded":
-            await self.channel_layer.group_send(
-                self.room_group_name,
-                {
-                    "type" : "file_uploaded",
-                    "file" : data["file"],
-                }
-            )
+            await room_shards.publish(self.channel_layer, self.room_code, "file_uploaded", file=data["file"])
         
         # Handle file deletion notification
         elif message_type == "file_deleted":
-            await self.channel_layer.group_send(
-                self.room_group_name,
-                {
-                    "type" : "file_deleted",
-                    "fileName" : data["fileName"],
-                }
+            await room_shards.publish(self.channel_layer, self.room_code, "file_deleted", fileName=data["fileName"])
+
+    async def send_frame(self, event, key=None, droppable=False):
+        """
+        Forwards the frame encoded once at group_send time to the client,
+        unless the socket is not subscribed to the event's topic.
+        """
+        started = time.perf_counter()
+        # Skip events that were already replayed when the socket resumed
+        seq = event.get("seq")
+        if seq is not None and seq <= self.replayed_seq:
+            return
+        if seq is not None and self.held_events is not None:
+            if len(self.held_events) >= room_events.size:
+                # More events than a resume could replay, the client resumes when it reconnects
+                await self.close_lagging()
+                return
+            self.held_events.append((event, key, droppable))
+            return
+        topic = event_topic(event["type"])
+        if topic is not None and topic not in self.topics:
+            return
+        frame = event_frame(event)
+        await self.send_encoded(frame, key, droppable)
+        room_metrics.sent(event["type"], len(frame), time.perf_counter() - started)
+
+    async def resume(self, since):
+        """
+        Replays the room events logged after the client's last sequence number,
+        or sends a full room snapshot if they are no longer all in the log.
+        Rooms owned by another worker are resumed by that worker, within
+        ROOM_RESUME_TIMEOUT seconds.
+        """
+        if not room_shards.owns(self.room_code):
+            self.held_events = []
+            self.resume_deadline = asyncio.ensure_future(self.expire_resume())
+            await room_shards.forward(
+                self.channel_layer, self.room_code, "shard.resume", since=since, reply_to=self.channel_name
             )
+            return
 
-    async def participants_update(self, event):
-        await self.send(text_data=json.dumps({
-            "type": "participants_update",
-            "participants": event["participants"],
+        seq, events = room_events.replay(self.room_code, since)
+        if since and events is None:
+            await self.send_encoded(encode_frame(
+                await room_snapshot(self.room_code, seq, self.get_participants())
+            ))
+        else:
+            # A client that has not seen any event yet has nothing to catch up on
+            for event in events or ():
+                await self.send_frame(event)
+        self.replayed_seq = seq
+        await self.send_encoded(encode_frame({
+            "type": "resumed",
+            "seq": seq,
+            "replayed": len(events or ()),
+        }))
+
+    async def room_snapshot(self, event):
+        """Sends the snapshot built by the worker owning the room, with this worker's participants."""
+        await self.send_encoded(encode_frame({**event, "participants": self.get_participants()}))
+
+    async def room_resumed(self, event):
+        """
+        Finishes a resume served by the worker owning the room: sends the
+        events it replayed, then those held meanwhile.
+        """
+        if self.held_events is None:
+            return
+        held, self.held_events = self.held_events, None
+        self.resume_deadline.cancel()
+        for replayed in event["events"]:
+            await self.send_frame(replayed)
+        self.replayed_seq = event["seq"]
+        await self.send_encoded(encode_frame({
+            "type": "resumed",
+            "seq": event["seq"],
+            "replayed": len(event["events"]),
         }))
+        for held_event, key, droppable in held:
+            await self.send_frame(held_event, key, droppable)
+
+    async def expire_resume(self):
+        """Disconnects a client whose resume the worker owning the room did not answer in time."""
+        await asyncio.sleep(getattr(settings, "ROOM_RESUME_TIMEOUT", 5))
+        if self.held_events is not None:
+            await self.close_lagging()
+
+    async def send_subscriptions(self):
+        """Confirms the topics this socket is subscribed to."""
+        await self.send_encoded(encode_frame({
+            "type": "subscriptions",
+            "topics": sorted(self.topics),
+        }))
+
+    async def send_encoded(self, frame, key=None, droppable=False):
+        """
+        Queues an encoded JSON frame to be written to the client. Frames with a
+        key replace the waiting frame with the same key, and droppable frames
+        are discarded first when the client is too slow to keep up.
+        """
+        if self.outbound is None:
+            return
+        if not self.outbound.put(frame, key, droppable):
+            await self.close_lagging()
+
+    async def write_outbound(self):
+        """Writes the queued frames to the client in its wire format."""
+        while True:
+            frame = await self.outbound.get()
+            if self.binary:
+                await self.send(bytes_data=pack_frame(frame))
+            else:
+                await self.send(text_data=frame)
+
+    async def close_lagging(self):
+        """Disconnects a client that has fallen too far behind; it resumes when it reconnects."""
+        room_metrics.lagging_disconnects.inc()
+        self.held_events = None
+        self.outbound = None
+        self.writer.cancel()
+        await self.close(code=4008)
+
+    async def participants_update(self, event):
+        """Sends the participants list to clients and keeps the cached roster in sync."""
+        room_rosters.set(self.room_code, event["participants"])
+        await self.send_frame(event, key="participants")
+
+    async def participants_delta(self, event):
+        """Sends the users who joined or left to clients and applies them to the cached roster."""
+        for username in event["joined"]:
+            room_rosters.add(self.room_code, username)
+        for username in event["left"]:
+            room_rosters.remove(self.room_code, username)
+        if self.outbound is not None and self.outbound.pending("participants"):
+            # Deltas cannot be merged, so the waiting frame is replaced by the whole roster
+            event = {"type": "participants_update", "participants": self.get_participants()}
+        await self.send_frame(event, key="participants")
 
     async def chat_message(self, event):
         """Sends chat messages to clients."""
-        await self.send(text_data=json.dumps({
-            "type": "chat_message",
-            "message": event["message"],
-            "sender": event["sender"],
-        }))
+        await self.send_frame(event)
 
     async def study_update(self, event):
         """Sends study updates to clients."""
-        await self.send(text_data=json.dumps({
-            "type": "study_update",
-            "update": event["update"],
-        }))
+        await self.send_frame(event)
+
+    async def timer_update(self, event):
+        """Sends the room timer's new phase and deadline to clients."""
+        await self.send_frame(event, key="timer")
 
     async def typing(self, event):
         """Notifies clients when a user is typing."""
-        await self.send(text_data=json.dumps({
-            "type": "typing",
-            "sender" : event["sender"],
-        }))
+        await self.send_frame(event, key=("typing", event["sender"]), droppable=True)
+
+    async def typing_stopped(self, event):
+        """Notifies clients when a user has stopped typing."""
+        await self.send_frame(event, key=("typing", event["sender"]), droppable=True)
 
     async def add_task(self, event):
         """Notifies clients about a new task added to the to-do list."""
-        await self.send(text_data=json.dumps({
-            "type": "add_task",
-            "task": event["task"],
-        }))
+        await self.send_frame(event)
 
     async def remove_task(self, event):
         """Notifies clients when a task is removed from the to-do list."""
-        await self.send(text_data=json.dumps({
-            "type": "remove_task",
-            "task_id": event["task_id"],
-        }))
+        await self.send_frame(event)
 
     async def toggle_task(self, event):
         """Notifies clients when a task is marked as completed or incomplete."""
-        await self.send(text_data=json.dumps({
-            "type": "toggle_task",
-            "task_id": event["task_id"],
-            "is_completed": event["is_completed"],
-        }))
+        await self.send_frame(event)
 
     async def delete_list(self, event):
         """Notifies clients when an entire to-do list is deleted."""
-        await self.send(text_data=json.dumps({
-            "type": "delete_list",
-            "list_id": event["list_id"],
-        }))
+        await self.send_frame(event)
         
     async def file_uploaded(self, event):
         """Notifies clients when a file is uploaded to the study room."""
-        await self.send(text_data=json.dumps({
-            "type": "file_uploaded",
-            "file": event["file"],
-        }))
+        await self.send_frame(event)
 
     async def file_deleted(self, event):
         """Notifies clients when a file is deleted from the study room."""
         try:
-            await self.send(text_data=json.dumps({
-                "type": "file_deleted",
-                "fileName": event["fileName"],
-            }))
+            await self.send_frame(event)
         except Exception as e:
             print(f"Error in file_deleted: {e}")
 
     async def update_participants(self):
         """
-        Fetches the updated list of participants and broadcasts it to the room.
-        This is triggered when a user joins or leaves.
+        Broadcasts the cached list of participants to the room.
+        This is triggered when a user joins or leaves, and is coalesced with any
+        other roster change made to the room within the broadcast window.
         """
-        participants = await self.get_participants()
-        await self.channel_layer.group_send(
-            self.room_group_name,
-            {
-                "type": "participants_update",
-                "participants": participants,
-            }
-        )
\ No newline at end of file
+        await participants_broadcaster.announce_roster(
+            self.channel_layer, self.room_code, self.get_participants()
+        )
+
+    async def typing_stopped_broadcast(self, sender):
+        """Broadcasts that a user's typing indicator has expired."""
+        self.typing_senders.discard(sender)
+        await room_shards.group_send(
+            self.channel_layer, self.room_code,
+            group_event("typing_stopped", keep_payload=True, sender=sender)
+        )
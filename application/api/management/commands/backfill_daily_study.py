@@ -0,0 +1,73 @@
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from api.models import DailyStudy, StudyInterval
+
+'''
+Backfill of the daily study rollup from the study ledger.
+
+Recomputes the minutes, sessions and distinct rooms of every user and day
+found in the ledger (optionally only from --since onwards) and writes them
+over the rollup, a batch of rows per statement. Tasks completed are not in
+the ledger, so the rollup's counts of them are left as they are. Safe to run
+again, e.g. after the rollup was added to a database that already had a
+ledger, or to repair it.
+
+    python manage.py backfill_daily_study
+    python manage.py backfill_daily_study --since 2025-01-01
+'''
+
+class Command(BaseCommand):
+
+    help = 'Rebuilds the daily study rollup from the recorded study intervals'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', type=str, default=None, help='First day to rebuild, as YYYY-MM-DD')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rollup rows written per statement')
+
+    def handle(self, *args, **options):
+        intervals = StudyInterval.objects.all()
+        if options['since']:
+            try:
+                since = date.fromisoformat(options['since'])
+            except ValueError:
+                raise CommandError("--since must be a date as YYYY-MM-DD")
+            intervals = intervals.filter(started_at__date__gte=since)
+
+        days = (
+            intervals.annotate(day=TruncDate("started_at"))
+            .values("user_id", "day")
+            .annotate(minutes=Sum("minutes"), sessions=Count("pk"), rooms_joined=Count("room_code", distinct=True))
+            .order_by("user_id", "day")
+        )
+
+        written = 0
+        batch = []
+        for row in days.iterator():
+            batch.append(DailyStudy(
+                user_id=row["user_id"],
+                date=row["day"],
+                minutes=row["minutes"],
+                sessions=row["sessions"],
+                rooms_joined=row["rooms_joined"],
+            ))
+            if len(batch) == options['batch_size']:
+                written += self.write(batch)
+                batch = []
+        written += self.write(batch)
+        self.stdout.write(f"Rebuilt {written} daily study row(s)")
+
+    def write(self, rows):
+        ''' Insert the rows, overwriting the ledger counts of the days already in the rollup '''
+        if not rows:
+            return 0
+        with transaction.atomic():
+            DailyStudy.objects.bulk_create(
+                rows,
+                update_conflicts=True,
+                unique_fields=['user', 'date'],
+                update_fields=['minutes', 'sessions', 'rooms_joined'],
+            )
+        return len(rows)
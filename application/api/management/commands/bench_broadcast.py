@@ -0,0 +1,68 @@
+import json
+import time
+from django.core.management.base import BaseCommand
+from api.realtime import group_event, event_frame
+
+'''
+Microbenchmark for the fan-out of study room group events.
+
+Compares the CPU time of one broadcast when every recipient serialises the event
+itself (the old RoomConsumer handlers) against encoding the frame once at
+group_send time and forwarding it to every recipient.
+
+    python manage.py bench_broadcast --sizes 10,50,200,1000
+'''
+
+class Command(BaseCommand):
+
+    help = 'Measures the CPU cost per broadcast of per-recipient vs encode-once group events'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='10,50,200,1000',
+                            help='Comma separated room sizes to measure')
+        parser.add_argument('--repeat', type=int, default=200,
+                            help='Number of broadcasts measured per room size')
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',')]
+        repeat = options['repeat']
+
+        task = {
+            "id": 42,
+            "title": "Revise chapter 3",
+            "content": "Go through the lecture notes and do the practice questions " * 3,
+            "is_completed": False,
+            "list_id": 7,
+        }
+
+        self.stdout.write(f"{'room size':>10} {'per-recipient (us)':>20} {'encode-once (us)':>18} {'saved':>8}")
+        for size in sizes:
+            per_recipient = self.measure(repeat, lambda: self.per_recipient(size, task))
+            encode_once = self.measure(repeat, lambda: self.encode_once(size, task))
+            saved = 100 * (per_recipient - encode_once) / per_recipient
+            self.stdout.write(f"{size:>10} {per_recipient:>20.1f} {encode_once:>18.1f} {saved:>7.1f}%")
+
+    @staticmethod
+    def measure(repeat, broadcast):
+        ''' Average CPU time of one broadcast, in microseconds '''
+        start = time.process_time()
+        for _ in range(repeat):
+            broadcast()
+        return (time.process_time() - start) / repeat * 1_000_000
+
+    @staticmethod
+    def per_recipient(size, task):
+        ''' Every consumer builds and serialises its own copy of the event '''
+        event = {"type": "add_task", "task": task}
+        for _ in range(size):
+            json.dumps({
+                "type": "add_task",
+                "task": event["task"],
+            })
+
+    @staticmethod
+    def encode_once(size, task):
+        ''' The sender serialises once and every consumer forwards the frame '''
+        event = group_event("add_task", task=task)
+        for _ in range(size):
+            event_frame(event)
@@ -0,0 +1,91 @@
+import random
+import string
+import time
+import uuid
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from api.models import StudySession, User
+from api.room_codes import RoomCodeAllocator
+
+'''
+Benchmark of room code allocation.
+
+Creates N rooms twice, once with the old random code and exists() retry loop
+and once with the keyed permutation allocator, and reports the time and the
+queries spent allocating codes, as well as the retries the old loop needed.
+The rooms are written in batches as they are allocated, so the old loop looks
+its codes up in a table that keeps filling. The rooms and the user created
+for the run are deleted afterwards.
+
+    python manage.py bench_room_codes --rooms 100000
+'''
+
+class Command(BaseCommand):
+
+    help = 'Compares the random retry loop with the keyed permutation allocator over N room creations'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rooms', type=int, default=100000, help='Rooms created per allocator')
+        parser.add_argument('--batch', type=int, default=1000, help='Rooms written per insert')
+
+    def handle(self, *args, **options):
+        run_id = uuid.uuid4().hex[:8]
+        user = User.objects.create_user(
+            email=f"bench_{run_id}@example.com",
+            firstname="Bench",
+            lastname="Mark",
+            username=f"@bench_{run_id}",
+            password="Password123",
+            description="Temporary user for bench_room_codes",
+        )
+        allocator = RoomCodeAllocator()
+        try:
+            self.stdout.write(f"{'allocator':>12} {'rooms':>8} {'us/room':>9} {'queries/room':>13} {'retries':>8}")
+            for name, allocate in (("random", self.random_code), ("permutation", allocator.allocate)):
+                rooms, seconds, queries, retries = self.measure(user, allocate, options)
+                self.stdout.write(
+                    f"{name:>12} {rooms:>8} {seconds / rooms * 1_000_000:>9.1f} "
+                    f"{queries / rooms:>13.3f} {retries:>8}"
+                )
+                StudySession.objects.filter(createdBy=user).delete()
+        finally:
+            StudySession.objects.filter(createdBy=user).delete()
+            user.delete()
+
+    def measure(self, user, allocate, options):
+        ''' Time and queries spent allocating codes for `rooms` rooms, and the codes that were retried '''
+        queries = 0
+        self.retries = 0
+
+        def count(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        seconds = 0.0
+        codes = set()
+        remaining = options['rooms']
+        while remaining > 0:
+            batch = min(options['batch'], remaining)
+            remaining -= batch
+            with connection.execute_wrapper(count):
+                started = time.perf_counter()
+                batch_codes = [allocate() for _ in range(batch)]
+                seconds += time.perf_counter() - started
+            codes.update(batch_codes)
+            with transaction.atomic():
+                StudySession.objects.bulk_create(
+                    StudySession(createdBy=user, sessionName="Benchmark", roomCode=code) for code in batch_codes
+                )
+        if len(codes) != options['rooms']:
+            raise RuntimeError(f"{options['rooms'] - len(codes)} room codes were allocated twice")
+        return options['rooms'], seconds, queries, self.retries
+
+    def random_code(self):
+        ''' The room code allocation of StudySession.save before the allocator '''
+        characters = string.ascii_uppercase + string.digits
+        while True:
+            code = ''.join(random.choice(characters) for _ in range(8))
+            if not StudySession.objects.filter(roomCode=code).exists():
+                return code
+            self.retries += 1
@@ -0,0 +1,83 @@
+import asyncio
+import time
+import uuid
+from asgiref.sync import async_to_sync
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient
+from rest_framework_simplejwt.tokens import AccessToken
+from api import rooms
+from api.models import List, Permission, SessionUser, StudySession, Task, User
+
+'''
+Benchmark of the sync study room endpoints against their async versions.
+
+Sends the same requests through Django's ASGI handler to /api/... (DRF views,
+run in a thread and broadcasting through async_to_sync) and to /api/async/...
+(async views on the event loop), with the given number of requests in flight,
+and reports requests per second. The room, list and user created for the run
+are deleted afterwards.
+
+    python manage.py bench_room_endpoints --requests 500 --concurrency 20
+'''
+
+class Command(BaseCommand):
+
+    help = 'Compares requests per second of the sync and async study room endpoints'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=300, help='Requests sent per endpoint')
+        parser.add_argument('--concurrency', type=int, default=20, help='Requests in flight at once')
+
+    def handle(self, *args, **options):
+        run_id = uuid.uuid4().hex[:8]
+        user = User.objects.create_user(
+            email=f"bench_{run_id}@example.com",
+            firstname="Bench",
+            lastname="Mark",
+            username=f"@bench_{run_id}",
+            password="Password123",
+            description="Temporary user for bench_room_endpoints",
+        )
+        room = rooms.create(user, "Benchmark room").room
+        task = Task.objects.create(title="Benchmark", content="Toggled by the benchmark", list_id=room.Task_id)
+        try:
+            endpoints = [
+                ("get-room-details", "get", f"get-room-details/?roomCode={room.roomCode}", None),
+                ("join-room", "post", "join-room/", {"roomCode": room.roomCode}),
+                ("update_task", "patch", f"update_task/{task.pk}/", None),
+            ]
+            token = str(AccessToken.for_user(user))
+            self.stdout.write(f"{'endpoint':>18} {'sync (req/s)':>14} {'async (req/s)':>14} {'speed-up':>9}")
+            for name, method, path, data in endpoints:
+                sync_rate = async_to_sync(self.measure)(token, method, f"/api/{path}", data, options)
+                async_rate = async_to_sync(self.measure)(token, method, f"/api/async/{path}", data, options)
+                self.stdout.write(
+                    f"{name:>18} {sync_rate:>14.1f} {async_rate:>14.1f} {async_rate / sync_rate:>8.2f}x"
+                )
+        finally:
+            list_id = room.Task_id
+            SessionUser.objects.filter(user=user).delete()
+            StudySession.objects.filter(pk=room.pk).delete()
+            Task.objects.filter(list_id=list_id).delete()
+            Permission.objects.filter(list_id=list_id).delete()
+            List.objects.filter(pk=list_id).delete()
+            user.delete()
+
+    @staticmethod
+    async def measure(token, method, path, data, options):
+        ''' Requests per second served for `path` with `concurrency` requests in flight '''
+        client = AsyncClient()
+        headers = {"Authorization": f"Bearer {token}"}
+        remaining = options['requests']
+
+        async def worker():
+            nonlocal remaining
+            while remaining > 0:
+                remaining -= 1
+                response = await getattr(client, method)(path, data, content_type="application/json", headers=headers)
+                if response.status_code != 200:
+                    raise RuntimeError(f"{path} returned {response.status_code}: {response.content[:200]}")
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(options['concurrency'])))
+        return options['requests'] / (time.perf_counter() - started)
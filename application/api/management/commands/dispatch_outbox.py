@@ -0,0 +1,43 @@
+import time
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.core.management.base import BaseCommand, CommandError
+from api.realtime import notification_outbox
+
+'''
+Sweeper for the notification outbox.
+
+Views record their room notifications as OutboxEvent rows and the process
+that served the request sends them once its transaction commits. Events left
+behind by a process that died before sending them, or that failed to send,
+are sent here once no dispatcher holds them, a batch of
+ROOM_OUTBOX_BATCH_SIZE at a time.
+
+    python manage.py dispatch_outbox               # one pass
+    python manage.py dispatch_outbox --interval 5  # keep sweeping every 5 seconds
+'''
+
+class Command(BaseCommand):
+
+    help = 'Sends the room notifications left in the outbox to the channel layer'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=None,
+                            help='Keep running, sweeping every this many seconds')
+
+    def handle(self, *args, **options):
+        channel_layer = get_channel_layer()
+        while True:
+            try:
+                sent = async_to_sync(notification_outbox.flush)(channel_layer)
+            except Exception as e:
+                # The events that failed are left in the outbox for the next sweep
+                if options['interval'] is None:
+                    raise CommandError(f"Error sending outbox events: {e}")
+                self.stderr.write(f"Error sending outbox events: {e}")
+                sent = 0
+            if sent:
+                self.stdout.write(f"Sent {sent} outbox event(s)")
+            if options['interval'] is None:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,197 @@
+import asyncio
+import json
+import random
+import time
+import tracemalloc
+import uuid
+from asgiref.sync import async_to_sync
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from api.models import List, Permission, StudySession, Task, User
+from api.routing import websocket_urlpatterns
+
+'''
+Load test for the study room websockets.
+
+Opens R rooms with M clients each through the real routing in api/routing.py
+and has every client send chat, typing, study_update and file events at the
+given rates (events per second per client). Every event carries the time it
+was sent, so each client can measure the fan-out latency of the events it
+receives. The rooms, their shared to-do lists and the user created for the
+run are deleted afterwards.
+
+    python manage.py loadtest_rooms --rooms 5 --clients 30 --duration 20
+'''
+
+class Command(BaseCommand):
+
+    help = 'Simulates rooms of websocket clients and reports fan-out latency, throughput and memory per connection'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rooms', type=int, default=5, help='Number of rooms (R)')
+        parser.add_argument('--clients', type=int, default=20, help='Clients per room (M)')
+        parser.add_argument('--duration', type=float, default=10, help='Seconds to send events for')
+        parser.add_argument('--chat-rate', type=float, default=0.2, help='Chat messages per second per client')
+        parser.add_argument('--typing-rate', type=float, default=2, help='Typing events per second per client')
+        parser.add_argument('--study-rate', type=float, default=0.05, help='Study updates per second per client')
+        parser.add_argument('--file-rate', type=float, default=0.02, help='File events per second per client')
+        parser.add_argument('--seed', type=int, default=None, help='Seed for the random send intervals')
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        run_id = uuid.uuid4().hex[:8]
+        user = User.objects.create_user(
+            email=f"loadtest_{run_id}@example.com",
+            firstname="Load",
+            lastname="Test",
+            username=f"@loadtest_{run_id}",
+            password="Password123",
+            description="Temporary user for loadtest_rooms",
+        )
+        try:
+            room_codes = [
+                StudySession.objects.create(createdBy=user, sessionName=f"Load test {index}").roomCode
+                for index in range(options['rooms'])
+            ]
+            results = async_to_sync(LoadTest(room_codes, options).run)()
+        finally:
+            self.clean_up(user)
+
+        self.report(results, options)
+
+    def clean_up(self, user):
+        ''' Delete the run's rooms with their shared to-do lists, tasks and permissions, then its user '''
+        with transaction.atomic():
+            rooms = StudySession.objects.filter(createdBy=user)
+            list_ids = [list_id for list_id in rooms.values_list("Task_id", flat=True) if list_id is not None]
+            rooms.delete()
+            Task.objects.filter(list_id__in=list_ids).delete()
+            Permission.objects.filter(list_id__in=list_ids).delete()
+            List.objects.filter(pk__in=list_ids).delete()
+            user.delete()
+
+    def report(self, results, options):
+        latencies = sorted(results['latencies'])
+        connections = options['rooms'] * options['clients']
+
+        self.stdout.write(f"Rooms x clients:       {options['rooms']} x {options['clients']} ({connections} connections)")
+        self.stdout.write(f"Events sent:           {results['sent']} ({results['sent'] / results['elapsed']:.1f}/s)")
+        self.stdout.write(f"Frames delivered:      {results['received']} ({results['received'] / results['elapsed']:.1f}/s)")
+        if latencies:
+            self.stdout.write(f"Fan-out latency p50:   {percentile(latencies, 50) * 1000:.2f} ms")
+            self.stdout.write(f"Fan-out latency p99:   {percentile(latencies, 99) * 1000:.2f} ms")
+            self.stdout.write(f"Fan-out latency max:   {latencies[-1] * 1000:.2f} ms")
+        self.stdout.write(f"Memory per connection: {results['memory'] / connections / 1024:.1f} KiB")
+
+
+def percentile(ordered, percent):
+    ''' Nearest-rank percentile of an already sorted list '''
+    index = max(0, min(len(ordered) - 1, round(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class LoadTest:
+    '''
+    Drives the simulated clients. Each client has a reader task collecting the
+    frames it receives and one sender task per event type.
+    '''
+
+    def __init__(self, room_codes, options):
+        self.application = URLRouter(websocket_urlpatterns)
+        self.room_codes = room_codes
+        self.clients_per_room = options['clients']
+        self.duration = options['duration']
+        self.rates = {
+            "chat_message": options['chat_rate'],
+            "typing": options['typing_rate'],
+            "study_update": options['study_rate'],
+            "file_uploaded": options['file_rate'],
+        }
+        self.latencies = []
+        self.sent = 0
+        self.received = 0
+
+    async def run(self):
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+
+        communicators = []
+        for room_code in self.room_codes:
+            for index in range(self.clients_per_room):
+                communicator = WebsocketCommunicator(self.application, f"ws/room/{room_code}/")
+                connected, _ = await communicator.connect()
+                if not connected:
+                    raise RuntimeError(f"Could not connect to room {room_code}")
+                communicators.append((f"@client{index}", communicator))
+
+        memory = tracemalloc.get_traced_memory()[0] - baseline
+        tracemalloc.stop()
+
+        start = time.perf_counter()
+        stop_at = start + self.duration
+        readers = [asyncio.create_task(self.read(communicator)) for _, communicator in communicators]
+        senders = [
+            asyncio.create_task(self.send(sender, communicator, message_type, rate, stop_at))
+            for sender, communicator in communicators
+            for message_type, rate in self.rates.items() if rate > 0
+        ]
+        await asyncio.gather(*senders)
+
+        # Give the last events time to fan out before closing the sockets
+        await asyncio.sleep(0.5)
+        elapsed = time.perf_counter() - start
+        for reader in readers:
+            reader.cancel()
+        await asyncio.gather(*readers, return_exceptions=True)
+        for _, communicator in communicators:
+            await communicator.disconnect()
+
+        return {
+            "latencies": self.latencies,
+            "sent": self.sent,
+            "received": self.received,
+            "elapsed": elapsed,
+            "memory": memory,
+        }
+
+    async def send(self, sender, communicator, message_type, rate, stop_at):
+        while True:
+            # Poisson arrivals at the given rate, stopping at the end of the run
+            delay = random.expovariate(rate)
+            if time.perf_counter() + delay >= stop_at:
+                return
+            await asyncio.sleep(delay)
+            sent_at = time.perf_counter()
+            if message_type == "chat_message":
+                message = {"type": message_type, "message": json.dumps({"sent_at": sent_at}), "sender": sender}
+            elif message_type == "typing":
+                message = {"type": message_type, "sender": sender}
+            elif message_type == "study_update":
+                message = {"type": message_type, "update": {"sent_at": sent_at}}
+            else:
+                message = {"type": message_type, "file": {"name": "notes.pdf", "sent_at": sent_at}}
+            await communicator.send_to(text_data=json.dumps(message))
+            self.sent += 1
+
+    async def read(self, communicator):
+        # Read the communicator's output queue directly: cancelling receive_from()
+        # would also cancel the consumer it is talking to
+        while True:
+            message = await communicator.output_queue.get()
+            received_at = time.perf_counter()
+            if message["type"] != "websocket.send":
+                return
+            frame = json.loads(message["text"])
+            self.received += 1
+
+            sent_at = None
+            if frame["type"] == "chat_message":
+                sent_at = json.loads(frame["message"]).get("sent_at")
+            elif frame["type"] == "study_update":
+                sent_at = frame["update"].get("sent_at")
+            elif frame["type"] == "file_uploaded":
+                sent_at = frame["file"].get("sent_at")
+            if sent_at is not None:
+                self.latencies.append(received_at - sent_at)
@@ -0,0 +1,74 @@
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils.timezone import now
+from api import rooms
+from api.models import SessionUser, StudySession
+from api.realtime import notification_outbox
+from api.views.groupStudyRoom import notify_participants, forget_room
+
+'''
+Background reaper for ghost participants of study rooms.
+
+Room sockets send a heartbeat every 20 seconds. Sessions
+whose user has not been seen for ROOM_PRESENCE_TTL seconds (closed tabs,
+crashed browsers) are closed out in batches, their users are removed from the
+room's participants and the room is told who left. Rooms left with nobody in
+them are marked empty, for reap_rooms to delete.
+
+    python manage.py reap_participants              # one pass
+    python manage.py reap_participants --interval 30  # keep reaping every 30 seconds
+'''
+
+class Command(BaseCommand):
+
+    help = 'Closes out study room sessions whose users stopped sending heartbeats'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ttl', type=float, default=None,
+                            help='Seconds without a heartbeat before a user is reaped (default ROOM_PRESENCE_TTL)')
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='Sessions closed per transaction (default ROOM_REAPER_BATCH_SIZE)')
+        parser.add_argument('--interval', type=float, default=None,
+                            help='Keep running, reaping every this many seconds')
+
+    def handle(self, *args, **options):
+        ttl = options['ttl'] or getattr(settings, "ROOM_PRESENCE_TTL", 60)
+        batch_size = options['batch_size'] or getattr(settings, "ROOM_REAPER_BATCH_SIZE", 200)
+
+        while True:
+            reaped = self.reap(ttl, batch_size)
+            if reaped:
+                self.stdout.write(f"Reaped {reaped} ghost participant(s)")
+            if options['interval'] is None:
+                return
+            time.sleep(options['interval'])
+
+    def reap(self, ttl, batch_size):
+        '''
+        Close out every stale session, one batch at a time, and return how many there were.
+        '''
+        cutoff = now() - timedelta(seconds=ttl)
+        reaped = 0
+        while True:
+            left = SessionUser.close_stale(cutoff, batch_size)
+            if not left:
+                return reaped
+            for room_code, usernames in left.items():
+                reaped += len(usernames)
+                self.announce(room_code, usernames)
+
+    def announce(self, room_code, usernames):
+        '''
+        Tell a room who was reaped from it, marking the room empty if nobody is left.
+        '''
+        study_session = StudySession.objects.filter(roomCode=room_code).first()
+        if study_session is None:
+            return
+        participants = list(study_session.participants.values_list("username", flat=True))
+        notify_participants(room_code, participants, left=usernames)
+        if not participants:
+            rooms.mark_empty([study_session])
+            notification_outbox.forget(room_code)
+            forget_room(room_code)
@@ -0,0 +1,57 @@
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils.timezone import now
+from api import rooms
+from api.realtime import room_snapshots
+
+'''
+Background reaper for empty study rooms.
+
+Leaving a room no longer tears it down when the last participant leaves. The
+room is marked empty instead, and rooms still empty ROOM_EMPTY_GRACE seconds
+later are deleted here in batches, along with their shared to-do lists,
+tasks, permissions and sessions, a few bulk statements per batch.
+
+    python manage.py reap_rooms               # one pass
+    python manage.py reap_rooms --interval 60  # keep reaping every 60 seconds
+'''
+
+class Command(BaseCommand):
+
+    help = 'Deletes study rooms that have been empty for longer than the grace period'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace', type=float, default=None,
+                            help='Seconds a room must have been empty before it is deleted (default ROOM_EMPTY_GRACE)')
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='Rooms deleted per transaction (default ROOM_REAPER_BATCH_SIZE)')
+        parser.add_argument('--interval', type=float, default=None,
+                            help='Keep running, reaping every this many seconds')
+
+    def handle(self, *args, **options):
+        grace = options['grace'] if options['grace'] is not None else getattr(settings, "ROOM_EMPTY_GRACE", 300)
+        batch_size = options['batch_size'] or getattr(settings, "ROOM_REAPER_BATCH_SIZE", 200)
+
+        while True:
+            reaped = self.reap(grace, batch_size)
+            if reaped:
+                self.stdout.write(f"Reaped {reaped} empty room(s)")
+            if options['interval'] is None:
+                return
+            time.sleep(options['interval'])
+
+    def reap(self, grace, batch_size):
+        '''
+        Delete every room empty for longer than the grace period, one batch at a time, and return how many there were.
+        '''
+        cutoff = now() - timedelta(seconds=grace)
+        reaped = 0
+        while True:
+            room_codes = rooms.reap_empty(cutoff, batch_size)
+            if not room_codes:
+                return reaped
+            for room_code in room_codes:
+                room_snapshots.discard(room_code)
+            reaped += len(room_codes)
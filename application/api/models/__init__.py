@@ -3,12 +3,16 @@ from .motivational_message import MotivationalMessage
 from .choices import Status
 from .friend_request import Friends
 from .rewards import Rewards
+from .room_code_sequence import RoomCodeSequence
+from .outbox_event import OutboxEvent
 from .study_session import StudySession
 from .todo_list import Task
 from .user import User
 from .user import UserManager
 from .motivational_message import *
 from .session_user import SessionUser
+from .daily_study import DailyStudy
+from .study_interval import StudyInterval
 from .spotify_token import SpotifyToken
 from .events import *
 from .events import Appointments
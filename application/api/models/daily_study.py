@@ -0,0 +1,73 @@
+from collections import defaultdict
+from django.db import models
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils.timezone import localdate
+from .user import User
+
+'''
+A user's study on one day, kept up to date as their sessions close and
+their tasks are completed, so analytics can read a week or a month of
+history from a few rows instead of aggregating the study ledger.
+A session counts towards the day it started.
+'''
+class DailyStudy(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_study')
+    date = models.DateField()
+    minutes = models.PositiveIntegerField(default=0)
+    sessions = models.PositiveIntegerField(default=0)
+    ''' Distinct rooms studied in '''
+    rooms_joined = models.PositiveIntegerField(default=0)
+    tasks_completed = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['date']
+        ''' Also the index serving the per-user date range reads '''
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'date'], name='unique_daily_study'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.date} ({self.minutes} min)"
+
+    @classmethod
+    def add(cls, user, date, **counts):
+        """
+        Add to (or, with negative counts, take from) the user's counts for the
+        day, in place. Counts never go below zero.
+        """
+        cls.objects.bulk_create([cls(user=user, date=date)], ignore_conflicts=True)
+        cls.objects.filter(user=user, date=date).update(**{
+            field: Greatest(F(field) + count, 0) for field, count in counts.items()
+        })
+
+    @classmethod
+    def add_intervals(cls, intervals, new_rooms):
+        """
+        Add freshly recorded study intervals to their users' days. `new_rooms`
+        holds the (user id, date, room code) triples of rooms the users had not
+        studied in on those days before.
+        """
+        days = defaultdict(lambda: {"minutes": 0, "sessions": 0, "rooms_joined": 0})
+        for interval in intervals:
+            counts = days[interval.user_id, localdate(interval.started_at)]
+            counts["minutes"] += interval.minutes
+            counts["sessions"] += 1
+        for user_id, date, _ in new_rooms:
+            days[user_id, date]["rooms_joined"] += 1
+        if not days:
+            return
+        cls.objects.bulk_create([cls(user_id=user_id, date=date) for user_id, date in days], ignore_conflicts=True)
+        for (user_id, date), counts in days.items():
+            cls.objects.filter(user_id=user_id, date=date).update(**{
+                field: F(field) + count for field, count in counts.items()
+            })
+
+    @classmethod
+    def window(cls, user, start, end):
+        """The user's days from start to end inclusive, in order, as dicts of their counts."""
+        return list(
+            cls.objects.filter(user=user, date__range=(start, end))
+            .order_by("date")
+            .values("date", "minutes", "sessions", "rooms_joined", "tasks_completed")
+        )
@@ -14,5 +14,11 @@ class Appointments(models.Model):
     ''' Description of the event '''
     comments = models.CharField(max_length= 500, blank=True, null=True)   
 
+    class Meta:
+        ''' A user's events in date order, or within a range of dates '''
+        indexes = [
+            models.Index(fields=['user', 'start_date'], name='appointment_user_start_idx'),
+        ]
+
     def __str__(self):
         return self.name
\ No newline at end of file
@@ -31,6 +31,11 @@ class Friends(models.Model):
             models.UniqueConstraint(
                 fields=['user1', 'user2'], name='unique_friendship')
         ]
+        ''' A user's friendships with a given status, from either side of the friendship '''
+        indexes = [
+            models.Index(fields=['user1', 'status'], name='friends_user1_status_idx'),
+            models.Index(fields=['user2', 'status'], name='friends_user2_status_idx'),
+        ]
 
     def save(self, *args, **kwargs):
         '''
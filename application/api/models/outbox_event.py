@@ -0,0 +1,17 @@
+from django.db import models
+from django.utils.timezone import now
+
+'''
+An event for a study room, recorded in the same transaction as the change it
+announces and sent to the room by the notification outbox once that
+transaction has committed (see api/realtime/outbox.py). Rows are deleted
+once the event was sent.
+'''
+class OutboxEvent(models.Model):
+    room_code = models.CharField(max_length=8)
+    ''' The group event type, e.g. add_task, or participants_change for roster changes '''
+    message_type = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict)
+    created_at = models.DateTimeField(default=now)
+    ''' Until when a dispatcher sending the event holds it, null while it waits to be sent '''
+    claimed_until = models.DateTimeField(null=True, blank=True)
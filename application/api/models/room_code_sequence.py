@@ -0,0 +1,18 @@
+from django.db import models
+import secrets
+
+'''
+The counter room codes are allocated from, see api/room_codes.py.
+There is a single row, holding the next unreserved number and the secret key
+numbers are permuted with, so every process hands out codes from the same
+permutation without ever looking a code up.
+'''
+
+def new_key():
+    return secrets.token_hex(16)
+
+class RoomCodeSequence(models.Model):
+    ''' First number of the next block of room codes to be reserved '''
+    next_value = models.BigIntegerField(default=0)
+    ''' Key of the permutation, generated when the first code is allocated and never changed '''
+    key = models.CharField(max_length=32, default=new_key)
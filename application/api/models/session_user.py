@@ -1,8 +1,11 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Q
 from django.utils.timezone import now
+from collections import defaultdict
 import datetime
 from .user import User
 from .study_session import StudySession
+from .study_interval import StudyInterval
 from django.db import connection
 
 """
@@ -18,34 +21,83 @@ class SessionUser(models.Model):
     ''' Tracking when the user joined and left the session '''
     joined_at = models.DateTimeField(default=now)
     left_at = models.DateTimeField(null=True, blank=True)
+    ''' Last heartbeat from the user's room socket, sessions not seen for a while are reaped '''
+    last_seen = models.DateTimeField(default=now)
 
     class Meta:
         ''' Sort by newest sessions '''
         ordering = ['session']
+        ''' Finding a user's open session, most recently joined first '''
+        indexes = [
+            models.Index(fields=['user', 'left_at', 'joined_at'], name='sessionuser_user_open_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.session.sessionName}"
 
     def leave_session(self):
         """
-        Calculate total session time, update user's study statistics, and remove session entry.
+        Record the session time in the study ledger, update user's study statistics, and remove session entry.
         """
         # Calculate total session time
         if self.left_at is None:
             self.left_at = now()
 
-        session_duration = self.left_at - self.joined_at
-        hours_studied = session_duration.total_seconds() / 3600  # Convert to hours
-
-        # Update user's total study statistics
-        if hours_studied > 0:
-            self.user.hours_studied += int(hours_studied)
-            self.user.total_sessions += 1  # Increment total sessions
-            self.user.save()
+        # Update user's total study statistics, as increments of just those columns
+        intervals = StudyInterval.record([self], self.left_at)
+        if intervals:
+            User.objects.filter(pk=self.user_id).update(**StudyInterval.credit(self.user, intervals))
 
         # Delete the session user entry
         self.delete()
 
+    @classmethod
+    def heartbeat(cls, user, room_code):
+        """
+        Record that the user is still connected to the room.
+        Returns whether the user has an open session in the room.
+        """
+        return cls.objects.filter(
+            user=user, session__roomCode=room_code, left_at__isnull=True
+        ).update(last_seen=now()) > 0
+
+    @classmethod
+    def close_stale(cls, cutoff, batch_size):
+        """
+        Close out a batch of open sessions whose last heartbeat is older than cutoff,
+        counting them as ending when the user was last seen, and remove their users
+        from the rooms' participants.
+        Returns the usernames that were removed, by room code.
+        """
+        left = defaultdict(list)
+        with transaction.atomic():
+            stale = list(
+                cls.objects.filter(left_at__isnull=True, last_seen__lt=cutoff)
+                .select_related("user", "session")
+                .order_by("pk")[:batch_size]
+            )
+            if not stale:
+                return {}
+
+            removed = Q()
+            users = {}
+            for session_user in stale:
+                session_user.left_at = session_user.last_seen
+                left[session_user.session.roomCode].append(session_user.user.username)
+                removed |= Q(studysession_id=session_user.session_id, user_id=session_user.user_id)
+                users[session_user.user_id] = session_user.user
+
+            # Record the whole batch in the ledger at once, then credit each user in one UPDATE
+            user_intervals = defaultdict(list)
+            for interval in StudyInterval.record(stale, cutoff):
+                user_intervals[interval.user_id].append(interval)
+            for user_id, intervals in user_intervals.items():
+                User.objects.filter(pk=user_id).update(**StudyInterval.credit(users[user_id], intervals))
+
+            cls.objects.filter(pk__in=[session_user.pk for session_user in stale]).delete()
+            StudySession.participants.through.objects.filter(removed).delete()
+        return dict(left)
+
     @classmethod
     def rejoin_session(cls, user, session):
         """
@@ -54,7 +106,7 @@ class SessionUser(models.Model):
         Increments the join_sequence field based on previous joins.
         """
         # Close any existing active sessions
-        for existing_session in cls.objects.filter(user=user, left_at__isnull=True):
+        for existing_session in cls.objects.filter(user=user, left_at__isnull=True).select_related("user", "session"):
             existing_session.leave_session()
         
         # Get next sequence number by counting ALL previous joins (including left sessions)
@@ -0,0 +1,111 @@
+from datetime import datetime, time, timedelta
+from django.db import models
+from django.db.models import Count, F, Q
+from django.utils.timezone import get_current_timezone, localdate
+from .daily_study import DailyStudy
+from .user import User
+
+'''
+A closed stretch of study in a room, written when the user's SessionUser is
+closed by leaving, switching rooms or being reaped. The users' study totals
+are the sums of their intervals, kept up to date by crediting each interval
+to its user with atomic increments as it is written.
+'''
+class StudyInterval(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='study_intervals')
+    ''' Code of the room studied in, kept after the room itself is deleted '''
+    room_code = models.CharField(max_length=8)
+    started_at = models.DateTimeField()
+    ended_at = models.DateTimeField()
+    ''' Whole minutes studied, from the exact length of the interval '''
+    minutes = models.PositiveIntegerField()
+
+    class Meta:
+        ordering = ['ended_at']
+        ''' A user's intervals from a given time, e.g. those of recent days '''
+        indexes = [
+            models.Index(fields=['user', 'started_at'], name='studyinterval_user_start_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.room_code} ({self.minutes} min)"
+
+    @classmethod
+    def record(cls, sessions, ended_at):
+        """
+        Save an interval for each of the sessions that lasted any time, ending
+        when the user left it, or at ended_at if it is still open, and add them
+        to the users' daily rollups. The sessions may be of several users, and
+        their rooms should be loaded. Returns the saved intervals.
+        """
+        intervals = []
+        for session_user in sessions:
+            left_at = session_user.left_at or ended_at
+            seconds = (left_at - session_user.joined_at).total_seconds()
+            if seconds > 0:
+                intervals.append(cls(
+                    user_id=session_user.user_id,
+                    room_code=session_user.session.roomCode,
+                    started_at=session_user.joined_at,
+                    ended_at=left_at,
+                    minutes=int(seconds // 60),
+                ))
+        if intervals:
+            # The rooms already studied in on those days, read as a range of the users' intervals
+            studied = {
+                (interval.user_id, localdate(interval.started_at), interval.room_code) for interval in intervals
+            }
+            first_day = _day_start(min(date for _, date, _ in studied))
+            seen = {
+                (user_id, localdate(started_at), room_code)
+                for user_id, started_at, room_code in cls.objects.filter(
+                    user__in={user_id for user_id, _, _ in studied},
+                    started_at__gte=first_day,
+                    room_code__in={room_code for _, _, room_code in studied},
+                ).order_by().values_list("user_id", "started_at", "room_code")
+            }
+            cls.objects.bulk_create(intervals)
+            DailyStudy.add_intervals(intervals, studied - seen)
+        return intervals
+
+    @classmethod
+    def rooms_studied(cls, user, **windows):
+        """
+        Count the distinct rooms the user started studying in over each window,
+        given as name=(first day, last day), in one query. Returns the counts
+        keyed by window name.
+        """
+        bounds = {
+            name: (_day_start(start), _day_start(end + timedelta(days=1))) for name, (start, end) in windows.items()
+        }
+        return cls.objects.filter(
+            user=user,
+            started_at__gte=min(lower for lower, _ in bounds.values()),
+            started_at__lt=max(upper for _, upper in bounds.values()),
+        ).aggregate(**{
+            name: Count("room_code", distinct=True, filter=Q(started_at__gte=lower, started_at__lt=upper))
+            for name, (lower, upper) in bounds.items()
+        })
+
+    @staticmethod
+    def credit(user, intervals):
+        """
+        Add the intervals to the user instance's totals, and return the same
+        increments as F() expressions, to be saved with User.objects.update.
+        Concurrent updates of the user each add their own increments, so no
+        lock or read of the user row is needed.
+        """
+        minutes = sum(interval.minutes for interval in intervals)
+        user.hours_studied += (user.minutes_studied % 60 + minutes) // 60
+        user.minutes_studied += minutes
+        user.total_sessions += len(intervals)
+        return {
+            "minutes_studied": F("minutes_studied") + minutes,
+            # Whole hours carried over by the minutes, computed from the row's minutes before this update
+            "hours_studied": F("hours_studied") + (F("minutes_studied") % 60 + minutes) / 60,
+            "total_sessions": F("total_sessions") + len(intervals),
+        }
+
+
+def _day_start(date):
+    return datetime.combine(date, time.min, tzinfo=get_current_timezone())
@@ -3,8 +3,7 @@ import datetime
 from .user import User
 from .todo_list_user import List
 from django.utils.timezone import now
-import string
-import random
+from ..room_codes import room_codes
 
 ''' 
 This is the model for the study sessions/ rooms that users can join to study together
@@ -18,6 +17,8 @@ class StudySession(models.Model):
     startTime = models.DateTimeField(default=now)
     endTime = models.DateTimeField(null=True, blank=True)
     date = models.DateField(default=datetime.date.today)
+    ''' When the last participant left, rooms empty for longer than ROOM_EMPTY_GRACE are deleted by reap_rooms '''
+    emptied_at = models.DateTimeField(null=True, blank=True)
     ''' The ToDo list associated with this session '''
     Task = models.ForeignKey(List, on_delete=models.CASCADE, null=True, blank=True)
     ''' Storing the users currently in the session '''
@@ -26,22 +27,19 @@ class StudySession(models.Model):
 
     def generate_room_code(self):
         """
-        To generate a random 8-digit room code with uppercase letters and numbers 
+        To generate an unused 8-digit room code with uppercase letters and numbers,
+        without querying the rooms (see api/room_codes.py)
         """
-        characters = string.ascii_uppercase + string.digits
-        return ''.join(random.choice(characters) for _ in range(8))
+        return room_codes.allocate()
 
 
     def save(self, *args, **kwargs):
         """
-        Override the save method and ensure that every room code is unique by 
-        generating a random code and checking if it already exists in the database
+        Override the save method to give every new room a unique room code
+        and its own shared to-do list
         """
         if not self.roomCode:
-            while True:
-                    self.roomCode = self.generate_room_code()
-                    if not StudySession.objects.filter(roomCode=self.roomCode).exists():
-                        break 
+            self.roomCode = self.generate_room_code()
 
             if not self.Task:
                 todo_list = List.objects.create(
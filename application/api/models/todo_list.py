@@ -1,7 +1,10 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 from django.forms import ValidationError
+from django.utils.timezone import localdate
 from api.models import List
+from .daily_study import DailyStudy
+from .study_session import StudySession
 
 '''
 Task Model:
@@ -13,6 +16,7 @@ Model Breakdown:
     content -> CharField but has no limit of characters and can remain empty, this is all set by the user and stored as an attribute.
     creation_date -> DateField and this automatically sets that field to the current date. This is effectively a read-only field.
     is_completed -> BooleanField that is set to false by default, this indiacted whether the user has completed the task.
+    completed_by, completed_at -> The user whose daily study the completion was counted towards, and the day it was counted on. Empty while the task is not completed, or when its completion counted towards no-one.
     is_shared -> BooleanField that is also set to false by default, this field is to mark whether the user wants to share the toDolist item with others.
 '''
 
@@ -22,6 +26,10 @@ class Task(models.Model):
     content = models.CharField(max_length=1000, blank=True)
     creation_date = models.DateField(auto_now_add=True)
     is_completed = models.BooleanField(default=False)
+    completed_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='completed_tasks'
+    )
+    completed_at = models.DateField(null=True, blank=True)
 
     def save(self, *args, **kwargs):
         '''
@@ -33,6 +41,34 @@ class Task(models.Model):
                 raise ValidationError("You cannot modify the creation_date.")
         super().save(*args, **kwargs)
 
+    def counts_for(self, user):
+        '''
+        Whether completing the task counts towards the user's daily study: it is on one of their own lists, or on the list of the room they are in.
+        '''
+        if self.list.is_shared:
+            return StudySession.objects.filter(
+                Task=self.list_id, session_users__user=user, session_users__left_at__isnull=True
+            ).exists()
+        return self.list.permission_set.filter(user_id=user).exists()
+
+    def toggle_completion(self, user):
+        '''
+        Completes the task, or un-completes it, for the user. A completion is counted towards the user's day when the task counts for them, and un-completing the task takes it back from the day and user it was counted towards.
+        '''
+        with transaction.atomic():
+            # Re-read the task locked, so concurrent toggles count each completion once
+            current = Task.objects.select_for_update().get(pk=self.pk)
+            self.is_completed = not current.is_completed
+            if self.is_completed:
+                if self.counts_for(user):
+                    self.completed_by, self.completed_at = user, localdate()
+                    DailyStudy.add(user, self.completed_at, tasks_completed=1)
+            else:
+                if current.completed_by_id is not None:
+                    DailyStudy.add(current.completed_by, current.completed_at, tasks_completed=-1)
+                self.completed_by, self.completed_at = None, None
+            self.save(update_fields=["is_completed", "completed_by", "completed_at"])
+
     def __str__(self):
         '''
         This prints out the title and list_id of the Task item
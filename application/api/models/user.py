@@ -52,6 +52,7 @@ class User(AbstractBaseUser, PermissionsMixin):
         )])
     created_at = models.DateTimeField(auto_now_add=True)
     hours_studied = models.IntegerField(default=0)
+    minutes_studied = models.IntegerField(default=0)   # Study time to the minute, its whole hours are carried into hours_studied
     last_study_date = models.DateField(null=True, blank=True)   # Last recorded study date - used for analytics
     streaks = models.IntegerField(default=0)
     share_analytics = models.BooleanField(default=False)
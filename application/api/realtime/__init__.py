@@ -0,0 +1,14 @@
+from .roster import RoomRosterRegistry, room_rosters
+from .broadcast import ParticipantsBroadcaster, participants_broadcaster
+from .frames import MSGPACK_SUBPROTOCOL, encode_frame, group_event, event_frame, pack_frame, decode_message
+from .typing import TypingThrottle, typing_throttle
+from .topics import TOPICS, event_topic, parse_topics, initial_topics
+from .events import RoomEventRegistry, room_events, room_snapshot, resume_since
+from .auth import AUTH_SUBPROTOCOL, JWTAuthMiddleware, WebsocketTokenCache, websocket_tokens
+from .outbound import OutboundQueue
+from .timer import RoomTimer, RoomTimerRegistry, room_timers
+from .sharding import HashRing, RoomShards, room_shards
+from .forwarding import ShardListener, ShardListenerMiddleware, discard_room, shard_listener
+from .metrics import RoomMetrics, room_metrics
+from .snapshots import RoomSnapshotCache, room_snapshots
+from .outbox import NotificationOutbox, OutboxMiddleware, notification_outbox, participants_change, room_forget
@@ -0,0 +1,126 @@
+"""
+JWT authentication for study room websockets.
+
+Browsers cannot set an Authorization header on a websocket handshake, so the
+SimpleJWT access token is passed either in the query string (`?token=<jwt>`)
+or as a pair of subprotocols (`["bearer", "<jwt>"]`). JWTAuthMiddleware
+validates it and attaches the user to the connection's scope, or an
+AnonymousUser if the token is missing or invalid.
+
+Validated tokens are cached until they expire, so a burst of reconnects from
+the same clients costs neither signature checks nor user-table lookups.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qs
+from asgiref.sync import sync_to_async
+from channels.middleware import BaseMiddleware
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+# Subprotocol a client offers right before its access token
+AUTH_SUBPROTOCOL = "bearer"
+
+
+class WebsocketTokenCache:
+    """
+    Users of recently validated access tokens, kept until the tokens expire.
+    At most ROOM_TOKEN_CACHE_SIZE tokens are kept, least recently used first out.
+    """
+
+    def __init__(self, size=None):
+        self._size = size
+        self._tokens = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def size(self):
+        if self._size is not None:
+            return self._size
+        return getattr(settings, "ROOM_TOKEN_CACHE_SIZE", 10000)
+
+    def get(self, token):
+        """Return the user of a cached, unexpired token, or None."""
+        with self._lock:
+            entry = self._tokens.get(token)
+            if entry is None:
+                return None
+            user, expires_at = entry
+            if expires_at <= time.time():
+                del self._tokens[token]
+                return None
+            self._tokens.move_to_end(token)
+            return user
+
+    def set(self, token, user, expires_at):
+        with self._lock:
+            self._tokens[token] = (user, expires_at)
+            self._tokens.move_to_end(token)
+            while len(self._tokens) > self.size:
+                self._tokens.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._tokens.clear()
+
+    async def authenticate(self, token):
+        """Return the user an access token belongs to, or an AnonymousUser if it is not valid."""
+        user = self.get(token)
+        if user is not None:
+            return user
+        try:
+            user, expires_at = await sync_to_async(self._validate)(token)
+        except (TokenError, InvalidToken, AuthenticationFailed):
+            return AnonymousUser()
+        self.set(token, user, expires_at)
+        return user
+
+    @staticmethod
+    def _validate(token):
+        authentication = JWTAuthentication()
+        validated_token = authentication.get_validated_token(token)
+        return authentication.get_user(validated_token), validated_token["exp"]
+
+
+def websocket_token(scope):
+    """
+    Return the access token of a websocket handshake and whether it was sent
+    as a subprotocol, looking at the query string first.
+    """
+    query = parse_qs(scope.get("query_string", b"").decode())
+    if query.get("token"):
+        return query["token"][-1], False
+    subprotocols = scope.get("subprotocols", [])
+    if AUTH_SUBPROTOCOL in subprotocols:
+        index = subprotocols.index(AUTH_SUBPROTOCOL)
+        if index + 1 < len(subprotocols):
+            return subprotocols[index + 1], True
+    return None, False
+
+
+class JWTAuthMiddleware(BaseMiddleware):
+    """Attaches the user of the handshake's access token to the websocket scope."""
+
+    def __init__(self, inner, tokens=None):
+        super().__init__(inner)
+        self.tokens = tokens if tokens is not None else websocket_tokens
+
+    async def __call__(self, scope, receive, send):
+        scope = dict(scope)
+        token, as_subprotocol = websocket_token(scope)
+        if token is None:
+            scope["user"] = AnonymousUser()
+        else:
+            scope["user"] = await self.tokens.authenticate(token)
+        if as_subprotocol:
+            # Keep the token out of the subprotocols a consumer can accept
+            scope["subprotocols"] = [protocol for protocol in scope["subprotocols"] if protocol != token]
+        return await super().__call__(scope, receive, send)
+
+
+websocket_tokens = WebsocketTokenCache()
@@ -0,0 +1,121 @@
+"""
+Coalescing of participants broadcasts.
+
+The ParticipantsBroadcaster collects the roster changes made to a room within
+a short window (ROOM_BROADCAST_WINDOW seconds) and sends a single broadcast
+for all of them. The first change in a window becomes the "leader": it waits
+for the window to pass and then sends whatever has been collected, while later
+changes only merge into the pending update and return straight away. Waiting
+in the caller rather than in a background task means the broadcast is never
+lost when the caller runs on a short-lived event loop.
+
+With ROOM_PARTICIPANTS_DELTAS enabled, changes reported by the views are sent
+as participants_delta events listing who joined and who left, instead of the
+whole list.
+"""
+
+import asyncio
+import threading
+from django.conf import settings
+from .roster import room_rosters
+from .frames import group_event
+from .sharding import room_shards
+
+
+class PendingRosterUpdate:
+    """Roster changes collected for one room during a coalescing window."""
+
+    def __init__(self):
+        self.participants = None
+        self.full = False
+        self.joined = []
+        self.left = []
+
+    def record_join(self, username):
+        # Leaving and rejoining within the same window cancels out
+        if username in self.left:
+            self.left.remove(username)
+        elif username not in self.joined:
+            self.joined.append(username)
+
+    def record_leave(self, username):
+        if username in self.joined:
+            self.joined.remove(username)
+        elif username not in self.left:
+            self.left.append(username)
+
+
+class ParticipantsBroadcaster:
+    """Coalesces participants broadcasts per room."""
+
+    def __init__(self, window=None, deltas=None):
+        self._window = window
+        self._deltas = deltas
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    @property
+    def window(self):
+        if self._window is not None:
+            return self._window
+        return getattr(settings, "ROOM_BROADCAST_WINDOW", 0.03)
+
+    @property
+    def deltas(self):
+        if self._deltas is not None:
+            return self._deltas
+        return getattr(settings, "ROOM_PARTICIPANTS_DELTAS", False)
+
+    async def announce_roster(self, channel_layer, room_code, participants):
+        """Broadcast the room's full participants list."""
+        await self._request(channel_layer, room_code, participants, (), (), full=True)
+
+    async def announce_change(self, channel_layer, room_code, participants, joined=(), left=()):
+        """
+        Broadcast that users joined or left the room. `participants` is the
+        roster after the change; it is only sent when deltas are disabled.
+        """
+        await self._request(channel_layer, room_code, participants, joined, left, full=not self.deltas)
+
+    async def _request(self, channel_layer, room_code, participants, joined, left, full):
+        with self._lock:
+            pending = self._pending.get(room_code)
+            leader = pending is None
+            if leader:
+                pending = self._pending[room_code] = PendingRosterUpdate()
+
+            if participants is not None:
+                pending.participants = list(participants)
+            pending.full = pending.full or full
+            for username in joined:
+                pending.record_join(username)
+            for username in left:
+                pending.record_leave(username)
+
+        if not leader:
+            return
+
+        try:
+            if self.window > 0:
+                await asyncio.sleep(self.window)
+        finally:
+            with self._lock:
+                pending = self._pending.pop(room_code)
+
+        event = self._build_event(room_code, pending)
+        if event is not None:
+            await room_shards.group_send(channel_layer, room_code, event)
+
+    def _build_event(self, room_code, pending):
+        if pending.full:
+            participants = pending.participants
+            if participants is None:
+                participants = room_rosters.get(room_code) or []
+            return group_event("participants_update", keep_payload=True, participants=participants)
+
+        if not pending.joined and not pending.left:
+            return None
+        return group_event("participants_delta", keep_payload=True, joined=pending.joined, left=pending.left)
+
+
+participants_broadcaster = ParticipantsBroadcaster()
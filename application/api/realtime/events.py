@@ -0,0 +1,142 @@
+"""
+Per-room event log for resuming dropped sockets.
+
+Chat, study, task and file events sent to a room are stamped with a per-room
+monotonic sequence number and kept in a bounded ring buffer. A client that
+reconnects passes the last sequence number it saw (`?since=<seq>`) and only
+the events it missed are replayed to it. When the missed events have already
+been evicted from the buffer, the client is sent a full room snapshot instead.
+
+Typing indicators and participant updates are not logged: they describe the
+current state of the room rather than its history, and reconnecting clients
+get that state when they join.
+"""
+
+import threading
+import time
+from collections import deque
+from urllib.parse import parse_qs
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from ..models import StudySession, Task
+from .frames import group_event
+
+
+class RoomEventLog:
+    """Ring buffer of the most recent sequenced events of one study room."""
+
+    def __init__(self, size):
+        # Sequence numbers start from the log's creation time in microseconds,
+        # so a log created after a restart never reuses numbers a client has seen
+        self.seq = time.time_ns() // 1000
+        # Sequence number of the newest event no longer in the buffer
+        self.floor = self.seq
+        self.events = deque(maxlen=size)
+
+    def append(self, message_type, payload):
+        """Stamp an event with the next sequence number and keep it in the buffer."""
+        self.seq += 1
+        event = group_event(message_type, seq=self.seq, **payload)
+        event["seq"] = self.seq
+        if len(self.events) == self.events.maxlen:
+            self.floor = self.events[0]["seq"]
+        self.events.append(event)
+        return event
+
+    def since(self, seq):
+        """
+        Return the events after the given sequence number, or None if some of
+        them have been evicted (or the number comes from another log).
+        """
+        if not self.floor <= seq <= self.seq:
+            return None
+        return [event for event in self.events if event["seq"] > seq]
+
+
+class RoomEventRegistry:
+    """
+    Event logs of the study rooms, keyed by room code.
+    Logs are only dropped when their room is destroyed, each one holding at
+    most ROOM_EVENT_LOG_SIZE events.
+    """
+
+    def __init__(self, size=None):
+        self._size = size
+        self._logs = {}
+        self._lock = threading.Lock()
+
+    @property
+    def size(self):
+        if self._size is not None:
+            return self._size
+        return getattr(settings, "ROOM_EVENT_LOG_SIZE", 256)
+
+    def _log(self, room_code):
+        log = self._logs.get(room_code)
+        if log is None:
+            log = self._logs[room_code] = RoomEventLog(self.size)
+        return log
+
+    def event(self, room_code, message_type, **payload):
+        """Build a sequenced group event for the room and record it in its log."""
+        with self._lock:
+            return self._log(room_code).append(message_type, payload)
+
+    def current(self, room_code):
+        """Return the sequence number of the room's latest event."""
+        with self._lock:
+            return self._log(room_code).seq
+
+    def replay(self, room_code, since):
+        """
+        Return the room's latest sequence number and the events logged after
+        `since`, or None instead of the events if they can no longer be replayed.
+        """
+        with self._lock:
+            log = self._log(room_code)
+            return log.seq, log.since(since)
+
+    def discard(self, room_code):
+        """Drop the log of a room that no longer exists."""
+        with self._lock:
+            self._logs.pop(room_code, None)
+
+
+def resume_since(scope):
+    """
+    Return the sequence number a reconnecting socket asked to resume from,
+    0 for a client that has not seen any event yet, or None if it did not ask.
+    """
+    query = parse_qs(scope.get("query_string", b"").decode(), keep_blank_values=True)
+    if "since" not in query:
+        return None
+    try:
+        return max(int(query["since"][-1]), 0)
+    except ValueError:
+        return 0
+
+
+async def room_snapshot(room_code, seq, participants):
+    """
+    Build the full snapshot sent to a reconnecting client whose missed events
+    are no longer in the log: the participants and the shared to-do list.
+    """
+    list_id, tasks = await sync_to_async(_fetch_shared_tasks)(room_code)
+    return {
+        "type": "room_snapshot",
+        "seq": seq,
+        "participants": participants,
+        "list_id": list_id,
+        "tasks": tasks,
+    }
+
+
+def _fetch_shared_tasks(room_code):
+    list_id = StudySession.objects.filter(roomCode=room_code).values_list("Task_id", flat=True).first()
+    if list_id is None:
+        return None, []
+    tasks = Task.objects.filter(list_id=list_id).order_by("pk").values("id", "title", "content", "is_completed")
+    return list_id, list(tasks)
+
+
+room_events = RoomEventRegistry()
@@ -0,0 +1,116 @@
+"""
+Serving room operations forwarded by other workers.
+
+In room affinity mode (see sharding.py) a worker receiving a message for a
+room it does not own forwards it to the owner's shard channel. The owner's
+ShardListener reads that channel and applies the operations to the room's
+state: sequencing and broadcasting events, running timer commands, and
+sending the timer and missed events to sockets joining on other workers,
+and dropping the state of rooms left empty.
+"""
+
+import asyncio
+from channels.layers import get_channel_layer
+from .events import room_events, room_snapshot
+from .roster import room_rosters
+from .sharding import room_shards
+from .timer import room_timers
+
+
+class ShardListener:
+    """Reads the shard channel of this worker for the rooms it owns."""
+
+    def __init__(self):
+        self._task = None
+
+    def ensure_started(self, channel_layer):
+        """Start listening, unless this process owns no rooms or already listens."""
+        if not room_shards.listening:
+            return
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._task = loop.create_task(self._listen(channel_layer))
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _listen(self, channel_layer):
+        channel = room_shards.channel(room_shards.worker)
+        while True:
+            message = await channel_layer.receive(channel)
+            try:
+                await self.handle(channel_layer, message)
+            except Exception as e:
+                print(f"Error handling forwarded room message: {e}")
+
+    async def handle(self, channel_layer, message):
+        """Apply one operation forwarded for a room owned by this worker."""
+        room_code = message["room_code"]
+        message_type = message["type"]
+
+        if message_type == "shard.publish":
+            await room_shards.publish(channel_layer, room_code, message["message_type"], **message["payload"])
+
+        elif message_type == "shard.timer":
+            await room_timers.command(channel_layer, room_code, message["action"], **message["settings"])
+
+        elif message_type == "shard.join":
+            timer = room_timers.snapshot(room_code)
+            if timer is not None:
+                await channel_layer.send(message["reply_to"], timer)
+
+        elif message_type == "shard.resume":
+            since = message["since"]
+            seq, events = room_events.replay(room_code, since)
+            if since and events is None:
+                # The socket's worker fills in the participants from its own roster
+                await channel_layer.send(message["reply_to"], await room_snapshot(room_code, seq, None))
+            # One message for all the events, however many the log holds
+            await channel_layer.send(message["reply_to"], {
+                "type": "room_resumed",
+                "seq": seq,
+                "events": events or [],
+            })
+
+        elif message_type == "shard.forget":
+            await discard_room(channel_layer, room_code)
+
+
+async def discard_room(channel_layer, room_code):
+    """Drop the roster, event log and timer of a room left empty, on the worker owning it."""
+    if not room_shards.owns(room_code):
+        await room_shards.forward(channel_layer, room_code, "shard.forget")
+        return
+    room_rosters.discard(room_code)
+    room_events.discard(room_code)
+    room_timers.discard(room_code)
+
+
+class ShardListenerMiddleware:
+    """
+    ASGI middleware serving the rooms this process owns from startup, whether
+    or not it has sockets for them. Servers sending lifespan events start the
+    listener before accepting connections; it is otherwise started by the
+    first connection of any protocol.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        shard_listener.ensure_started(get_channel_layer())
+        if scope["type"] != "lifespan":
+            return await self.app(scope, receive, send)
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                shard_listener.stop()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+shard_listener = ShardListener()
@@ -0,0 +1,58 @@
+"""
+Encode-once group events.
+
+Events built with group_event carry the client frame already encoded under
+"frame", and consumers forward it untouched, so a broadcast is serialised once
+at group_send time however many sockets the room has. Clients that negotiate
+the msgpack subprotocol get the same frames as binary msgpack, repacked once
+per process.
+"""
+
+import json
+from functools import lru_cache
+import msgpack
+
+# Subprotocol a client asks for to exchange msgpack instead of JSON
+MSGPACK_SUBPROTOCOL = "msgpack"
+
+
+def encode_frame(message):
+    """Serialise a message for sending to clients."""
+    return json.dumps(message)
+
+
+def group_event(message_type, keep_payload=False, **payload):
+    """
+    Build a channel layer event for group_send with its client frame pre-encoded.
+
+    The payload fields are only kept alongside the frame when keep_payload is
+    set, for events whose handlers need to read them (e.g. roster updates).
+    """
+    message = {"type": message_type, **payload}
+    event = dict(message) if keep_payload else {"type": message_type}
+    event["frame"] = encode_frame(message)
+    return event
+
+
+def event_frame(event):
+    """
+    Return the pre-encoded frame of an event, encoding the event itself for
+    events that were sent without one.
+    """
+    frame = event.get("frame")
+    if frame is None:
+        frame = encode_frame(event)
+    return frame
+
+
+@lru_cache(maxsize=256)
+def pack_frame(frame):
+    """Repack a JSON frame as msgpack for clients using the binary subprotocol."""
+    return msgpack.packb(json.loads(frame))
+
+
+def decode_message(text_data=None, bytes_data=None):
+    """Decode a message received from a client, in either wire format."""
+    if bytes_data is not None:
+        return msgpack.unpackb(bytes_data)
+    return json.loads(text_data)
@@ -0,0 +1,210 @@
+"""
+Instrumentation of the study room websockets.
+
+RoomConsumer records, per message type, how many messages it received and
+sent, their size, how long their handlers took and how long group_send took,
+along with the room sockets open, the connects and disconnects, and the slow
+clients disconnected. The metrics are kept per process and rendered in the
+Prometheus text format by the realtime_metrics view, so each daphne worker is
+scraped on its own.
+
+Message types are only used as labels when they are known, so a client
+sending made-up types cannot blow up the number of series.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+# Message types clients send to RoomConsumer.receive
+RECEIVED_TYPES = frozenset([
+    "chat_message", "update_participants", "study_update", "timer", "typing", "heartbeat",
+    "subscribe", "unsubscribe", "file_uploaded", "file_deleted",
+])
+
+
+def _format_labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value):
+    if value == int(value):
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric:
+    """A family of samples sharing a name, keyed by their label values."""
+
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.extend(self._samples(key, value))
+        return lines
+
+    def _samples(self, key, value):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class HistogramValue:
+    def __init__(self, buckets):
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, amount, **labels):
+        key = self._key(labels)
+        with self._lock:
+            histogram = self._values.get(key)
+            if histogram is None:
+                histogram = self._values[key] = HistogramValue(self.buckets)
+            for index, bound in enumerate(self.buckets):
+                if amount <= bound:
+                    histogram.counts[index] += 1
+                    break
+            histogram.count += 1
+            histogram.sum += amount
+
+    def value(self, **labels):
+        histogram = self._values.get(self._key(labels))
+        return histogram.count if histogram is not None else 0
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe how long the body of the with block takes."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _samples(self, key, histogram):
+        names = self.labelnames + ("le",)
+        samples = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, histogram.counts):
+            cumulative += count
+            samples.append(f"{self.name}_bucket{_format_labels(names, key + (bound,))} {cumulative}")
+        samples.append(f"{self.name}_bucket{_format_labels(names, key + ('+Inf',))} {histogram.count}")
+        labels = _format_labels(self.labelnames, key)
+        samples.append(f"{self.name}_count{labels} {histogram.count}")
+        samples.append(f"{self.name}_sum{labels} {_format_value(histogram.sum)}")
+        return samples
+
+
+class RoomMetrics:
+    """The metrics recorded by the study room websockets of this process."""
+
+    def __init__(self):
+        self.messages_received = Counter(
+            "room_messages_received_total", "Messages received from room sockets.", ["type"])
+        self.bytes_received = Counter(
+            "room_received_bytes_total", "Bytes received from room sockets.", ["type"])
+        self.receive_seconds = Histogram(
+            "room_receive_handler_seconds", "Time spent handling a message received from a room socket.", ["type"])
+        self.messages_sent = Counter(
+            "room_messages_sent_total", "Frames queued for room sockets.", ["type"])
+        self.bytes_sent = Counter(
+            "room_sent_bytes_total", "Bytes of the frames queued for room sockets.", ["type"])
+        self.send_seconds = Histogram(
+            "room_send_handler_seconds", "Time spent handling an event to be sent to a room socket.", ["type"])
+        self.group_send_seconds = Histogram(
+            "room_group_send_seconds", "Time spent broadcasting an event to a room.", ["type"])
+        self.sockets = Gauge(
+            "room_sockets", "Room sockets open in this process.")
+        self.connects = Counter(
+            "room_connects_total", "Room socket connection attempts.", ["result"])
+        self.disconnects = Counter(
+            "room_disconnects_total", "Room sockets disconnected.")
+        self.lagging_disconnects = Counter(
+            "room_lagging_disconnects_total", "Room sockets disconnected for falling too far behind.")
+        self.metrics = [
+            self.messages_received, self.bytes_received, self.receive_seconds,
+            self.messages_sent, self.bytes_sent, self.send_seconds,
+            self.group_send_seconds, self.sockets, self.connects, self.disconnects, self.lagging_disconnects,
+        ]
+
+    @staticmethod
+    def received_type(message_type):
+        """The label of a received message type, "unknown" for types RoomConsumer does not handle."""
+        if isinstance(message_type, str) and message_type in RECEIVED_TYPES:
+            return message_type
+        return "unknown"
+
+    def received(self, message_type, size, seconds):
+        """Record a message received from a socket and handled in `seconds`."""
+        label = self.received_type(message_type)
+        self.messages_received.inc(type=label)
+        self.bytes_received.inc(size, type=label)
+        self.receive_seconds.observe(seconds, type=label)
+
+    def sent(self, message_type, size, seconds):
+        """Record a frame queued for a socket by the handler of its event type."""
+        self.messages_sent.inc(type=message_type)
+        self.bytes_sent.inc(size, type=message_type)
+        self.send_seconds.observe(seconds, type=message_type)
+
+    def render(self):
+        """Return every metric in the Prometheus text exposition format."""
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+room_metrics = RoomMetrics()
@@ -0,0 +1,100 @@
+"""
+Bounded outbound queues for slow room sockets.
+
+Consumer handlers put frames on the socket's OutboundQueue and return straight
+away, while a writer task drains the queue onto the socket, so a client on a
+bad connection never stalls its consumer.
+
+Chat, task, file and study frames are always kept. Typing frames are
+coalesced per sender and are the first to be dropped when the queue is full,
+and participants frames are coalesced into the latest roster. A socket whose
+oldest waiting frame is older than ROOM_OUTBOUND_MAX_LAG seconds, or whose
+queue is full of frames that cannot be dropped, should be disconnected; the
+client resumes from its last sequence number when it reconnects.
+"""
+
+import asyncio
+import itertools
+import time
+from collections import OrderedDict
+from django.conf import settings
+
+
+class OutboundQueue:
+    """Frames waiting to be written to one socket, oldest first."""
+
+    def __init__(self, size=None, max_lag=None):
+        self._size = size
+        self._max_lag = max_lag
+        # Keyed entries are coalesced, the others get a unique number as key
+        self._entries = OrderedDict()
+        self._ids = itertools.count()
+        self._ready = asyncio.Event()
+        self.dropped = 0
+        self.coalesced = 0
+
+    @property
+    def size(self):
+        if self._size is not None:
+            return self._size
+        return getattr(settings, "ROOM_OUTBOUND_QUEUE_SIZE", 512)
+
+    @property
+    def max_lag(self):
+        if self._max_lag is not None:
+            return self._max_lag
+        return getattr(settings, "ROOM_OUTBOUND_MAX_LAG", 10.0)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def pending(self, key):
+        """Return whether a frame with this coalescing key is waiting to be written."""
+        return key in self._entries
+
+    def lag(self):
+        """Return how many seconds the oldest waiting frame has been queued for."""
+        if not self._entries:
+            return 0.0
+        _, enqueued_at, _ = next(iter(self._entries.values()))
+        return time.monotonic() - enqueued_at
+
+    def put(self, frame, key=None, droppable=False):
+        """
+        Queue a frame, replacing the waiting frame with the same key if there is one.
+        Returns False if the socket has fallen too far behind and should be closed.
+        """
+        if key is not None and key in self._entries:
+            _, enqueued_at, _ = self._entries[key]
+            self._entries[key] = (frame, enqueued_at, droppable)
+            self.coalesced += 1
+            return self.lag() <= self.max_lag
+
+        if len(self._entries) >= self.size and not self._drop_one():
+            if droppable:
+                self.dropped += 1
+                return self.lag() <= self.max_lag
+            return False
+
+        if key is None:
+            key = next(self._ids)
+        self._entries[key] = (frame, time.monotonic(), droppable)
+        self._ready.set()
+        return self.lag() <= self.max_lag
+
+    def _drop_one(self):
+        """Drop the oldest droppable frame, returning whether there was one."""
+        for key, (_, _, droppable) in self._entries.items():
+            if droppable:
+                del self._entries[key]
+                self.dropped += 1
+                return True
+        return False
+
+    async def get(self):
+        """Wait for and remove the oldest waiting frame."""
+        while not self._entries:
+            self._ready.clear()
+            await self._ready.wait()
+        _, (frame, _, _) = self._entries.popitem(last=False)
+        return frame
@@ -0,0 +1,221 @@
+"""
+Transactional outbox for the notifications sent by the HTTP views.
+
+Views record the events they announce in OutboxEvent rows, in the same
+transaction as the change, so a rolled back write is never broadcast and no
+request waits for the channel layer. Once the transaction commits, a
+dispatcher task on the event loop attached by OutboxMiddleware claims the
+events in batches and sends them to the rooms, each room's in the order they
+were recorded. Without an event loop (management commands, the test client)
+the events are sent before the commit hook returns.
+
+Delivery is at least once. Claiming a batch leases its rows for
+ROOM_OUTBOX_CLAIM_TIMEOUT seconds, and rows are only deleted once their
+event was sent. Events that failed to send are released and retried, after
+ROOM_OUTBOX_RETRY_DELAY seconds by the dispatcher; the rest of their room's
+batch is held back with them so the room's events stay in order. Events left
+behind, e.g. claimed or recorded by a process that died before sending them,
+are sent by `manage.py dispatch_outbox` once their lease has expired.
+"""
+
+import asyncio
+from datetime import timedelta
+from asgiref.sync import async_to_sync, sync_to_async
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils.timezone import now
+from ..models import OutboxEvent
+from .broadcast import participants_broadcaster
+from .forwarding import discard_room
+from .sharding import room_shards
+
+# Message type of the events recording a change to a room's participants
+PARTICIPANTS_CHANGE = "participants_change"
+# Message type of the events recording that a room was left empty
+ROOM_FORGET = "room_forget"
+
+
+class NotificationOutbox:
+    """Records room events with the changes they announce and sends them after commit."""
+
+    def __init__(self, batch_size=None):
+        self._batch_size = batch_size
+        self._loop = None
+        self._task = None
+        self._woken = False
+
+    @property
+    def batch_size(self):
+        if self._batch_size is not None:
+            return self._batch_size
+        return getattr(settings, "ROOM_OUTBOX_BATCH_SIZE", 100)
+
+    @property
+    def claim_timeout(self):
+        return getattr(settings, "ROOM_OUTBOX_CLAIM_TIMEOUT", 60)
+
+    @property
+    def retry_delay(self):
+        return getattr(settings, "ROOM_OUTBOX_RETRY_DELAY", 5)
+
+    def publish(self, room_code, message_type, **payload):
+        """Record a sequenced event for the room, like room_shards.publish."""
+        self.record([OutboxEvent(room_code=room_code, message_type=message_type, payload=payload)])
+
+    def announce_change(self, room_code, participants, joined=(), left=()):
+        """Record a change to the room's participants, like participants_broadcaster.announce_change."""
+        self.record([participants_change(room_code, participants, joined, left)])
+
+    def forget(self, room_code):
+        """Record that the room was left empty, to drop its state on the worker owning it."""
+        self.record([room_forget(room_code)])
+
+    def record(self, events):
+        """Save the events in the current transaction, to be sent once it commits."""
+        if not events:
+            return
+        OutboxEvent.objects.bulk_create(events)
+        transaction.on_commit(self.wake)
+
+    def attach(self, loop):
+        """Dispatch events on the given event loop, the one serving this process."""
+        self._loop = loop
+
+    def wake(self):
+        """Send the recorded events, in the background when an event loop is attached."""
+        loop = self._loop
+        if loop is None or loop.is_closed() or not loop.is_running():
+            # No event loop serving this process, send before returning
+            try:
+                async_to_sync(self.flush)(get_channel_layer())
+            except Exception as e:
+                # The change has committed; its events wait for dispatch_outbox
+                print(f"Error dispatching outbox events: {e}")
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._ensure_dispatching()
+        else:
+            loop.call_soon_threadsafe(self._ensure_dispatching)
+
+    async def flush(self, channel_layer):
+        """
+        Send every recorded event, a batch at a time. Returns how many were
+        sent, or raises the error of the first batch some events failed in,
+        once those are released for a retry.
+        """
+        sent = 0
+        while True:
+            events = await sync_to_async(self._claim)()
+            if not events:
+                return sent
+            rooms = {}
+            for event in events:
+                rooms.setdefault(event.room_code, []).append(event)
+            results = await asyncio.gather(*(self._dispatch(channel_layer, room_events) for room_events in rooms.values()))
+            delivered = [event for room_sent, _ in results for event in room_sent]
+            await sync_to_async(self._settle)(events, delivered)
+            sent += len(delivered)
+            for _, error in results:
+                if error is not None:
+                    raise error
+
+    def _ensure_dispatching(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._dispatcher())
+        else:
+            # Claim again once the current flush is done
+            self._woken = True
+
+    async def _dispatcher(self):
+        channel_layer = get_channel_layer()
+        while True:
+            self._woken = False
+            try:
+                await self.flush(channel_layer)
+            except Exception as e:
+                print(f"Error dispatching outbox events: {e}")
+                # Retry the events that failed, with any recorded meanwhile
+                await asyncio.sleep(self.retry_delay)
+                continue
+            if not self._woken:
+                return
+
+    def _claim(self):
+        """Lease the next batch of events that no dispatcher is sending."""
+        claimed_at = now()
+        with transaction.atomic():
+            events = list(
+                OutboxEvent.objects.select_for_update(skip_locked=True)
+                .filter(Q(claimed_until__isnull=True) | Q(claimed_until__lte=claimed_at))
+                .order_by("pk")[:self.batch_size]
+            )
+            if events:
+                OutboxEvent.objects.filter(pk__in=[event.pk for event in events]).update(
+                    claimed_until=claimed_at + timedelta(seconds=self.claim_timeout)
+                )
+        return events
+
+    @staticmethod
+    def _settle(events, delivered):
+        """Delete the events that were sent and release the others to be claimed again."""
+        sent = {event.pk for event in delivered}
+        with transaction.atomic():
+            OutboxEvent.objects.filter(pk__in=sent).delete()
+            OutboxEvent.objects.filter(pk__in=[event.pk for event in events if event.pk not in sent]).update(
+                claimed_until=None
+            )
+
+    @staticmethod
+    async def _dispatch(channel_layer, events):
+        """
+        Send the events of one room in order, each once the one before it was
+        sent. Stops at the first event that fails, and returns the events sent
+        along with the error, if any.
+        """
+        sent = []
+        for event in events:
+            try:
+                if event.message_type == PARTICIPANTS_CHANGE:
+                    await participants_broadcaster.announce_change(channel_layer, event.room_code, **event.payload)
+                elif event.message_type == ROOM_FORGET:
+                    await discard_room(channel_layer, event.room_code)
+                else:
+                    await room_shards.publish(channel_layer, event.room_code, event.message_type, **event.payload)
+            except Exception as e:
+                return sent, e
+            sent.append(event)
+        return sent, None
+
+
+def participants_change(room_code, participants, joined=(), left=()):
+    """An unsaved event recording a change to the room's participants."""
+    return OutboxEvent(room_code=room_code, message_type=PARTICIPANTS_CHANGE, payload={
+        "participants": list(participants),
+        "joined": list(joined),
+        "left": list(left),
+    })
+
+
+def room_forget(room_code):
+    """An unsaved event recording that a room was left empty."""
+    return OutboxEvent(room_code=room_code, message_type=ROOM_FORGET, payload={})
+
+
+class OutboxMiddleware:
+    """ASGI middleware attaching the event loop serving HTTP requests to the outbox."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        notification_outbox.attach(asyncio.get_running_loop())
+        return await self.app(scope, receive, send)
+
+
+notification_outbox = NotificationOutbox()
@@ -0,0 +1,120 @@
+"""
+Process-level registry of study room rosters.
+
+The registry keeps one roster per room that has at least one socket open in
+this process, so connect/disconnect broadcasts are served from memory. A
+room's roster is loaded from the database only on a cold start (the first
+socket for that room) and is kept up to date afterwards by the
+participants_update events that join/leave broadcast to the room's group.
+Once the last socket for a room disconnects the roster is dropped again.
+"""
+
+import threading
+from asgiref.sync import sync_to_async
+from ..models import StudySession
+
+
+class RoomRoster:
+    """Cached participant usernames and open socket count for one room."""
+
+    def __init__(self, usernames):
+        self.usernames = list(usernames)
+        self.connections = 0
+
+
+class RoomRosterRegistry:
+    """
+    Maps room codes to their cached RoomRoster.
+
+    Consumers run on the event loop while the HTTP views run in worker threads,
+    so every access goes through a lock.
+    """
+
+    def __init__(self):
+        self._rooms = {}
+        self._lock = threading.Lock()
+
+    def get(self, room_code):
+        """Return a copy of the cached participants list, or None if the room is not cached."""
+        with self._lock:
+            roster = self._rooms.get(room_code)
+            return list(roster.usernames) if roster else None
+
+    def set(self, room_code, usernames):
+        """Replace the participants of a room that is already cached."""
+        with self._lock:
+            roster = self._rooms.get(room_code)
+            if roster is not None:
+                roster.usernames = list(usernames)
+
+    def add(self, room_code, username):
+        """Record a participant joining a cached room."""
+        with self._lock:
+            roster = self._rooms.get(room_code)
+            if roster is not None and username not in roster.usernames:
+                roster.usernames.append(username)
+
+    def remove(self, room_code, username):
+        """Record a participant leaving a cached room."""
+        with self._lock:
+            roster = self._rooms.get(room_code)
+            if roster is not None and username in roster.usernames:
+                roster.usernames.remove(username)
+
+    def attach(self, room_code):
+        """
+        Register a socket for a room. Returns False if the room is not cached,
+        in which case the caller has to load() it from the database instead.
+        """
+        with self._lock:
+            roster = self._rooms.get(room_code)
+            if roster is None:
+                return False
+            roster.connections += 1
+            return True
+
+    def detach(self, room_code):
+        """Unregister a socket, dropping the roster once the room has none left."""
+        with self._lock:
+            roster = self._rooms.get(room_code)
+            if roster is None:
+                return
+            roster.connections -= 1
+            if roster.connections <= 0:
+                del self._rooms[room_code]
+
+    def discard(self, room_code):
+        """Forget a room entirely, e.g. once it has been destroyed."""
+        with self._lock:
+            self._rooms.pop(room_code, None)
+
+    async def load(self, room_code, attach=False):
+        """
+        Read the room's participants from the database and refresh the cache.
+        With attach=True the room is cached (if needed) and a socket registered
+        for it, which is how a cold start happens.
+        Returns the participants list, or None if the room does not exist.
+        """
+        usernames = await sync_to_async(self._fetch_participants)(room_code)
+        if usernames is None:
+            return None
+
+        with self._lock:
+            roster = self._rooms.get(room_code)
+            if roster is None and attach:
+                roster = self._rooms[room_code] = RoomRoster(usernames)
+            elif roster is not None:
+                roster.usernames = list(usernames)
+            if attach:
+                roster.connections += 1
+        return usernames
+
+    @staticmethod
+    def _fetch_participants(room_code):
+        study_session = StudySession.objects.filter(roomCode=room_code).first()
+        if study_session is None:
+            return None
+        return list(study_session.participants.values_list("username", flat=True))
+
+
+room_rosters = RoomRosterRegistry()
@@ -0,0 +1,118 @@
+"""
+Room affinity across several daphne workers.
+
+In room affinity mode each room code is mapped onto a consistent hash ring of
+the workers (ROOM_SHARD_WORKERS), and the worker owning a room
+(ROOM_SHARD_WORKER names this process) keeps its event log and its timer.
+Other workers forward those operations to the owner through its shard
+channel, where ShardListener serves them.
+
+Broadcasts always go through the room's channel layer group, wherever the
+room's sockets are. A load balancer hashing the room code of the websocket
+path the same way puts every socket of a room on its owner.
+
+Adding or removing a worker only moves the rooms between it and its
+neighbours on the ring; their events are replayed from a snapshot and their
+timers are lost, as on a restart.
+"""
+
+import bisect
+import hashlib
+from django.conf import settings
+from .events import room_events
+from .metrics import room_metrics
+
+# Points each worker gets on the hash ring, spreading rooms evenly between workers
+RING_REPLICAS = 64
+
+
+def _hash(value):
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Consistent hash ring mapping keys onto a set of nodes."""
+
+    def __init__(self, nodes, replicas=RING_REPLICAS):
+        self.nodes = tuple(nodes)
+        points = sorted((_hash(f"{node}#{replica}"), node) for node in self.nodes for replica in range(replicas))
+        self._hashes = [point for point, _ in points]
+        self._nodes = [node for _, node in points]
+
+    def node(self, key):
+        """Return the node owning a key, or None if the ring is empty."""
+        if not self._hashes:
+            return None
+        index = bisect.bisect(self._hashes, _hash(key)) % len(self._hashes)
+        return self._nodes[index]
+
+
+class RoomShards:
+    """
+    Decides which worker owns a room. Every room is local while
+    ROOM_SHARD_WORKERS is empty.
+    """
+
+    def __init__(self, workers=None, worker=None):
+        self._workers = workers
+        self._worker = worker
+        self._ring = None
+
+    @property
+    def workers(self):
+        if self._workers is not None:
+            return tuple(self._workers)
+        return tuple(getattr(settings, "ROOM_SHARD_WORKERS", ()))
+
+    @property
+    def worker(self):
+        if self._worker is not None:
+            return self._worker
+        return getattr(settings, "ROOM_SHARD_WORKER", None)
+
+    @property
+    def enabled(self):
+        return bool(self.workers)
+
+    @property
+    def listening(self):
+        """Whether this process owns rooms and should serve forwarded operations."""
+        return self.enabled and self.worker in self.workers
+
+    def owner(self, room_code):
+        """Return the name of the worker owning the room, or None when affinity is disabled."""
+        workers = self.workers
+        if self._ring is None or self._ring.nodes != workers:
+            self._ring = HashRing(workers)
+        return self._ring.node(room_code)
+
+    def owns(self, room_code):
+        return not self.enabled or self.owner(room_code) == self.worker
+
+    @staticmethod
+    def channel(worker):
+        """Name of the channel the given worker receives forwarded operations on."""
+        return f"room_shard.{worker}"
+
+    async def group_send(self, channel_layer, room_code, event):
+        """Broadcast an event to the room's sockets, on whichever workers they are."""
+        with room_metrics.group_send_seconds.time(type=event["type"]):
+            await channel_layer.group_send(f"room_{room_code}", event)
+
+    async def publish(self, channel_layer, room_code, message_type, **payload):
+        """Record a sequenced event in the room's log and broadcast it, on the worker owning the room."""
+        if not self.owns(room_code):
+            await self.forward(channel_layer, room_code, "shard.publish", message_type=message_type, payload=payload)
+            return
+        await self.group_send(channel_layer, room_code, room_events.event(room_code, message_type, **payload))
+
+    async def forward(self, channel_layer, room_code, operation, **message):
+        """Send an operation on the room to the worker owning it."""
+        await channel_layer.send(self.channel(self.owner(room_code)), {
+            "type": operation,
+            "room_code": room_code,
+            **message,
+        })
+
+
+room_shards = RoomShards()
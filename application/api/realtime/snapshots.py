@@ -0,0 +1,127 @@
+"""
+Cached snapshots of study rooms.
+
+A room snapshot holds the session name, list id, participants, tasks and
+timer state the group study page needs in one body, cached per room and
+served with an ETag. Polling an unchanged room reads no room data from the
+database: a cache read and a 304. Authenticating the request still loads its
+user.
+
+Snapshots are kept in Django's cache (Redis when REDIS_URL is set, so every
+worker sees the same entries) under a per-room version. Each mutation bumps
+the version rather than deleting the entry, so a snapshot built from data
+read before the mutation can never be stored where readers will find it.
+The timer lives in the memory of the worker owning the room, which stores
+its state in the cache whenever it changes.
+"""
+
+import hashlib
+import json
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from ..models import StudySession, Task
+
+Participant = StudySession.participants.through
+
+
+def snapshot_etag(snapshot):
+    """Weak ETag of a snapshot, equal for snapshots with the same content."""
+    body = json.dumps(snapshot, sort_keys=True, separators=(",", ":"), default=str)
+    return f'W/"{hashlib.blake2b(body.encode(), digest_size=16).hexdigest()}"'
+
+
+class RoomSnapshotCache:
+    """Builds, caches and invalidates the snapshots of study rooms."""
+
+    def __init__(self, ttl=None):
+        self._ttl = ttl
+
+    @property
+    def ttl(self):
+        if self._ttl is not None:
+            return self._ttl
+        return getattr(settings, "ROOM_SNAPSHOT_TTL", 300)
+
+    def get(self, room_code):
+        """Return the room's (etag, snapshot), building it on a cache miss, or None if there is no such room."""
+        version = cache.get(self._version_key(room_code), 0)
+        entry = cache.get(self._snapshot_key(room_code, version))
+        if entry is None:
+            snapshot = self._build(room_code)
+            if snapshot is None:
+                return None
+            entry = (snapshot_etag(snapshot), snapshot)
+            cache.set(self._snapshot_key(room_code, version), entry, self.ttl)
+        return entry
+
+    def invalidate(self, room_code):
+        """Make the next request for the room build a new snapshot, after a change to it has committed."""
+        version_key = self._version_key(room_code)
+        version = cache.get(version_key, 0)
+        cache.delete(self._snapshot_key(room_code, version))
+        try:
+            cache.incr(version_key)
+        except ValueError:
+            cache.set(version_key, version + 1, None)
+
+    async def ainvalidate(self, room_code):
+        await sync_to_async(self.invalidate)(room_code)
+
+    def timer_changed(self, room_code, state):
+        """Store the state of the room's timer, as in its latest timer_update, for snapshots built by any worker."""
+        cache.set(self._timer_key(room_code), _timer_snapshot(state), None)
+        self.invalidate(room_code)
+
+    async def atimer_changed(self, room_code, state):
+        await sync_to_async(self.timer_changed)(room_code, state)
+
+    def discard(self, room_code):
+        """Forget everything cached for a room that no longer exists."""
+        version_key = self._version_key(room_code)
+        cache.delete_many([
+            self._snapshot_key(room_code, cache.get(version_key, 0)),
+            version_key,
+            self._timer_key(room_code),
+        ])
+
+    def _build(self, room_code):
+        room = StudySession.objects.filter(roomCode=room_code).values("pk", "sessionName", "Task_id").first()
+        if room is None:
+            return None
+        participants = Participant.objects.filter(studysession_id=room["pk"]).order_by("pk").values_list(
+            "user__username", flat=True
+        )
+        tasks = []
+        if room["Task_id"] is not None:
+            tasks = list(Task.objects.filter(list_id=room["Task_id"]).order_by("pk").values(
+                "id", "title", "content", "is_completed"
+            ))
+        return {
+            "roomCode": room_code,
+            "sessionName": room["sessionName"],
+            "roomList": room["Task_id"],
+            "participantsList": [{"username": username} for username in participants],
+            "tasks": tasks,
+            "timer": cache.get(self._timer_key(room_code)) or {"phase": "idle"},
+        }
+
+    @staticmethod
+    def _version_key(room_code):
+        return f"room_snapshot_version:{room_code}"
+
+    @staticmethod
+    def _snapshot_key(room_code, version):
+        return f"room_snapshot:{room_code}:{version}"
+
+    @staticmethod
+    def _timer_key(room_code):
+        return f"room_timer:{room_code}"
+
+
+def _timer_snapshot(state):
+    # server_time changes with every request, so it is added when a snapshot is served
+    return {key: value for key, value in state.items() if key not in ("type", "server_time")}
+
+
+room_snapshots = RoomSnapshotCache()
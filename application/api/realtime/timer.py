@@ -0,0 +1,231 @@
+"""
+Server-authoritative Pomodoro timers for study rooms.
+
+A room's timer is a small state machine on the server (study and break phases
+over a number of rounds). Only transitions are broadcast, as timer_update
+events carrying the absolute UNIX time the current phase ends, so clients
+count down locally without any per-second traffic. Late joiners get the
+current state when they connect.
+
+Phases advance on the server at their deadline. Each deadline is computed
+from the previous one rather than from when the transition ran, so a busy
+event loop never makes the room's timer drift.
+"""
+
+import asyncio
+import threading
+import time
+from .frames import group_event
+from .sharding import room_shards
+from .snapshots import room_snapshots
+
+STUDY = "study"
+BREAK = "break"
+COMPLETED = "completed"
+IDLE = "idle"
+
+# Shortest and longest study or break phase accepted from a client, in seconds
+MIN_PHASE_LENGTH = 1
+MAX_PHASE_LENGTH = 100 * 3600
+# Most rounds accepted from a client
+MAX_ROUNDS = 100
+
+
+class RoomTimer:
+    """Pomodoro timer of one room. Deadlines are absolute UNIX timestamps."""
+
+    def __init__(self, study_length, break_length, rounds, now):
+        self.study_length = study_length
+        self.break_length = break_length
+        self.rounds = rounds
+        self.start(now)
+
+    def start(self, now):
+        """(Re)start the timer from the first study round."""
+        self.round = 1
+        self.phase = STUDY
+        self.deadline = now + self.study_length
+        # Seconds left in the phase while the timer is paused
+        self.remaining = None
+
+    @property
+    def paused(self):
+        return self.remaining is not None
+
+    def pause(self, now):
+        if self.paused or self.deadline is None:
+            return False
+        self.remaining = max(self.deadline - now, 0)
+        self.deadline = None
+        return True
+
+    def resume(self, now):
+        if not self.paused:
+            return False
+        self.deadline = now + self.remaining
+        self.remaining = None
+        return True
+
+    def advance(self):
+        """Move on to the next phase, the current one having reached its deadline."""
+        if self.phase == STUDY:
+            if self.round >= self.rounds:
+                self.phase = COMPLETED
+                self.deadline = None
+            elif self.break_length > 0:
+                self.phase = BREAK
+                self.deadline += self.break_length
+            else:
+                self.round += 1
+                self.deadline += self.study_length
+        elif self.phase == BREAK:
+            self.phase = STUDY
+            self.round += 1
+            self.deadline += self.study_length
+
+    def catch_up(self, now):
+        """Advance past every phase whose deadline has passed. Returns whether the phase changed."""
+        changed = False
+        while self.deadline is not None and self.deadline <= now:
+            self.advance()
+            changed = True
+        return changed
+
+    def state(self, now):
+        """The timer_update payload describing the current phase."""
+        return {
+            "phase": self.phase,
+            "round": self.round,
+            "rounds": self.rounds,
+            "study_length": self.study_length,
+            "break_length": self.break_length,
+            "deadline": self.deadline,
+            "remaining": self.remaining,
+            "server_time": now,
+        }
+
+
+def idle_state(now):
+    return {"phase": IDLE, "server_time": now}
+
+
+class RoomTimerRegistry:
+    """
+    Maps room codes to their running RoomTimer and schedules phase changes.
+    The timer of a room lives in the worker owning the room (see sharding.py).
+    """
+
+    def __init__(self):
+        self._timers = {}
+        # Room code to the (loop, handle) of its timer's next phase change
+        self._handles = {}
+        self._lock = threading.Lock()
+
+    def get(self, room_code):
+        return self._timers.get(room_code)
+
+    def snapshot(self, room_code):
+        """Return the timer_update event describing the room's timer, or None if it has none."""
+        timer = self._timers.get(room_code)
+        if timer is None:
+            return None
+        return {"type": "timer_update", **timer.state(time.time())}
+
+    async def command(self, channel_layer, room_code, action, study_length=None, break_length=None, rounds=None):
+        """
+        Apply a client's timer command and broadcast the resulting state.
+        Returns False for commands that are invalid or change nothing.
+        """
+        now = time.time()
+        timer = self._timers.get(room_code)
+
+        if action == "start":
+            try:
+                study_length, break_length, rounds = float(study_length), float(break_length), int(rounds)
+            except (TypeError, ValueError):
+                return False
+            if not MIN_PHASE_LENGTH <= study_length <= MAX_PHASE_LENGTH:
+                return False
+            if break_length != 0 and not MIN_PHASE_LENGTH <= break_length <= MAX_PHASE_LENGTH:
+                return False
+            if not 1 <= rounds <= MAX_ROUNDS:
+                return False
+            timer = RoomTimer(study_length, break_length, rounds, now)
+            with self._lock:
+                self._timers[room_code] = timer
+        elif action == "stop":
+            if timer is None:
+                return False
+            self.discard(room_code)
+            await self._broadcast(channel_layer, room_code, idle_state(now))
+            return True
+        elif timer is None:
+            return False
+        elif action == "reset":
+            timer.start(now)
+        elif action == "pause":
+            if not timer.pause(now):
+                return False
+        elif action == "resume":
+            if not timer.resume(now):
+                return False
+        else:
+            return False
+
+        self._schedule(channel_layer, room_code, timer)
+        await self._broadcast(channel_layer, room_code, timer.state(now))
+        return True
+
+    def discard(self, room_code):
+        """Forget a room's timer, e.g. when it is stopped or the room is destroyed."""
+        with self._lock:
+            self._timers.pop(room_code, None)
+            handle = self._handles.pop(room_code, None)
+        # Handles can only be cancelled from their own loop; one left scheduled
+        # finds its timer gone when it fires and does nothing
+        if handle is not None and _running_loop() is handle[0]:
+            handle[1].cancel()
+
+    def _schedule(self, channel_layer, room_code, timer):
+        """Schedule the timer's next phase change, replacing any previous one."""
+        loop = asyncio.get_running_loop()
+        handle = None
+        if timer.deadline is not None:
+            delay = max(timer.deadline - time.time(), 0)
+            handle = (loop, loop.call_at(loop.time() + delay, self._expire, channel_layer, room_code, timer))
+        with self._lock:
+            previous = self._handles.pop(room_code, None)
+            if handle is not None:
+                self._handles[room_code] = handle
+        if previous is not None:
+            previous[1].cancel()
+
+    def _expire(self, channel_layer, room_code, timer):
+        # The timer may have been stopped or replaced since this was scheduled
+        if self._timers.get(room_code) is not timer:
+            return
+        now = time.time()
+        if not timer.catch_up(now):
+            self._schedule(channel_layer, room_code, timer)
+            return
+        if timer.phase == COMPLETED:
+            with self._lock:
+                self._handles.pop(room_code, None)
+        else:
+            self._schedule(channel_layer, room_code, timer)
+        asyncio.ensure_future(self._broadcast(channel_layer, room_code, timer.state(now)))
+
+    @staticmethod
+    async def _broadcast(channel_layer, room_code, state):
+        await room_snapshots.atimer_changed(room_code, state)
+        await room_shards.group_send(channel_layer, room_code, group_event("timer_update", **state))
+
+
+def _running_loop():
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+room_timers = RoomTimerRegistry()
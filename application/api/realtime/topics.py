@@ -0,0 +1,63 @@
+"""
+Topic subscriptions for multiplexed room sockets.
+
+A client opens a single socket per room and subscribes it to the topics it
+renders; RoomConsumer drops group events for topics the socket is not
+subscribed to before they are written to the wire.
+"""
+
+from urllib.parse import parse_qs
+
+CHAT = "chat"
+PARTICIPANTS = "participants"
+TASKS = "tasks"
+FILES = "files"
+STUDY = "study"
+
+TOPICS = frozenset([CHAT, PARTICIPANTS, TASKS, FILES, STUDY])
+
+# Topic of every event type broadcast to a room's group
+EVENT_TOPICS = {
+    "chat_message": CHAT,
+    "typing": CHAT,
+    "typing_stopped": CHAT,
+    "participants_update": PARTICIPANTS,
+    "participants_delta": PARTICIPANTS,
+    "add_task": TASKS,
+    "remove_task": TASKS,
+    "toggle_task": TASKS,
+    "delete_list": TASKS,
+    "file_uploaded": FILES,
+    "file_deleted": FILES,
+    "study_update": STUDY,
+    "timer_update": STUDY,
+}
+
+
+def event_topic(message_type):
+    """Return the topic an event type belongs to, or None if it is not filtered."""
+    return EVENT_TOPICS.get(message_type)
+
+
+def parse_topics(value):
+    """
+    Parse topics given as a comma separated string or a list of names.
+    Unknown topic names are ignored.
+    """
+    if isinstance(value, str):
+        value = value.split(",")
+    return frozenset(topic.strip() for topic in value or ()) & TOPICS
+
+
+def initial_topics(scope):
+    """
+    Return the topics a socket starts subscribed to: those in its "topics"
+    query string parameter, the route's default topics, or else every topic.
+    """
+    query = parse_qs(scope.get("query_string", b"").decode(), keep_blank_values=True)
+    if "topics" in query:
+        return set(parse_topics(",".join(query["topics"])))
+    default = scope.get("url_route", {}).get("kwargs", {}).get("topics")
+    if default is not None:
+        return set(parse_topics(default))
+    return set(TOPICS)
@@ -0,0 +1,86 @@
+"""
+Server-side throttling of typing indicators.
+
+The chat box sends a typing event on every keystroke. The TypingThrottle
+relays at most one typing event per sender per room every
+ROOM_TYPING_INTERVAL seconds, and once a sender has been quiet for
+ROOM_TYPING_EXPIRY seconds a typing_stopped event is sent so clients can
+clear the indicator.
+"""
+
+import asyncio
+from django.conf import settings
+
+
+class TypingState:
+    """When a sender's typing was last relayed, and their pending expiry."""
+
+    def __init__(self):
+        self.last_relayed = None
+        self.expiry = None
+
+
+class TypingThrottle:
+    """Tracks who is typing in each room. Only used from the event loop."""
+
+    def __init__(self, interval=None, expiry=None):
+        self._interval = interval
+        self._expiry = expiry
+        self._senders = {}
+
+    @property
+    def interval(self):
+        if self._interval is not None:
+            return self._interval
+        return getattr(settings, "ROOM_TYPING_INTERVAL", 1.0)
+
+    @property
+    def expiry(self):
+        if self._expiry is not None:
+            return self._expiry
+        return getattr(settings, "ROOM_TYPING_EXPIRY", 3.0)
+
+    def typing(self, room_code, sender, on_expired):
+        """
+        Record a typing event from `sender`. Returns True if it should be relayed
+        to the room. `on_expired` is a coroutine function called once the sender
+        has stopped typing.
+        """
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+
+        key = (room_code, sender)
+        state = self._senders.get(key)
+        if state is None:
+            state = self._senders[key] = TypingState()
+
+        relay = state.last_relayed is None or now - state.last_relayed >= self.interval
+        if relay:
+            state.last_relayed = now
+
+        if state.expiry is not None:
+            state.expiry.cancel()
+        state.expiry = loop.call_later(self.expiry, self._expire, key, on_expired)
+        return relay
+
+    def stop(self, room_code, sender):
+        """
+        Forget `sender` before their typing expires, e.g. when their socket closes.
+        Returns True if they were typing.
+        """
+        state = self._senders.pop((room_code, sender), None)
+        if state is None:
+            return False
+        if state.expiry is not None:
+            state.expiry.cancel()
+        return True
+
+    def is_typing(self, room_code, sender):
+        return (room_code, sender) in self._senders
+
+    def _expire(self, key, on_expired):
+        self._senders.pop(key, None)
+        asyncio.ensure_future(on_expired())
+
+
+typing_throttle = TypingThrottle()
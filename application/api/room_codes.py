@@ -0,0 +1,137 @@
+"""
+Collision-free allocation of study room codes.
+
+Codes are a keyed permutation of a counter: every room gets the next number
+of a sequence, which a Feistel network keyed with a secret shuffles over all
+36^8 codes before it is written out in base 36. Distinct numbers always give
+distinct codes, so no code is ever looked up, and without the key
+consecutive rooms get codes that look random and cannot be guessed from each
+other.
+
+Processes reserve numbers from the RoomCodeSequence row in blocks of
+ROOM_CODE_BLOCK_SIZE, so the database is only touched once per block.
+
+Rooms created before this allocator drew random codes, which it does not
+know about. A new code could in principle collide with one of them, but only
+about one in 2.8e12 codes would, and rooms are destroyed once they are
+empty, so the old codes drain away.
+"""
+
+import hashlib
+import string
+import threading
+from django.conf import settings
+from django.db import connection, transaction
+from .models.room_code_sequence import RoomCodeSequence
+
+ALPHABET = string.ascii_uppercase + string.digits
+CODE_LENGTH = 8
+# Number of distinct room codes
+CODE_SPACE = len(ALPHABET) ** CODE_LENGTH
+# The permutation runs on 42-bit numbers, the smallest even width covering CODE_SPACE,
+# and is applied again to the few results outside it (cycle walking)
+HALF_BITS = 21
+HALF_MASK = (1 << HALF_BITS) - 1
+ROUNDS = 8
+
+
+def keyed_hash(key):
+    """The round function of the permutation for a key, copied for every round."""
+    return hashlib.blake2b(digest_size=4, key=key)
+
+
+def permute(number, hasher):
+    """Map a number below CODE_SPACE onto another one, one-to-one for a given keyed_hash."""
+    value = number
+    while True:
+        left, right = value >> HALF_BITS, value & HALF_MASK
+        for round_number in range(ROUNDS):
+            digest = hasher.copy()
+            digest.update(bytes((round_number,)) + right.to_bytes(3, "big"))
+            left, right = right, left ^ (int.from_bytes(digest.digest(), "big") & HALF_MASK)
+        value = (left << HALF_BITS) | right
+        if value < CODE_SPACE:
+            return value
+
+
+def encode(value):
+    """Write a number below CODE_SPACE as an 8-character code."""
+    characters = []
+    for _ in range(CODE_LENGTH):
+        value, digit = divmod(value, len(ALPHABET))
+        characters.append(ALPHABET[digit])
+    return "".join(reversed(characters))
+
+
+class CodeBlock:
+    """A range of reserved numbers and the keyed round function they are permuted with."""
+
+    def __init__(self, key, start, end):
+        self.hasher = keyed_hash(key)
+        self.next = start
+        self.end = end
+
+    def take(self):
+        number = self.next
+        self.next += 1
+        return number
+
+    @property
+    def exhausted(self):
+        return self.next >= self.end
+
+
+class RoomCodeAllocator:
+    """Hands out room codes from blocks of the shared sequence."""
+
+    def __init__(self, block_size=None):
+        self._block_size = block_size
+        self._block = None
+        self._lock = threading.Lock()
+
+    @property
+    def block_size(self):
+        if self._block_size is not None:
+            return self._block_size
+        return getattr(settings, "ROOM_CODE_BLOCK_SIZE", 1000)
+
+    def allocate(self):
+        """Return a room code no other room has been given."""
+        with self._lock:
+            if self._block is not None and not self._block.exhausted:
+                return encode(permute(self._block.take(), self._block.hasher))
+
+        in_transaction = connection.in_atomic_block
+        block = self._reserve()
+        code = encode(permute(block.take(), block.hasher))
+        if in_transaction:
+            # If the caller's transaction rolls back, so does the reservation, and the
+            # rest of the block could be reserved again by another process
+            transaction.on_commit(lambda: self._keep(block))
+        else:
+            self._keep(block)
+        return code
+
+    def reset(self):
+        """Forget the block reserved by this process."""
+        with self._lock:
+            self._block = None
+
+    def _reserve(self):
+        with transaction.atomic():
+            sequence, _ = RoomCodeSequence.objects.select_for_update().get_or_create(pk=1)
+            start = sequence.next_value
+            end = min(start + self.block_size, CODE_SPACE)
+            if start >= end:
+                raise RuntimeError("Every room code has been allocated")
+            sequence.next_value = end
+            sequence.save(update_fields=["next_value"])
+        return CodeBlock(bytes.fromhex(sequence.key), start, end)
+
+    def _keep(self, block):
+        with self._lock:
+            if self._block is None or self._block.exhausted:
+                self._block = block
+
+
+room_codes = RoomCodeAllocator()
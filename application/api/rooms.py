@@ -0,0 +1,216 @@
+"""
+Room membership service for group study rooms.
+
+create, join and leave make the whole change in one atomic transaction with a
+small fixed number of queries, whatever room the user was in before. A user
+is in at most one room, so joining or creating a room also switches the user
+out of their previous rooms, closing their sessions there. The caller is
+given the new participants of every room that changed and the rooms that
+were left empty. The participants changes, and the rooms left empty, are
+recorded in the notification outbox in the same transaction, to be sent once
+it commits.
+
+Empty rooms are not torn down by the request that emptied them. They are
+marked with the time they emptied, and reap_empty deletes the rooms that
+stayed empty for a grace period, along with their shared lists and sessions,
+a batch at a time. Joining a room during its grace period keeps it.
+"""
+
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import Case, F, Q, Value, When
+from django.utils.timezone import now
+from .models import List, Permission, SessionUser, StudyInterval, StudySession, Task, User
+from .realtime import notification_outbox, participants_change, room_forget
+
+Participant = StudySession.participants.through
+
+
+class RoomChange:
+    """The outcome of a membership change."""
+
+    def __init__(self, room):
+        self.room = room
+        # Room code to the usernames of its participants after the change
+        self.participants = {}
+        # Room code to the usernames that left it
+        self.left = {}
+        # Rooms the user left that have no participants any more
+        self.emptied = []
+        # False when leaving a room the user had no open session in
+        self.had_session = True
+
+
+def create(user, session_name):
+    """Create a room and move the user into it."""
+    with transaction.atomic():
+        room = StudySession.objects.create(createdBy=user, sessionName=session_name)
+        change = RoomChange(room)
+        _enter(user, room, change)
+        _fetch_participants(change, change.emptied)
+        mark_empty(change.emptied)
+        change.participants[room.roomCode] = [user.username]
+        _record_change(change)
+        return change
+
+
+def join(user, room_code):
+    """
+    Move the user into an existing room, out of any room they were in.
+    Raises StudySession.DoesNotExist if there is no room with that code.
+    """
+    with transaction.atomic():
+        room = StudySession.objects.select_for_update().get(roomCode=room_code)
+        change = RoomChange(room)
+        if room.emptied_at is not None:
+            # Rejoined during its grace period, so the room is kept
+            StudySession.objects.filter(pk=room.pk).update(emptied_at=None)
+            room.emptied_at = None
+        _enter(user, room, change)
+        _fetch_participants(change, [room] + change.emptied)
+        mark_empty(change.emptied)
+        _record_change(change, joined=[user.username])
+        return change
+
+
+def leave(user, room_code):
+    """
+    Take the user out of a room, closing their session in it.
+    Raises StudySession.DoesNotExist if there is no room with that code.
+    """
+    with transaction.atomic():
+        room = StudySession.objects.select_for_update().get(roomCode=room_code)
+        change = RoomChange(room)
+        Participant.objects.filter(studysession_id=room.pk, user_id=user.pk).delete()
+
+        sessions = list(SessionUser.objects.select_for_update().filter(user=user, session=room))
+        for session_user in sessions:
+            session_user.session = room
+        change.had_session = bool(sessions)
+        _close_sessions(user, sessions, study_day=False)
+        change.left[room.roomCode] = [user.username]
+
+        _fetch_participants(change, [room])
+        if not change.participants[room.roomCode]:
+            change.emptied.append(room)
+            mark_empty(change.emptied)
+        _record_change(change)
+        return change
+
+
+def mark_empty(rooms):
+    """Record that the given rooms have just been left empty, unless they already were."""
+    if not rooms:
+        return
+    emptied_at = now()
+    StudySession.objects.filter(pk__in=[room.pk for room in rooms], emptied_at__isnull=True).update(
+        emptied_at=emptied_at
+    )
+    for room in rooms:
+        room.emptied_at = room.emptied_at or emptied_at
+
+
+def reap_empty(cutoff, batch_size):
+    """
+    Delete a batch of rooms that have had no participants since before cutoff,
+    with their shared to-do lists, tasks, permissions and sessions.
+    Rooms emptied before they were marked count from when they started.
+    Returns the codes of the rooms deleted.
+    """
+    with transaction.atomic():
+        reaped = list(
+            StudySession.objects.select_for_update()
+            .filter(Q(emptied_at__lte=cutoff) | Q(emptied_at__isnull=True, startTime__lte=cutoff))
+            .exclude(pk__in=Participant.objects.values("studysession_id"))
+            .order_by("pk")
+            .values_list("pk", "roomCode", "Task_id")[:batch_size]
+        )
+        if not reaped:
+            return []
+        room_ids = [room_id for room_id, _, _ in reaped]
+        list_ids = [list_id for _, _, list_id in reaped if list_id is not None]
+
+        SessionUser.objects.filter(session_id__in=room_ids).delete()
+        StudySession.objects.filter(pk__in=room_ids).delete()
+        Task.objects.filter(list_id__in=list_ids).delete()
+        Permission.objects.filter(list_id__in=list_ids).delete()
+        List.objects.filter(pk__in=list_ids).delete()
+        return [room_code for _, room_code, _ in reaped]
+
+
+def _enter(user, room, change):
+    """Close the user's sessions, switch their membership to `room` and open a session there."""
+    sessions = list(SessionUser.objects.select_for_update(of=("self",)).filter(user=user).select_related("session"))
+    memberships = list(
+        Participant.objects.filter(user_id=user.pk).exclude(studysession_id=room.pk).select_related("studysession")
+    )
+    if memberships:
+        Participant.objects.filter(pk__in=[membership.pk for membership in memberships]).delete()
+        for membership in memberships:
+            change.left[membership.studysession.roomCode] = [user.username]
+            # Only kept if the room turns out to be empty
+            change.emptied.append(membership.studysession)
+
+    join_sequence = max((s.join_sequence for s in sessions if s.session_id == room.pk), default=0) + 1
+    _close_sessions(user, sessions, study_day=True)
+
+    Participant.objects.bulk_create([Participant(studysession_id=room.pk, user_id=user.pk)], ignore_conflicts=True)
+    SessionUser.objects.create(user=user, session=room, join_sequence=join_sequence)
+
+
+def _close_sessions(user, sessions, study_day):
+    """
+    Delete the given sessions, recording their study time in the ledger, and
+    credit it to the user along with their streak if they are studying today,
+    in one UPDATE.
+    """
+    current_time = now()
+    intervals = StudyInterval.record(sessions, current_time)
+    if sessions:
+        SessionUser.objects.filter(pk__in=[session_user.pk for session_user in sessions]).delete()
+
+    updates = {}
+    if intervals:
+        updates.update(StudyInterval.credit(user, intervals))
+    if study_day:
+        today = current_time.date()
+        yesterday = today - timedelta(days=1)
+        updates["streaks"] = Case(
+            When(last_study_date=today, then=F("streaks")),
+            When(last_study_date=yesterday, then=F("streaks") + 1),
+            default=Value(1),
+        )
+        updates["last_study_date"] = Value(today)
+        if user.last_study_date != today:
+            user.streaks = user.streaks + 1 if user.last_study_date == yesterday else 1
+            user.last_study_date = today
+    if updates:
+        User.objects.filter(pk=user.pk).update(**updates)
+
+
+def _record_change(change, joined=()):
+    """
+    Record the participants change of every room in the outbox, `joined` being
+    who joined change.room, followed by the rooms left empty.
+    """
+    notification_outbox.record([
+        participants_change(
+            room_code, participants,
+            joined=joined if room_code == change.room.roomCode else (),
+            left=change.left.get(room_code, ()),
+        )
+        for room_code, participants in change.participants.items()
+    ] + [room_forget(room.roomCode) for room in change.emptied])
+
+
+def _fetch_participants(change, rooms):
+    """Read the participants of the given rooms in one query, dropping rooms that are not empty from change.emptied."""
+    participants = {room.pk: [] for room in rooms}
+    rows = Participant.objects.filter(studysession_id__in=list(participants)).values_list(
+        "studysession_id", "user__username"
+    ).order_by("pk")
+    for room_id, username in rows:
+        participants[room_id].append(username)
+    for room in rooms:
+        change.participants[room.roomCode] = participants[room.pk]
+    change.emptied = [room for room in change.emptied if not participants.get(room.pk)]
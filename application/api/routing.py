@@ -7,6 +7,8 @@ for different functionalities such as chat rooms and to-do lists.
 
 Each route includes a `room_code` parameter to identify the specific study room 
 and ensures that users are connected to the correct WebSocket channel.
+Clients should open a single `ws/room/` socket and choose topics on it; the
+`ws/todolist/` route is kept for older clients and only carries task events.
 
 Django Channels uses these routes to manage WebSocket connections asynchronously.
 """
@@ -16,5 +18,5 @@ from . import consumers
 
 websocket_urlpatterns = [
     re_path(r"ws/room/(?P<room_code>\w+)/$", consumers.RoomConsumer.as_asgi()),
-    re_path(r'ws/todolist/(?P<room_code>\w+)/$', consumers.RoomConsumer.as_asgi()),
+    re_path(r'ws/todolist/(?P<room_code>\w+)/$', consumers.RoomConsumer.as_asgi(), {"topics": "tasks"}),
 ]
@@ -0,0 +1,129 @@
+from datetime import timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils.timezone import localdate, now
+
+from api import rooms
+from api.models import DailyStudy, List, Permission, SessionUser, StudyInterval, StudySession, Task, User
+
+"""
+Tests for the daily study rollup and its backfill command
+"""
+
+class DailyStudyTests(TestCase):
+    fixtures = ['api/tests/fixtures/default_user.json']
+
+    def setUp(self):
+        self.user = User.objects.get(username='@alice123')
+        self.room = StudySession.objects.create(createdBy=self.user, sessionName="Room A")
+        self.other_room = StudySession.objects.create(createdBy=self.user, sessionName="Room B")
+
+    def study(self, room, minutes):
+        """Join the room, backdate the session by `minutes` and leave it."""
+        rooms.join(self.user, room.roomCode)
+        SessionUser.objects.filter(user=self.user).update(joined_at=now() - timedelta(minutes=minutes))
+        rooms.leave(self.user, room.roomCode)
+
+    def test_closing_sessions_updates_the_day(self):
+        self.study(self.room, 30)
+        self.study(self.room, 15)
+        self.study(self.other_room, 5)
+
+        day = DailyStudy.objects.get(user=self.user)
+        self.assertEqual(day.date, localdate(now() - timedelta(minutes=30)))
+        self.assertEqual((day.minutes, day.sessions, day.rooms_joined), (50, 3, 2))
+
+    def test_session_counts_towards_the_day_it_started(self):
+        started_at = now() - timedelta(days=1, minutes=10)
+        session_user = SessionUser.objects.create(user=self.user, session=self.room, joined_at=started_at)
+        session_user.leave_session()
+
+        day = DailyStudy.objects.get(user=self.user)
+        self.assertEqual(day.date, localdate(started_at))
+        self.assertEqual(day.minutes, 24 * 60 + 10)
+
+    def test_task_counts_do_not_go_negative(self):
+        today = localdate()
+        DailyStudy.add(self.user, today, tasks_completed=1)
+        DailyStudy.add(self.user, today, tasks_completed=-1)
+        DailyStudy.add(self.user, today, tasks_completed=-1)
+        self.assertEqual(DailyStudy.objects.get(user=self.user, date=today).tasks_completed, 0)
+
+    def personal_task(self, owner):
+        todo_list = List.objects.create(name="Personal")
+        Permission.objects.create(user_id=owner, list_id=todo_list)
+        return Task.objects.create(title="Task", list=todo_list)
+
+    def tasks_completed(self, user):
+        return {day.date: day.tasks_completed for day in DailyStudy.objects.filter(user=user)}
+
+    def test_completing_own_task_counts_towards_the_day(self):
+        task = self.personal_task(self.user)
+        task.toggle_completion(self.user)
+
+        task.refresh_from_db()
+        self.assertEqual((task.is_completed, task.completed_by, task.completed_at), (True, self.user, localdate()))
+        self.assertEqual(self.tasks_completed(self.user), {localdate(): 1})
+
+    def test_tasks_of_other_users_do_not_count(self):
+        task = self.personal_task(User.objects.get(username='@bob456'))
+        task.toggle_completion(self.user)
+        self.assertTrue(task.is_completed)
+        task.toggle_completion(self.user)
+
+        self.assertFalse(DailyStudy.objects.exists())
+
+    def test_room_tasks_count_for_the_room_participants(self):
+        task = Task.objects.create(title="Task", list=self.room.Task)
+        task.toggle_completion(self.user)
+        task.toggle_completion(self.user)
+        self.assertFalse(DailyStudy.objects.exists())
+
+        rooms.join(self.user, self.room.roomCode)
+        task.toggle_completion(self.user)
+        self.assertEqual(self.tasks_completed(self.user), {localdate(): 1})
+
+    def test_uncompleting_takes_back_the_day_it_was_counted_on(self):
+        task = self.personal_task(self.user)
+        task.toggle_completion(self.user)
+        yesterday = localdate() - timedelta(days=1)
+        Task.objects.filter(pk=task.pk).update(completed_at=yesterday)
+        DailyStudy.objects.filter(user=self.user).update(date=yesterday)
+
+        # Un-completed by someone else, a day later
+        task.toggle_completion(User.objects.get(username='@bob456'))
+
+        self.assertEqual(self.tasks_completed(self.user), {yesterday: 0})
+        task.refresh_from_db()
+        self.assertEqual((task.is_completed, task.completed_by, task.completed_at), (False, None, None))
+
+    def test_window(self):
+        today = localdate()
+        for offset in (0, 3, 10):
+            DailyStudy.objects.create(user=self.user, date=today - timedelta(days=offset), minutes=offset)
+        days = DailyStudy.window(self.user, today - timedelta(days=6), today)
+        self.assertEqual([day["minutes"] for day in days], [3, 0])
+
+    def test_backfill_rebuilds_from_the_ledger(self):
+        self.study(self.room, 30)
+        self.study(self.other_room, 20)
+        DailyStudy.objects.filter(user=self.user).update(minutes=0, sessions=0, rooms_joined=0, tasks_completed=4)
+
+        out = StringIO()
+        call_command("backfill_daily_study", stdout=out)
+
+        self.assertEqual(out.getvalue(), "Rebuilt 1 daily study row(s)\n")
+        day = DailyStudy.objects.get(user=self.user)
+        self.assertEqual((day.minutes, day.sessions, day.rooms_joined, day.tasks_completed), (50, 2, 2, 4))
+
+    def test_backfill_since(self):
+        StudyInterval.objects.create(
+            user=self.user, room_code=self.room.roomCode, minutes=45,
+            started_at=now() - timedelta(days=40), ended_at=now() - timedelta(days=40) + timedelta(minutes=45),
+        )
+        self.study(self.room, 10)
+        DailyStudy.objects.all().delete()
+
+        call_command("backfill_daily_study", "--since", str(localdate() - timedelta(days=7)), stdout=StringIO())
+        self.assertEqual(list(DailyStudy.objects.values_list("minutes", flat=True)), [10])
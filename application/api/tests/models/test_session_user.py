@@ -1,6 +1,6 @@
 from django.test import TestCase
 from django.utils.timezone import now
-from api.models import User, StudySession, SessionUser
+from api.models import User, StudySession, SessionUser, StudyInterval
 from django.db import connection
 from datetime import datetime, time, timedelta
 from django.test.utils import CaptureQueriesContext
@@ -136,4 +136,36 @@ class SessionUserTest(TestCase):
         session_user = SessionUser.rejoin_session(self.user, self.session)
 
         self.assertIn(self.user, self.session.participants.all())
-        self.assertTrue(SessionUser.objects.filter(pk=session_user.id).exists())
\ No newline at end of file
+        self.assertTrue(SessionUser.objects.filter(pk=session_user.id).exists())
+
+    def test_leave_session_records_minutes(self):
+        """Test that sessions shorter than an hour are credited to the minute"""
+        self.session_user.joined_at = now() - timedelta(minutes=25, seconds=30)
+        self.session_user.save()
+
+        self.session_user.leave_session()
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.minutes_studied, 25)
+        self.assertEqual(self.user.hours_studied, 3)
+        self.assertEqual(self.user.total_sessions, 4)
+        interval = StudyInterval.objects.get(user=self.user)
+        self.assertEqual((interval.room_code, interval.minutes), (self.session.roomCode, 25))
+        self.assertEqual(interval.ended_at, self.session_user.left_at)
+
+    def test_concurrent_leaves_are_both_counted(self):
+        """Test that leaving with stale copies of the user does not overwrite the other's time"""
+        other_session = StudySession.objects.create(createdBy=self.user, sessionName='Other Session')
+        SessionUser.objects.filter(pk=self.session_user.pk).update(joined_at=now() - timedelta(minutes=30))
+        SessionUser.objects.create(user=self.user, session=other_session, joined_at=now() - timedelta(minutes=40))
+
+        # Each loads its own copy of the user before either has left
+        first, second = [session_user for session_user in SessionUser.objects.select_related("user", "session").order_by("pk")]
+        first.leave_session()
+        second.leave_session()
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.minutes_studied, 70)
+        self.assertEqual(self.user.hours_studied, 4)
+        self.assertEqual(self.user.total_sessions, 5)
+        self.assertEqual(StudyInterval.objects.filter(user=self.user).count(), 2)
@@ -0,0 +1,124 @@
+import re
+from datetime import timedelta
+from django.db import connection
+from django.db.models import Q
+from django.test import TestCase
+from django.utils.timezone import localdate, now
+
+from api.models import (
+    Appointments, DailyStudy, Friends, List, Permission, SessionUser, Status, StudyInterval, StudySession, User,
+)
+
+"""
+Tests that the hot lookups are served by indexes on a large database
+"""
+
+USERS = 2000
+ROOMS = 500
+
+# A table read in full: SQLite's SCAN (of the table or of a whole index) and PostgreSQL's Seq Scan
+FULL_SCAN = re.compile(r"\bSCAN (?!CONSTANT ROW)|\bSeq Scan\b")
+# The rows read sorted after the fact, instead of read in order from an index
+SORT = re.compile(r"\bUSE TEMP B-TREE FOR ORDER BY\b|\bSort\b")
+
+
+class QueryPlanTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        started = now() - timedelta(days=60)
+        users = User.objects.bulk_create(
+            User(
+                email=f"plan{i}@example.com", firstname="Plan", lastname=str(i),
+                username=f"@plan{i}", password="!",
+            )
+            for i in range(USERS)
+        )
+        lists = List.objects.bulk_create(List(name=f"List {i}", is_shared=i < ROOMS) for i in range(USERS))
+        Permission.objects.bulk_create(
+            Permission(user_id=users[i % USERS], list_id=todo_list) for i, todo_list in enumerate(lists)
+        )
+        rooms = StudySession.objects.bulk_create(
+            StudySession(createdBy=users[i], sessionName=f"Room {i}", roomCode=f"PLAN{i:04d}", Task=lists[i])
+            for i in range(ROOMS)
+        )
+        SessionUser.objects.bulk_create(
+            SessionUser(user=user, session=rooms[i % ROOMS], joined_at=started + timedelta(minutes=i))
+            for i, user in enumerate(users)
+        )
+        Appointments.objects.bulk_create(
+            Appointments(user=users[i % USERS], name=f"Event {i}", start_date=started + timedelta(hours=i))
+            for i in range(USERS * 10)
+        )
+        Friends.objects.bulk_create(
+            Friends(
+                user1=users[i], user2=users[(i + offset) % USERS], requested_by=users[i],
+                status=Status.ACCEPTED if offset % 2 else Status.PENDING,
+            )
+            for i in range(USERS) for offset in range(1, 6)
+        )
+        StudyInterval.objects.bulk_create(
+            StudyInterval(
+                user=users[i % USERS], room_code=rooms[i % ROOMS].roomCode,
+                started_at=started + timedelta(hours=i), ended_at=started + timedelta(hours=i, minutes=30), minutes=30,
+            )
+            for i in range(USERS * 10)
+        )
+        DailyStudy.objects.bulk_create(
+            DailyStudy(user=user, date=localdate(started) + timedelta(days=day), minutes=30)
+            for user in users for day in range(10)
+        )
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+        cls.user = users[USERS // 2]
+        cls.friend = users[USERS // 2 + 1]
+        cls.room = rooms[ROOMS // 2]
+
+    def assertIndexed(self, queryset):
+        """Fail if the query reads a whole table or index, or sorts the rows it read."""
+        plan = queryset.explain()
+        scans = [line for line in plan.splitlines() if FULL_SCAN.search(line) or SORT.search(line)]
+        self.assertEqual(scans, [], f"Full scan or sort in the plan of:\n{queryset.query}\n{plan}")
+
+    def test_current_session(self):
+        self.assertIndexed(
+            SessionUser.objects.filter(user=self.user, session__endTime__isnull=True, left_at__isnull=True)
+            .order_by('-joined_at')[:1]
+        )
+
+    def test_session_heartbeat(self):
+        self.assertIndexed(
+            SessionUser.objects.filter(user=self.user, session__roomCode=self.room.roomCode, left_at__isnull=True)
+        )
+
+    def test_user_appointments(self):
+        self.assertIndexed(Appointments.objects.filter(user=self.user).order_by('start_date'))
+        self.assertIndexed(Appointments.objects.filter(
+            user=self.user, start_date__gte=now() - timedelta(days=30), start_date__lt=now()
+        ))
+
+    def test_friends_with_status(self):
+        self.assertIndexed(Friends.get_friends_with_status(self.user, Status.ACCEPTED))
+        self.assertIndexed(Friends.objects.filter(
+            (Q(user1=self.user, user2=self.friend) | Q(user1=self.friend, user2=self.user)) & Q(status=Status.ACCEPTED)
+        ))
+
+    def test_room_of_shared_list(self):
+        self.assertIndexed(StudySession.objects.filter(Task=self.room.Task_id))
+
+    def test_personal_lists(self):
+        self.assertIndexed(Permission.objects.filter(user_id=self.user))
+        self.assertIndexed(List.objects.filter(
+            id__in=Permission.objects.filter(user_id=self.user).values_list('list_id', flat=True),
+            is_shared=False,
+        ))
+
+    def test_daily_study_window(self):
+        today = localdate()
+        self.assertIndexed(DailyStudy.objects.filter(user=self.user, date__range=(today - timedelta(days=29), today)))
+
+    def test_recent_study_intervals(self):
+        self.assertIndexed(StudyInterval.objects.filter(
+            user=self.user, started_at__gte=now() - timedelta(days=1), room_code__in=[self.room.roomCode]
+        ).order_by())
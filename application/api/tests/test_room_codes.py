@@ -0,0 +1,77 @@
+from django.test import SimpleTestCase, TestCase
+
+from api.models import RoomCodeSequence, StudySession, User
+from api.room_codes import ALPHABET, CODE_SPACE, RoomCodeAllocator, encode, keyed_hash, permute, room_codes
+
+"""
+Tests for the room code allocator
+"""
+
+class PermutationTests(SimpleTestCase):
+
+    def test_codes_are_distinct(self):
+        hasher = keyed_hash(bytes(16))
+        codes = [encode(permute(number, hasher)) for number in range(20000)]
+        self.assertEqual(len(set(codes)), len(codes))
+        for code in codes[:100]:
+            self.assertEqual(len(code), 8)
+            self.assertTrue(set(code) <= set(ALPHABET))
+
+    def test_codes_depend_on_the_key(self):
+        first, second = keyed_hash(bytes(16)), keyed_hash(bytes(15) + b"\x01")
+        self.assertNotEqual(
+            [permute(number, first) for number in range(10)],
+            [permute(number, second) for number in range(10)],
+        )
+
+    def test_permutation_stays_in_the_code_space(self):
+        hasher = keyed_hash(bytes(16))
+        for number in (0, 1, CODE_SPACE - 2, CODE_SPACE - 1):
+            self.assertLess(permute(number, hasher), CODE_SPACE)
+        self.assertEqual(encode(0), "AAAAAAAA")
+        self.assertEqual(encode(CODE_SPACE - 1), "99999999")
+
+
+class RoomCodeAllocatorTests(TestCase):
+    fixtures = ['api/tests/fixtures/default_user.json']
+
+    def setUp(self):
+        self.user = User.objects.get(username='@alice123')
+        self.allocator = RoomCodeAllocator(block_size=3)
+
+    def test_block_is_reserved_once(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            codes = [self.allocator.allocate()]
+        with self.assertNumQueries(0):
+            codes += [self.allocator.allocate(), self.allocator.allocate()]
+        self.assertEqual(RoomCodeSequence.objects.get().next_value, 3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            codes.append(self.allocator.allocate())
+        self.assertEqual(RoomCodeSequence.objects.get().next_value, 6)
+        self.assertEqual(len(set(codes)), 4)
+
+    def test_block_of_a_rolled_back_transaction_is_not_kept(self):
+        with self.captureOnCommitCallbacks(execute=False):
+            first = self.allocator.allocate()
+        # The reservation was not committed, so the next code reserves a new block
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            second = self.allocator.allocate()
+        self.assertEqual(len(callbacks), 1)
+        self.assertNotEqual(first, second)
+        self.assertEqual(RoomCodeSequence.objects.get().next_value, 6)
+
+    def test_every_code_allocated(self):
+        RoomCodeSequence.objects.create(pk=1, next_value=CODE_SPACE)
+        with self.assertRaises(RuntimeError):
+            self.allocator.allocate()
+
+    def test_rooms_are_created_without_looking_codes_up(self):
+        room_codes.reset()
+        with self.captureOnCommitCallbacks(execute=True):
+            StudySession.objects.create(createdBy=self.user, sessionName="First")
+        # The to-do list and the room
+        with self.assertNumQueries(2):
+            room = StudySession.objects.create(createdBy=self.user, sessionName="Second")
+        self.assertEqual(len(room.roomCode), 8)
+        room_codes.reset()
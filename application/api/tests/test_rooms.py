@@ -0,0 +1,156 @@
+from datetime import timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils.timezone import now
+
+from api import rooms
+from api.models import List, Permission, SessionUser, StudyInterval, StudySession, Task, User
+
+"""
+Tests for the room membership service
+"""
+
+class RoomMembershipTests(TestCase):
+    fixtures = ['api/tests/fixtures/default_user.json']
+
+    def setUp(self):
+        self.alice = User.objects.get(username='@alice123')
+        self.bob = User.objects.get(username='@bob456')
+        self.room = StudySession.objects.create(createdBy=self.bob, sessionName="Bob's Room")
+        self.room.participants.add(self.bob)
+        SessionUser.objects.create(user=self.bob, session=self.room)
+
+    def participants(self, room):
+        return sorted(room.participants.values_list("username", flat=True))
+
+    def test_join(self):
+        # Room, sessions, memberships, streak, membership, session, participants, outbox event and two savepoint queries
+        with self.assertNumQueries(10):
+            change = rooms.join(self.alice, self.room.roomCode)
+
+        self.assertEqual(change.participants, {self.room.roomCode: ["@bob456", "@alice123"]})
+        self.assertEqual(self.participants(self.room), ["@alice123", "@bob456"])
+        self.assertTrue(SessionUser.objects.filter(user=self.alice, session=self.room).exists())
+        self.alice.refresh_from_db()
+        self.assertEqual(self.alice.last_study_date, now().date())
+
+    def test_join_unknown_room(self):
+        with self.assertRaises(StudySession.DoesNotExist):
+            rooms.join(self.alice, "NOROOM00")
+
+    def test_switch_room(self):
+        previous = rooms.create(self.alice, "Alice's Room").room
+        SessionUser.objects.filter(user=self.alice).update(joined_at=now() - timedelta(hours=2))
+        self.alice.refresh_from_db()
+        hours, sessions = self.alice.hours_studied, self.alice.total_sessions
+
+        # The previous membership and session are deleted, the emptied room marked, and the session recorded
+        # in the ledger (the day's rooms, the interval, and the day's rollup row and counts) in six more queries
+        with self.assertNumQueries(17):
+            change = rooms.join(self.alice, self.room.roomCode)
+
+        self.assertEqual(change.left, {previous.roomCode: ["@alice123"]})
+        self.assertEqual(change.emptied, [previous])
+        self.assertEqual(change.participants[previous.roomCode], [])
+        self.assertEqual(SessionUser.objects.filter(user=self.alice).count(), 1)
+        self.alice.refresh_from_db()
+        self.assertEqual(self.alice.hours_studied, hours + 2)
+        self.assertEqual(self.alice.total_sessions, sessions + 1)
+        self.assertEqual(StudyInterval.objects.get(user=self.alice).room_code, previous.roomCode)
+
+    def test_create(self):
+        rooms.join(self.alice, self.room.roomCode)
+        change = rooms.create(self.alice, "Alice's Room")
+
+        self.assertEqual(self.participants(change.room), ["@alice123"])
+        self.assertEqual(self.participants(self.room), ["@bob456"])
+        self.assertEqual(change.left, {self.room.roomCode: ["@alice123"]})
+        self.assertEqual(change.emptied, [])
+
+    def test_leave(self):
+        rooms.join(self.alice, self.room.roomCode)
+
+        # Room, membership, session, the day's rooms, interval, rollup row, rollup counts, session delete,
+        # user stats, participants, outbox event and two savepoint queries
+        with self.assertNumQueries(13):
+            change = rooms.leave(self.alice, self.room.roomCode)
+
+        self.assertTrue(change.had_session)
+        self.assertEqual(change.participants, {self.room.roomCode: ["@bob456"]})
+        self.assertEqual(change.emptied, [])
+        self.assertFalse(SessionUser.objects.filter(user=self.alice).exists())
+
+    def test_leave_credits_minutes(self):
+        rooms.join(self.alice, self.room.roomCode)
+        SessionUser.objects.filter(user=self.alice).update(joined_at=now() - timedelta(minutes=95))
+        self.alice.refresh_from_db()
+        hours, minutes = self.alice.hours_studied, self.alice.minutes_studied
+
+        rooms.leave(self.alice, self.room.roomCode)
+
+        self.assertEqual((self.alice.hours_studied, self.alice.minutes_studied), (hours + 1, minutes + 95))
+        self.alice.refresh_from_db()
+        self.assertEqual((self.alice.hours_studied, self.alice.minutes_studied), (hours + 1, minutes + 95))
+        self.assertEqual(StudyInterval.objects.get(user=self.alice).minutes, 95)
+
+    def test_last_to_leave_empties_the_room(self):
+        change = rooms.leave(self.bob, self.room.roomCode)
+        self.assertEqual(change.emptied, [self.room])
+        self.room.refresh_from_db()
+        self.assertIsNotNone(self.room.emptied_at)
+
+    def test_rejoining_keeps_an_empty_room(self):
+        rooms.leave(self.bob, self.room.roomCode)
+        rooms.join(self.alice, self.room.roomCode)
+        self.room.refresh_from_db()
+        self.assertIsNone(self.room.emptied_at)
+        self.assertEqual(rooms.reap_empty(now(), 10), [])
+
+    def test_leave_without_session(self):
+        change = rooms.leave(self.alice, self.room.roomCode)
+        self.assertFalse(change.had_session)
+
+
+class EmptyRoomReaperTests(TestCase):
+    fixtures = ['api/tests/fixtures/default_user.json']
+
+    def setUp(self):
+        self.alice = User.objects.get(username='@alice123')
+        self.bob = User.objects.get(username='@bob456')
+
+    def empty_room(self, minutes_ago):
+        room = rooms.create(self.alice, "Empty Room").room
+        Task.objects.create(title="Revise", content="Chapter 3", list_id=room.Task_id)
+        Permission.objects.create(list_id_id=room.Task_id, user_id=self.alice)
+        rooms.leave(self.alice, room.roomCode)
+        SessionUser.objects.create(user=self.bob, session=room, left_at=now())
+        StudySession.objects.filter(pk=room.pk).update(emptied_at=now() - timedelta(minutes=minutes_ago))
+        return room
+
+    def test_reaps_rooms_empty_past_the_grace_period(self):
+        old_rooms = [self.empty_room(minutes_ago=10) for _ in range(3)]
+        recent = self.empty_room(minutes_ago=1)
+        occupied = rooms.create(self.bob, "Bob's Room").room
+        StudySession.objects.filter(pk=occupied.pk).update(emptied_at=now() - timedelta(minutes=10))
+
+        # Rooms, sessions, then the rooms, tasks, permissions and lists with their cascades
+        with self.assertNumQueries(15):
+            reaped = rooms.reap_empty(now() - timedelta(minutes=5), batch_size=10)
+
+        self.assertEqual(reaped, [room.roomCode for room in old_rooms])
+        self.assertEqual(set(StudySession.objects.values_list("pk", flat=True)), {recent.pk, occupied.pk})
+        list_ids = [room.Task_id for room in old_rooms]
+        self.assertFalse(List.objects.filter(pk__in=list_ids).exists())
+        self.assertFalse(Task.objects.filter(list_id__in=list_ids).exists())
+        self.assertFalse(Permission.objects.filter(list_id__in=list_ids).exists())
+        self.assertFalse(SessionUser.objects.filter(session_id__in=[room.pk for room in old_rooms]).exists())
+
+    def test_reap_rooms_command(self):
+        for _ in range(3):
+            self.empty_room(minutes_ago=10)
+
+        out = StringIO()
+        call_command("reap_rooms", "--grace", "60", "--batch-size", "2", stdout=out)
+        self.assertIn("Reaped 3 empty room(s)", out.getvalue())
+        self.assertFalse(StudySession.objects.exists())
@@ -1,7 +1,12 @@
+from datetime import timedelta
 from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import localdate, now
 from rest_framework.test import APITestCase
 from rest_framework import status
 from rest_framework_simplejwt.tokens import RefreshToken
+from api.models import DailyStudy, StudyInterval
 
 User = get_user_model()
 
@@ -62,3 +67,48 @@ class AnalyticsTestCase(APITestCase):
         new_status = self.user.share_analytics
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertNotEqual(old_status, new_status)
+
+    def study_in(self, room_code, days_ago):
+        started_at = now() - timedelta(days=days_ago)
+        StudyInterval.objects.create(user=self.user, room_code=room_code, started_at=started_at,
+                                     ended_at=started_at, minutes=0)
+
+    def test_rooms_joined_counts_each_room_once(self):
+        """
+        Test that a room studied in on several days of a window counts once
+        """
+        for days_ago in (0, 2, 5):
+            self.study_in("ABCD1234", days_ago=days_ago)
+        self.study_in("EFGH5678", days_ago=12)
+        self.study_in("IJKL9012", days_ago=45)
+
+        response = self.client.get('/api/analytics/')
+        self.assertEqual(response.data["weekly"]["rooms_joined"], 1)
+        self.assertEqual(response.data["monthly"]["rooms_joined"], 2)
+
+    def test_weekly_and_monthly_study(self):
+        """
+        Test that the weekly and monthly windows and the daily chart are read from the daily rollup
+        """
+        today = localdate()
+        DailyStudy.objects.create(user=self.user, date=today, minutes=60, sessions=2, rooms_joined=1, tasks_completed=3)
+        DailyStudy.objects.create(user=self.user, date=today - timedelta(days=10), minutes=90, sessions=1, rooms_joined=1)
+        DailyStudy.objects.create(user=self.user, date=today - timedelta(days=40), minutes=500, sessions=5)
+        self.study_in("ABCD1234", days_ago=0)
+        self.study_in("EFGH5678", days_ago=10)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/analytics/')
+        # One range read of the rollup serves the windows and the chart
+        self.assertEqual(len([query for query in queries if "api_dailystudy" in query["sql"]]), 1)
+
+        self.assertEqual(response.data["weekly"], {
+            "minutes": 60, "sessions": 2, "rooms_joined": 1, "tasks_completed": 3,
+            "average_daily_minutes": round(60 / 7, 2), "average_session_minutes": 30.0,
+        })
+        self.assertEqual(response.data["monthly"]["minutes"], 150)
+        self.assertEqual(response.data["monthly"]["sessions"], 3)
+        self.assertEqual(response.data["monthly"]["average_daily_minutes"], 5.0)
+        self.assertEqual(len(response.data["daily_minutes"]), 30)
+        self.assertEqual(response.data["daily_minutes"][-1], {"date": today.strftime("%Y-%m-%d"), "minutes": 60})
+        self.assertEqual(response.data["daily_minutes"][-11]["minutes"], 90)
@@ -0,0 +1,144 @@
+from channels.layers import get_channel_layer
+from django.test import AsyncClient, TestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.models import List, SessionUser, StudySession, Task, User
+from api.realtime import notification_outbox, room_rosters
+
+"""
+Tests for the async study room and shared to-do list view functions
+"""
+
+class AsyncRoomViewsTests(TestCase):
+    fixtures = ['api/tests/fixtures/default_user.json']
+
+    def setUp(self):
+        self.user = User.objects.get(username='@alice123')
+        self.other_user = User.objects.get(username='@bob456')
+        self.study_session = StudySession.objects.create(createdBy=self.user, sessionName="Test Room")
+        self.study_session.participants.add(self.other_user)
+        self.room_code = self.study_session.roomCode
+        self.todo_list = self.study_session.Task
+        self.client = AsyncClient()
+        self.headers = {"Authorization": f"Bearer {AccessToken.for_user(self.user)}"}
+
+    def tearDown(self):
+        room_rosters.discard(self.room_code)
+
+    async def post(self, path, data):
+        return await self.client.post(path, data, content_type="application/json", headers=self.headers)
+
+    async def listen(self):
+        """Return a channel added to the room's group."""
+        channel_layer = get_channel_layer()
+        channel_name = await channel_layer.new_channel()
+        await channel_layer.group_add(f"room_{self.room_code}", channel_name)
+        return channel_layer, channel_name
+
+    async def test_requires_authentication(self):
+        response = await self.client.post("/api/async/create-room/", {}, content_type="application/json")
+        self.assertEqual(response.status_code, 401)
+        response = await self.client.post(
+            "/api/async/create-room/", {}, content_type="application/json", headers={"Authorization": "Bearer nope"}
+        )
+        self.assertEqual(response.status_code, 401)
+
+    async def test_wrong_method(self):
+        response = await self.client.get("/api/async/join-room/", headers=self.headers)
+        self.assertEqual(response.status_code, 405)
+
+    async def test_create_room(self):
+        response = await self.post("/api/async/create-room/", {"sessionName": "New Study Room"})
+        self.assertEqual(response.status_code, 200)
+        room = await StudySession.objects.aget(roomCode=response.json()["roomCode"])
+        self.assertEqual(room.sessionName, "New Study Room")
+        self.assertEqual(room.Task_id, response.json()["roomList"])
+        self.assertTrue(await room.participants.filter(pk=self.user.pk).aexists())
+
+    async def test_join_and_leave_room(self):
+        channel_layer, channel_name = await self.listen()
+
+        response = await self.post("/api/async/join-room/", {"roomCode": self.room_code})
+        self.assertEqual(response.json(), {"message": "Joined successfully!"})
+        self.assertTrue(await SessionUser.objects.filter(user=self.user, session=self.study_session).aexists())
+        self.assertEqual(await self.study_session.participants.acount(), 2)
+        # The change was recorded in the outbox, sent here as the test never commits
+        self.assertEqual(await notification_outbox.flush(channel_layer), 1)
+        message = await channel_layer.receive(channel_name)
+        self.assertEqual(message["type"], "participants_update")
+
+        response = await self.post("/api/async/leave-room/", {"roomCode": self.room_code})
+        self.assertEqual(response.json(), {"message": "Left successfully!", "username": "@alice123"})
+        self.assertFalse(await SessionUser.objects.filter(user=self.user).aexists())
+        self.assertFalse(await self.study_session.participants.filter(pk=self.user.pk).aexists())
+
+    async def test_join_missing_room(self):
+        response = await self.post("/api/async/join-room/", {"roomCode": "NOPE1234"})
+        self.assertEqual(response.status_code, 404)
+
+    async def test_leave_without_session(self):
+        response = await self.post("/api/async/leave-room/", {"roomCode": self.room_code})
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json(), {"error": "User is not in the session"})
+
+    async def test_last_participant_leaving_empties_room(self):
+        response = await self.post("/api/async/create-room/", {"sessionName": "Solo"})
+        room_code = response.json()["roomCode"]
+
+        await self.post("/api/async/leave-room/", {"roomCode": room_code})
+        room = await StudySession.objects.aget(roomCode=room_code)
+        self.assertIsNotNone(room.emptied_at)
+        self.assertTrue(await List.objects.filter(pk=room.Task_id).aexists())
+
+    async def test_get_room_details(self):
+        response = await self.client.get(
+            "/api/async/get-room-details/", {"roomCode": self.room_code}, headers=self.headers
+        )
+        self.assertEqual(response.json(), {"sessionName": "Test Room", "roomList": self.todo_list.pk})
+
+        response = await self.client.get(
+            "/api/async/get-room-details/", {"roomCode": "NOPE1234"}, headers=self.headers
+        )
+        self.assertEqual(response.status_code, 400)
+
+    async def test_shared_task_mutations_are_broadcast(self):
+        channel_layer, channel_name = await self.listen()
+
+        response = await self.post("/api/async/new_task/", {
+            "list_id": self.todo_list.pk, "title": "Revise", "content": "Chapter 3"
+        })
+        self.assertEqual(response.status_code, 200)
+        task_id = response.json()["id"]
+        self.assertEqual(response.json(), {
+            "listId": self.todo_list.pk, "id": task_id, "title": "Revise", "content": "Chapter 3", "is_completed": False
+        })
+        self.assertEqual((await channel_layer.receive(channel_name))["type"], "add_task")
+
+        response = await self.client.patch(f"/api/async/update_task/{task_id}/", headers=self.headers)
+        self.assertEqual(response.json(), {"is_completed": True})
+        self.assertTrue((await Task.objects.aget(pk=task_id)).is_completed)
+        self.assertEqual((await channel_layer.receive(channel_name))["type"], "toggle_task")
+
+        response = await self.client.delete(f"/api/async/delete_task/{task_id}/", headers=self.headers)
+        self.assertEqual(response.json(), {"data": task_id})
+        self.assertFalse(await Task.objects.filter(pk=task_id).aexists())
+        self.assertEqual((await channel_layer.receive(channel_name))["type"], "remove_task")
+
+    async def test_missing_task_and_list(self):
+        response = await self.post("/api/async/new_task/", {"list_id": 999999, "title": "Revise"})
+        self.assertEqual(response.json(), {"error": "List doesn't exist"})
+        response = await self.client.patch("/api/async/update_task/999999/", headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+        response = await self.client.delete("/api/async/delete_task/999999/", headers=self.headers)
+        self.assertEqual(response.json(), {"error": "Task doesn't exist"})
+
+    async def test_invalid_task(self):
+        response = await self.post("/api/async/new_task/", {"list_id": self.todo_list.pk, "title": "Revise"})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["error"], "Invalid request")
+
+    async def test_personal_list_is_not_broadcast(self):
+        todo_list = await List.objects.acreate(name="Mine", is_shared=False)
+        response = await self.post("/api/async/new_task/", {"list_id": todo_list.pk, "title": "Read", "content": ""})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(await Task.objects.filter(list=todo_list).acount(), 1)
@@ -0,0 +1,34 @@
+from django.test import TestCase, override_settings
+
+from api.realtime import room_metrics
+
+"""
+Tests for the realtime_metrics view function
+"""
+
+class RealtimeMetricsViewTests(TestCase):
+
+    def setUp(self):
+        self.url = '/api/realtime-metrics/'
+        room_metrics.connects.inc(result="accepted")
+
+    @override_settings(ROOM_METRICS_TOKEN="secret")
+    def test_metrics_with_token(self):
+        response = self.client.get(self.url, HTTP_AUTHORIZATION="Bearer secret")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        self.assertIn('room_connects_total{result="accepted"}', response.content.decode())
+
+    @override_settings(ROOM_METRICS_TOKEN="secret")
+    def test_wrong_token_is_forbidden(self):
+        response = self.client.get(self.url, HTTP_AUTHORIZATION="Bearer wrong")
+        self.assertEqual(response.status_code, 403)
+
+    @override_settings(ROOM_METRICS_TOKEN="secret")
+    def test_non_ascii_token_is_forbidden(self):
+        response = self.client.get(self.url, HTTP_AUTHORIZATION="Bearer sécret")
+        self.assertEqual(response.status_code, 403)
+
+    @override_settings(ROOM_METRICS_TOKEN=None, DEBUG=False)
+    def test_no_token_outside_debug_is_forbidden(self):
+        self.assertEqual(self.client.get(self.url).status_code, 403)
@@ -0,0 +1,120 @@
+import time
+from io import StringIO
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from api.models import SessionUser, StudySession, Task, User
+from api.realtime import RoomTimer, room_snapshots
+
+"""
+Tests for the get_room_snapshot view function
+"""
+
+class RoomSnapshotViewTests(TestCase):
+    fixtures = ['api/tests/fixtures/default_user.json']
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.get(username='@alice123')
+        self.other_user = User.objects.get(username='@bob456')
+        self.study_session = StudySession.objects.create(createdBy=self.user, sessionName="Test Room")
+        self.study_session.participants.add(self.user)
+        SessionUser.objects.create(user=self.user, session=self.study_session)
+        self.task = Task.objects.create(title="Revise", content="Chapter 3", list=self.study_session.Task)
+        self.room_code = self.study_session.roomCode
+        self.url = f"/api/room-snapshot/?roomCode={self.room_code}"
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_snapshot(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["sessionName"], "Test Room")
+        self.assertEqual(response.data["roomList"], self.study_session.Task_id)
+        self.assertEqual(response.data["participantsList"], [{"username": "@alice123"}])
+        self.assertEqual(response.data["tasks"], [
+            {"id": self.task.pk, "title": "Revise", "content": "Chapter 3", "is_completed": False},
+        ])
+        self.assertEqual(response.data["timer"], {"phase": "idle"})
+        self.assertAlmostEqual(response.data["server_time"], time.time(), delta=5)
+        self.assertTrue(response["ETag"].startswith('W/"'))
+
+    def test_snapshot_is_cached(self):
+        etag = self.client.get(self.url)["ETag"]
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_unchanged_room_is_not_modified(self):
+        etag = self.client.get(self.url)["ETag"]
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+        self.assertEqual(response.content, b"")
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH='W/"stale"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_not_modified_only_queries_the_authenticated_user(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(self.user).access_token}")
+        etag = client.get(self.url)["ETag"]
+        # JWT authentication loads the user, the room is read from the cache
+        with self.assertNumQueries(1):
+            response = client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_joining_invalidates_snapshot(self):
+        etag = self.client.get(self.url)["ETag"]
+        other_client = APIClient()
+        other_client.force_authenticate(user=self.other_user)
+        other_client.post("/api/join-room/", {"roomCode": self.room_code}, format="json")
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(response.data["participantsList"], [{"username": "@alice123"}, {"username": "@bob456"}])
+
+    def test_task_changes_invalidate_snapshot(self):
+        etag = self.client.get(self.url)["ETag"]
+        self.client.post("/api/new_task/", {
+            "list_id": self.study_session.Task_id, "title": "Read", "content": "Paper"
+        }, format="json")
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual([task["title"] for task in response.data["tasks"]], ["Revise", "Read"])
+
+        etag = response["ETag"]
+        self.client.patch(f"/api/update_task/{self.task.pk}/")
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertTrue(response.data["tasks"][0]["is_completed"])
+
+    def test_timer_state(self):
+        now = time.time()
+        etag = self.client.get(self.url)["ETag"]
+        state = RoomTimer(1500, 300, 4, now).state(now)
+        room_snapshots.timer_changed(self.room_code, {"type": "timer_update", **state})
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["timer"]["phase"], "study")
+        self.assertEqual(response.data["timer"]["deadline"], now + 1500)
+        self.assertNotIn("server_time", response.data["timer"])
+
+    def test_destroyed_room(self):
+        self.client.get(self.url)
+        self.client.post("/api/leave-room/", {"roomCode": self.room_code}, format="json")
+        self.assertEqual(self.client.get(self.url).data["participantsList"], [])
+
+        call_command("reap_rooms", "--grace", "0", stdout=StringIO())
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_unknown_room(self):
+        response = self.client.get("/api/room-snapshot/?roomCode=NOPE1234")
+        self.assertEqual(response.status_code, 404)
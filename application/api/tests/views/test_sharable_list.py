@@ -1,7 +1,6 @@
-from unittest.mock import patch
 from rest_framework import status
 from rest_framework.test import APITestCase, APIClient
-from api.models import User, List, Task, StudySession, SessionUser
+from api.models import User, List, Task, StudySession, SessionUser, OutboxEvent, DailyStudy
 
 class SharedListViewTestCase(APITestCase):
     fixtures = [
@@ -44,27 +43,30 @@ class SharedListViewTestCase(APITestCase):
         self.client = APIClient()
         self.client.force_authenticate(user=self.user)
     
-    @patch("api.views.to_do_list.get_channel_layer")
-    def test_delete_task_shared_list_success(self, mock_get_channel_layer):
-        mock_channel_layer = mock_get_channel_layer.return_value
+    def test_delete_task_shared_list_success(self):
         task_id = self.task.pk
 
         response = self.client.delete(f'/api/delete_task/{task_id}/')
-        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(Task.objects.filter(pk=task_id).exists())
+        event = OutboxEvent.objects.get()
+        self.assertEqual((event.room_code, event.message_type), ('ABC123', 'remove_task'))
+        self.assertEqual(event.payload, {"task_id": task_id})
 
 
     
-    @patch("api.views.to_do_list.get_channel_layer")
-    def test_create_task_shared_list_success(self, mock_get_channel_layer):
-        mock_channel_layer = mock_get_channel_layer.return_value
-
+    def test_create_task_shared_list_success(self):
         response = self.client.post('/api/new_task/', {
             "list_id": self.shared_list.pk,
             "title": "New Shared Task",
             "content": "Content"
         }, format="json")
 
-        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        event = OutboxEvent.objects.get()
+        self.assertEqual((event.room_code, event.message_type), ('ABC123', 'add_task'))
+        self.assertEqual(event.payload["task"]["id"], response.data["id"])
+        self.assertEqual(event.payload["task"]["title"], "New Shared Task")
         
 
     def test_delete_task_shared_list_no_study_session(self):
@@ -83,19 +85,25 @@ class SharedListViewTestCase(APITestCase):
         }, format="json")
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertEqual(response.data["error"], "No study session found for this list")
+        self.assertFalse(Task.objects.filter(title="New Task").exists())
 
     def test_patch_task_shared_list_no_study_session(self):
         self.study_session.delete()
         response = self.client.patch(f'/api/update_task/{self.task.pk}/')
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertEqual(response.data["error"], "No study session found for this list")
+        self.task.refresh_from_db()
+        self.assertFalse(self.task.is_completed)
+        self.assertFalse(DailyStudy.objects.exists())
 
-    @patch("api.views.to_do_list.get_channel_layer")
-    def test_patch_task_shared_list_success(self, mock_get_channel_layer):
-        mock_channel_layer = mock_get_channel_layer.return_value
+    def test_patch_task_shared_list_success(self):
         task_id = self.task.pk
 
         response = self.client.patch(f'/api/update_task/{task_id}/')
-        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        event = OutboxEvent.objects.get()
+        self.assertEqual((event.room_code, event.message_type), ('ABC123', 'toggle_task'))
+        self.assertEqual(event.payload, {"task_id": task_id, "is_completed": True})
+        self.assertEqual(DailyStudy.objects.get(user=self.user).tasks_completed, 1)
         
         
\ No newline at end of file
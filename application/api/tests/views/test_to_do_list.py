@@ -44,6 +44,34 @@ class ListViewTestCase(APITestCase):
         self.assertEqual(list_data['is_shared'], self.todo_list.is_shared)
 
 
+    def test_get_lists_query_count(self):
+        """
+        Test that the lists and their tasks are read in two queries, however many lists the user has.
+        """
+        for i in range(40):
+            todo_list = List.objects.create(name=f"Extra List {i}", is_shared=False)
+            Permission.objects.create(list_id=todo_list, user_id=self.user)
+            Task.objects.create(title=f"Task {i}", content="Content", list=todo_list)
+            Task.objects.create(title=f"Other Task {i}", content="", list=todo_list, is_completed=True)
+
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/todolists/')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 43)
+        for list_data in response.data:
+            tasks = Task.objects.filter(list_id=list_data['id']).order_by('pk')
+            self.assertEqual(list_data['tasks'], [
+                {
+                    "id": task.pk,
+                    "title": task.title,
+                    "content": task.content,
+                    "is_completed": task.is_completed,
+                    "creation_date": task.creation_date
+                }
+                for task in tasks
+            ])
+
     def test_get_lists_for_groups(self):
         """
         Test if the API correctly returns lists for an authenticated user based on permissions.
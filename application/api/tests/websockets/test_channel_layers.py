@@ -0,0 +1,79 @@
+from channels.testing import WebsocketCommunicator
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from channels.routing import URLRouter
+from channels_redis.core import RedisChannelLayer
+from django.core.exceptions import ImproperlyConfigured
+from django.urls import re_path
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from api.consumers import RoomConsumer
+from api.models import StudySession, User
+from api.realtime import group_event
+from backend.channel_layers import build_channel_layers, fake_redis_hosts
+
+"""
+Tests for the channel layer configuration, using fakeredis as a stand-in for Redis
+"""
+
+application = URLRouter([
+    re_path(r"ws/room/(?P<room_code>\w+)/$", RoomConsumer.as_asgi()),
+])
+
+
+class BuildChannelLayersTests(SimpleTestCase):
+
+    def test_memory_layer(self):
+        layers = build_channel_layers("memory", capacity=10)
+        self.assertEqual(layers["default"]["BACKEND"], "channels.layers.InMemoryChannelLayer")
+        self.assertEqual(layers["default"]["CONFIG"]["capacity"], 10)
+
+    def test_redis_layer_pool_and_expiry(self):
+        layers = build_channel_layers("redis", redis_url="redis://cache:6379/1",
+                                      max_connections=20, group_expiry=3600)
+        config = layers["default"]["CONFIG"]
+        self.assertEqual(layers["default"]["BACKEND"], "channels_redis.core.RedisChannelLayer")
+        self.assertEqual(config["hosts"], [{"address": "redis://cache:6379/1", "max_connections": 20}])
+        self.assertEqual(config["group_expiry"], 3600)
+
+    def test_redis_pubsub_layer(self):
+        layers = build_channel_layers("redis-pubsub", redis_url="redis://cache:6379/1")
+        self.assertEqual(layers["default"]["BACKEND"], "channels_redis.pubsub.RedisPubSubChannelLayer")
+
+    def test_redis_layer_requires_url(self):
+        with self.assertRaises(ImproperlyConfigured):
+            build_channel_layers("redis")
+
+    def test_unknown_layer(self):
+        with self.assertRaises(ImproperlyConfigured):
+            build_channel_layers("carrier-pigeon")
+
+
+@override_settings(CHANNEL_LAYERS=build_channel_layers("fakeredis"))
+class MultiWorkerChannelLayerTests(TestCase):
+    fixtures = [
+        'api/tests/fixtures/default_user.json'
+    ]
+
+    def setUp(self):
+        self.user = User.objects.get(username='@alice123')
+
+    async def test_group_send_from_another_worker(self):
+        study_session = await database_sync_to_async(StudySession.objects.create)(
+            createdBy=self.user, sessionName="Test Room")
+
+        communicator = WebsocketCommunicator(application, f"ws/room/{study_session.roomCode}/")
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        await communicator.receive_json_from()
+        self.assertIsInstance(get_channel_layer(), RedisChannelLayer)
+
+        # A second worker process has its own channel layer on the same Redis
+        other_worker = RedisChannelLayer(hosts=fake_redis_hosts(), prefix="studyroom")
+        event = group_event("chat_message", message="Hello from worker 2", sender="@bob456")
+        await other_worker.group_send(f"room_{study_session.roomCode}", event)
+
+        self.assertEqual(await communicator.receive_from(), event["frame"])
+
+        await communicator.disconnect()
+        await other_worker.flush()
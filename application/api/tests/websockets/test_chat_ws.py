@@ -59,6 +59,7 @@ class ChatConsumerTests(TestCase):
 
         # Receive the message
         response = await communicator.receive_json_from()
+        self.assertIsInstance(response.pop("seq"), int)
         self.assertEqual(response, {
             "type": "chat_message",
             "message": "Hello, World!",
@@ -0,0 +1,65 @@
+import json
+from channels.testing import WebsocketCommunicator
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from channels.routing import URLRouter
+from django.urls import re_path
+from django.test import SimpleTestCase, TestCase
+
+from api.consumers import RoomConsumer
+from api.models import StudySession, User
+from api.realtime import group_event, event_frame
+
+"""
+Tests for the pre-encoded frames carried by group study room events
+"""
+
+application = URLRouter([
+    re_path(r"ws/room/(?P<room_code>\w+)/$", RoomConsumer.as_asgi()),
+])
+
+
+class GroupEventTests(SimpleTestCase):
+
+    def test_frame_holds_encoded_message(self):
+        event = group_event("chat_message", message="Hello", sender="@alice123")
+        self.assertEqual(event["type"], "chat_message")
+        self.assertNotIn("message", event)
+        self.assertEqual(json.loads(event["frame"]), {
+            "type": "chat_message",
+            "message": "Hello",
+            "sender": "@alice123",
+        })
+
+    def test_keep_payload(self):
+        event = group_event("participants_update", keep_payload=True, participants=["@alice123"])
+        self.assertEqual(event["participants"], ["@alice123"])
+        self.assertEqual(event_frame(event), event["frame"])
+
+    def test_event_without_frame_is_encoded(self):
+        event = {"type": "remove_task", "task_id": 3}
+        self.assertEqual(json.loads(event_frame(event)), event)
+
+
+class GroupEventConsumerTests(TestCase):
+    fixtures = [
+        'api/tests/fixtures/default_user.json'
+    ]
+
+    def setUp(self):
+        self.user = User.objects.get(username='@alice123')
+
+    async def test_frame_is_forwarded_unchanged(self):
+        study_session = await database_sync_to_async(StudySession.objects.create)(
+            createdBy=self.user, sessionName="Test Room")
+
+        communicator = WebsocketCommunicator(application, f"ws/room/{study_session.roomCode}/")
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        await communicator.receive_json_from()
+
+        event = group_event("toggle_task", task_id=1, is_completed=True)
+        await get_channel_layer().group_send(f"room_{study_session.roomCode}", event)
+        self.assertEqual(await communicator.receive_from(), event["frame"])
+
+        await communicator.disconnect()
@@ -0,0 +1,28 @@
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+
+from api.models import List, StudySession, Task, User
+
+"""
+Smoke test for the loadtest_rooms websocket load testing command
+"""
+
+
+class LoadTestRoomsCommandTests(TestCase):
+
+    def test_reports_and_cleans_up(self):
+        out = StringIO()
+        call_command("loadtest_rooms", rooms=2, clients=3, duration=0.5, chat_rate=20,
+                     typing_rate=0, study_rate=0, file_rate=0, seed=1, stdout=out)
+
+        report = out.getvalue()
+        self.assertIn("2 x 3 (6 connections)", report)
+        self.assertIn("Fan-out latency p50", report)
+        self.assertIn("Fan-out latency p99", report)
+        self.assertIn("Memory per connection", report)
+
+        self.assertFalse(StudySession.objects.exists())
+        self.assertFalse(List.objects.exists())
+        self.assertFalse(Task.objects.exists())
+        self.assertFalse(User.objects.filter(username__startswith="@loadtest_").exists())
@@ -0,0 +1,87 @@
+import msgpack
+from channels.testing import WebsocketCommunicator
+from channels.db import database_sync_to_async
+from channels.routing import URLRouter
+from django.urls import re_path
+from django.test import SimpleTestCase, TestCase
+
+from api.consumers import RoomConsumer
+from api.models import StudySession, User
+from api.realtime import group_event, pack_frame, decode_message
+
+"""
+Tests for the optional msgpack wire protocol of the group study room websockets
+"""
+
+application = URLRouter([
+    re_path(r"ws/room/(?P<room_code>\w+)/$", RoomConsumer.as_asgi()),
+])
+
+
+class MsgpackFrameTests(SimpleTestCase):
+
+    def test_pack_frame(self):
+        event = group_event("chat_message", message="Hello", sender="@alice123")
+        self.assertEqual(msgpack.unpackb(pack_frame(event["frame"])), {
+            "type": "chat_message",
+            "message": "Hello",
+            "sender": "@alice123",
+        })
+
+    def test_decode_message(self):
+        message = {"type": "typing", "sender": "@alice123"}
+        self.assertEqual(decode_message(bytes_data=msgpack.packb(message)), message)
+        self.assertEqual(decode_message(text_data='{"type": "typing", "sender": "@alice123"}'), message)
+
+
+class MsgpackConsumerTests(TestCase):
+    fixtures = [
+        'api/tests/fixtures/default_user.json'
+    ]
+
+    def setUp(self):
+        self.user = User.objects.get(username='@alice123')
+
+    async def test_msgpack_subprotocol(self):
+        study_session = await database_sync_to_async(StudySession.objects.create)(
+            createdBy=self.user, sessionName="Test Room")
+        await database_sync_to_async(study_session.participants.add)(self.user)
+
+        communicator = WebsocketCommunicator(
+            application, f"ws/room/{study_session.roomCode}/", subprotocols=["msgpack"])
+        connected, subprotocol = await communicator.connect()
+        self.assertTrue(connected)
+        self.assertEqual(subprotocol, "msgpack")
+
+        response = msgpack.unpackb(await communicator.receive_from())
+        self.assertEqual(response, {"type": "participants_update", "participants": ["@alice123"]})
+
+        await communicator.send_to(bytes_data=msgpack.packb({
+            "type": "chat_message",
+            "message": "Hello, World!",
+            "sender": "@alice123",
+        }))
+        response = msgpack.unpackb(await communicator.receive_from())
+        self.assertIsInstance(response.pop("seq"), int)
+        self.assertEqual(response, {
+            "type": "chat_message",
+            "message": "Hello, World!",
+            "sender": "@alice123",
+        })
+
+        await communicator.disconnect()
+
+    async def test_json_remains_default(self):
+        study_session = await database_sync_to_async(StudySession.objects.create)(
+            createdBy=self.user, sessionName="Test Room")
+
+        communicator = WebsocketCommunicator(application, f"ws/room/{study_session.roomCode}/")
+        connected, subprotocol = await communicator.connect()
+        self.assertTrue(connected)
+        self.assertIsNone(subprotocol)
+        self.assertEqual(await communicator.receive_json_from(), {
+            "type": "participants_update",
+            "participants": [],
+        })
+
+        await communicator.disconnect()
@@ -0,0 +1,132 @@
+import asyncio
+from unittest import mock
+from channels.testing import WebsocketCommunicator
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from channels.routing import URLRouter
+from django.urls import re_path
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from api.consumers import RoomConsumer
+from api.models import StudySession, User
+from api.realtime import OutboundQueue, group_event, room_metrics
+
+"""
+Tests for the bounded outbound queues of group study room websockets
+"""
+
+
+class StalledRoomConsumer(RoomConsumer):
+    """RoomConsumer whose socket writes wait until the test releases them."""
+
+    released = None
+
+    async def send(self, text_data=None, bytes_data=None, close=False):
+        await self.released.wait()
+        await super().send(text_data=text_data, bytes_data=bytes_data, close=close)
+
+
+application = URLRouter([
+    re_path(r"ws/room/(?P<room_code>\w+)/$", StalledRoomConsumer.as_asgi()),
+])
+
+
+class OutboundQueueTests(SimpleTestCase):
+
+    async def test_frames_are_written_in_order(self):
+        queue = OutboundQueue(size=4, max_lag=10)
+        queue.put("first")
+        queue.put("second")
+        self.assertEqual(await queue.get(), "first")
+        self.assertEqual(await queue.get(), "second")
+        self.assertEqual(len(queue), 0)
+
+    async def test_get_waits_for_a_frame(self):
+        queue = OutboundQueue(size=4, max_lag=10)
+        getter = asyncio.ensure_future(queue.get())
+        await asyncio.sleep(0)
+        self.assertFalse(getter.done())
+        queue.put("frame")
+        self.assertEqual(await getter, "frame")
+
+    async def test_keyed_frames_are_coalesced_in_place(self):
+        queue = OutboundQueue(size=4, max_lag=10)
+        queue.put("participants 1", key="participants")
+        queue.put("chat")
+        queue.put("participants 2", key="participants")
+        self.assertTrue(queue.pending("participants"))
+        self.assertEqual(queue.coalesced, 1)
+        self.assertEqual(await queue.get(), "participants 2")
+        self.assertEqual(await queue.get(), "chat")
+
+    def test_droppable_frames_are_dropped_when_full(self):
+        queue = OutboundQueue(size=2, max_lag=10)
+        self.assertTrue(queue.put("typing", key=("typing", "@bob456"), droppable=True))
+        self.assertTrue(queue.put("chat 1"))
+        self.assertTrue(queue.put("chat 2"))
+        self.assertFalse(queue.pending(("typing", "@bob456")))
+
+        # Only frames that must be kept are left
+        self.assertTrue(queue.put("typing", key=("typing", "@john789"), droppable=True))
+        self.assertEqual(queue.dropped, 2)
+        self.assertEqual(len(queue), 2)
+        self.assertFalse(queue.put("chat 3"))
+
+    def test_lagging_queue(self):
+        queue = OutboundQueue(size=4, max_lag=10)
+        with mock.patch("api.realtime.outbound.time.monotonic", return_value=100.0):
+            self.assertTrue(queue.put("chat 1"))
+        with mock.patch("api.realtime.outbound.time.monotonic", return_value=111.0):
+            self.assertEqual(queue.lag(), 11.0)
+            self.assertFalse(queue.put("chat 2"))
+
+
+class SlowClientTests(TestCase):
+    fixtures = [
+        'api/tests/fixtures/default_user.json'
+    ]
+
+    def setUp(self):
+        self.user = User.objects.get(username='@alice123')
+
+    async def connect_stalled(self):
+        StalledRoomConsumer.released = asyncio.Event()
+        study_session = await database_sync_to_async(StudySession.objects.create)(
+            createdBy=self.user, sessionName="Test Room")
+        await database_sync_to_async(study_session.participants.add)(self.user)
+        communicator = WebsocketCommunicator(application, f"ws/room/{study_session.roomCode}/")
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        return communicator, f"room_{study_session.roomCode}"
+
+    @override_settings(ROOM_OUTBOUND_QUEUE_SIZE=2)
+    async def test_typing_is_coalesced_for_slow_clients(self):
+        communicator, group = await self.connect_stalled()
+        channel_layer = get_channel_layer()
+        await asyncio.sleep(0.1)
+
+        for sender in ["@bob456", "@bob456", "@john789", "@bob456"]:
+            await channel_layer.group_send(group, group_event("typing", keep_payload=True, sender=sender))
+        await channel_layer.group_send(group, group_event("chat_message", message="Hello", sender="@bob456"))
+        self.assertTrue(await communicator.receive_nothing())
+
+        StalledRoomConsumer.released.set()
+        self.assertEqual((await communicator.receive_json_from())["type"], "participants_update")
+        self.assertEqual(await communicator.receive_json_from(), {"type": "typing", "sender": "@john789"})
+        self.assertEqual((await communicator.receive_json_from())["type"], "chat_message")
+        await communicator.disconnect()
+
+    @override_settings(ROOM_OUTBOUND_QUEUE_SIZE=2)
+    async def test_slow_client_is_disconnected(self):
+        communicator, group = await self.connect_stalled()
+        channel_layer = get_channel_layer()
+        disconnected = room_metrics.lagging_disconnects.value()
+        await asyncio.sleep(0.1)
+
+        for number in range(3):
+            await channel_layer.group_send(group, group_event(
+                "chat_message", message=f"Message {number}", sender="@bob456"))
+
+        self.assertEqual(await communicator.receive_output(), {"type": "websocket.close", "code": 4008})
+        self.assertEqual(room_metrics.lagging_disconnects.value(), disconnected + 1)
+        await communicator.disconnect()
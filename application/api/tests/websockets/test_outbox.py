@@ -0,0 +1,143 @@
+import json
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import AsyncMock, MagicMock, patch
+from django.core.management import CommandError, call_command
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.utils.timezone import now
+
+from api.models import OutboxEvent
+from api.realtime import NotificationOutbox, notification_outbox, room_events
+
+"""
+Tests for the transactional notification outbox
+"""
+
+class NotificationOutboxTests(TestCase):
+
+    def setUp(self):
+        self.channel_layer = MagicMock()
+        self.channel_layer.group_send = AsyncMock()
+
+    def tearDown(self):
+        for room_code in ("ROOM0001", "ROOM0002"):
+            room_events.discard(room_code)
+
+    def sent(self):
+        """(group, message type, payload) of each message sent to a room group, in order."""
+        sent = []
+        for (group, event), _ in self.channel_layer.group_send.await_args_list:
+            message = json.loads(event["frame"])
+            sent.append((group, message.pop("type"), {k: v for k, v in message.items() if k != "seq"}))
+        return sent
+
+    def test_events_are_recorded_with_the_change(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            with transaction.atomic():
+                notification_outbox.publish("ROOM0001", "remove_task", task_id=1)
+                self.assertEqual(OutboxEvent.objects.count(), 1)
+        self.assertEqual(len(callbacks), 1)
+
+    def test_rolled_back_events_are_never_sent(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            with self.assertRaises(RuntimeError):
+                with transaction.atomic():
+                    notification_outbox.publish("ROOM0001", "remove_task", task_id=1)
+                    raise RuntimeError("rolled back")
+        self.assertEqual(callbacks, [])
+        self.assertFalse(OutboxEvent.objects.exists())
+
+    async def test_flush_sends_events_in_order(self):
+        outbox = NotificationOutbox(batch_size=2)
+        for task_id in range(3):
+            await OutboxEvent.objects.acreate(room_code="ROOM0001", message_type="remove_task", payload={"task_id": task_id})
+        await OutboxEvent.objects.acreate(room_code="ROOM0002", message_type="toggle_task", payload={"task_id": 9})
+
+        self.assertEqual(await outbox.flush(self.channel_layer), 4)
+        sent = self.sent()
+        self.assertEqual([message for message in sent if message[0] == "room_ROOM0001"], [
+            ("room_ROOM0001", "remove_task", {"task_id": 0}),
+            ("room_ROOM0001", "remove_task", {"task_id": 1}),
+            ("room_ROOM0001", "remove_task", {"task_id": 2}),
+        ])
+        self.assertIn(("room_ROOM0002", "toggle_task", {"task_id": 9}), sent)
+        self.assertFalse(await OutboxEvent.objects.aexists())
+        self.assertEqual(await outbox.flush(self.channel_layer), 0)
+
+    @override_settings(ROOM_PARTICIPANTS_DELTAS=True)
+    async def test_participants_changes_are_sent_in_order_with_other_events(self):
+        outbox = NotificationOutbox()
+        await OutboxEvent.objects.acreate(room_code="ROOM0001", message_type="add_task", payload={"task_id": 1})
+        await OutboxEvent.objects.acreate(room_code="ROOM0001", message_type="participants_change",
+                                          payload={"participants": ["@bob456"], "joined": ["@bob456"], "left": []})
+        await OutboxEvent.objects.acreate(room_code="ROOM0001", message_type="remove_task", payload={"task_id": 1})
+        await OutboxEvent.objects.acreate(room_code="ROOM0001", message_type="participants_change",
+                                          payload={"participants": [], "joined": [], "left": ["@bob456"]})
+
+        self.assertEqual(await outbox.flush(self.channel_layer), 4)
+        self.assertEqual([message_type for _, message_type, _ in self.sent()],
+                         ["add_task", "participants_delta", "remove_task", "participants_delta"])
+
+    async def test_failed_events_are_kept_and_retried_in_order(self):
+        outbox = NotificationOutbox()
+        for task_id in range(3):
+            await OutboxEvent.objects.acreate(room_code="ROOM0001", message_type="remove_task", payload={"task_id": task_id})
+        self.channel_layer.group_send.side_effect = [None, RuntimeError("channel layer down")]
+
+        with self.assertRaises(RuntimeError):
+            await outbox.flush(self.channel_layer)
+        remaining = [event async for event in OutboxEvent.objects.order_by("pk")]
+        self.assertEqual([event.payload["task_id"] for event in remaining], [1, 2])
+        self.assertEqual([event.claimed_until for event in remaining], [None, None])
+
+        self.channel_layer.group_send.reset_mock(side_effect=True)
+        self.assertEqual(await outbox.flush(self.channel_layer), 2)
+        self.assertEqual([payload for _, _, payload in self.sent()], [{"task_id": 1}, {"task_id": 2}])
+        self.assertFalse(await OutboxEvent.objects.aexists())
+
+    async def test_rooms_left_empty_are_forgotten_after_their_events(self):
+        outbox = NotificationOutbox()
+        await OutboxEvent.objects.acreate(room_code="ROOM0001", message_type="remove_task", payload={"task_id": 1})
+        await OutboxEvent.objects.acreate(room_code="ROOM0001", message_type="room_forget", payload={})
+
+        self.assertEqual(await outbox.flush(self.channel_layer), 2)
+        self.assertEqual(self.sent(), [("room_ROOM0001", "remove_task", {"task_id": 1})])
+        # The room's log is gone, so the event sent before can no longer be resumed from
+        (_, event), _ = self.channel_layer.group_send.await_args
+        self.assertIsNone(room_events.replay("ROOM0001", json.loads(event["frame"])["seq"] - 1)[1])
+
+    def test_claimed_events_are_held_until_their_lease_expires(self):
+        outbox = NotificationOutbox()
+        event = OutboxEvent.objects.create(room_code="ROOM0001", message_type="remove_task", payload={"task_id": 1})
+
+        self.assertEqual(outbox._claim(), [event])
+        self.assertEqual(outbox._claim(), [])
+
+        # A dispatcher that died holding the event no longer keeps it from being sent
+        OutboxEvent.objects.update(claimed_until=now() - timedelta(seconds=1))
+        self.assertEqual(outbox._claim(), [event])
+
+    def test_commit_without_event_loop_sends_before_returning(self):
+        outbox = NotificationOutbox()
+        with patch("api.realtime.outbox.get_channel_layer", return_value=self.channel_layer):
+            with self.captureOnCommitCallbacks(execute=True):
+                outbox.publish("ROOM0001", "toggle_task", task_id=1, is_completed=True)
+        self.assertEqual(self.sent(), [("room_ROOM0001", "toggle_task", {"task_id": 1, "is_completed": True})])
+        self.assertFalse(OutboxEvent.objects.exists())
+
+    def test_dispatch_outbox_command(self):
+        OutboxEvent.objects.create(room_code="ROOM0001", message_type="remove_task", payload={"task_id": 1})
+        out = StringIO()
+        with patch("api.management.commands.dispatch_outbox.get_channel_layer", return_value=self.channel_layer):
+            call_command("dispatch_outbox", stdout=out)
+        self.assertEqual(out.getvalue(), "Sent 1 outbox event(s)\n")
+        self.assertEqual(self.sent(), [("room_ROOM0001", "remove_task", {"task_id": 1})])
+
+    def test_dispatch_outbox_command_reports_failures(self):
+        OutboxEvent.objects.create(room_code="ROOM0001", message_type="remove_task", payload={"task_id": 1})
+        self.channel_layer.group_send.side_effect = RuntimeError("channel layer down")
+        with patch("api.management.commands.dispatch_outbox.get_channel_layer", return_value=self.channel_layer):
+            with self.assertRaises(CommandError):
+                call_command("dispatch_outbox", stdout=StringIO())
+        self.assertTrue(OutboxEvent.objects.exists())
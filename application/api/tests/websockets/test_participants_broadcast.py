@@ -0,0 +1,121 @@
+import asyncio
+from channels.testing import WebsocketCommunicator
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from channels.routing import URLRouter
+from django.urls import re_path
+from django.test import SimpleTestCase, TestCase, override_settings
+from unittest.mock import AsyncMock, MagicMock
+
+from api.consumers import RoomConsumer
+from api.models import StudySession, User
+from api.realtime import ParticipantsBroadcaster, room_rosters, group_event
+
+"""
+Tests for the coalescing of participants broadcasts in the group study room
+"""
+
+application = URLRouter([
+    re_path(r"ws/room/(?P<room_code>\w+)/$", RoomConsumer.as_asgi()),
+])
+
+
+class ParticipantsBroadcasterTests(SimpleTestCase):
+
+    def setUp(self):
+        self.channel_layer = MagicMock()
+        self.channel_layer.group_send = AsyncMock()
+
+    async def test_changes_within_window_are_sent_once(self):
+        broadcaster = ParticipantsBroadcaster(window=0.02, deltas=False)
+
+        await asyncio.gather(
+            broadcaster.announce_change(self.channel_layer, "ROOM0001", ["@alice123"], joined=["@alice123"]),
+            broadcaster.announce_change(self.channel_layer, "ROOM0001", ["@alice123", "@bob456"], joined=["@bob456"]),
+            broadcaster.announce_roster(self.channel_layer, "ROOM0001", ["@alice123", "@bob456", "@john789"]),
+        )
+
+        self.channel_layer.group_send.assert_awaited_once_with("room_ROOM0001", group_event(
+            "participants_update", keep_payload=True, participants=["@alice123", "@bob456", "@john789"]
+        ))
+
+    async def test_rooms_are_coalesced_separately(self):
+        broadcaster = ParticipantsBroadcaster(window=0.02, deltas=False)
+
+        await asyncio.gather(
+            broadcaster.announce_roster(self.channel_layer, "ROOM0001", ["@alice123"]),
+            broadcaster.announce_roster(self.channel_layer, "ROOM0002", ["@bob456"]),
+        )
+
+        self.assertEqual(self.channel_layer.group_send.await_count, 2)
+
+    async def test_deltas_are_merged(self):
+        broadcaster = ParticipantsBroadcaster(window=0.02, deltas=True)
+
+        await asyncio.gather(
+            broadcaster.announce_change(self.channel_layer, "ROOM0001", [], joined=["@alice123"]),
+            broadcaster.announce_change(self.channel_layer, "ROOM0001", [], joined=["@bob456"]),
+            broadcaster.announce_change(self.channel_layer, "ROOM0001", [], left=["@alice123"]),
+            broadcaster.announce_change(self.channel_layer, "ROOM0001", [], left=["@john789"]),
+        )
+
+        self.channel_layer.group_send.assert_awaited_once_with("room_ROOM0001", group_event(
+            "participants_delta", keep_payload=True, joined=["@bob456"], left=["@john789"]
+        ))
+
+    async def test_cancelled_deltas_send_nothing(self):
+        broadcaster = ParticipantsBroadcaster(window=0.02, deltas=True)
+
+        await asyncio.gather(
+            broadcaster.announce_change(self.channel_layer, "ROOM0001", [], left=["@alice123"]),
+            broadcaster.announce_change(self.channel_layer, "ROOM0001", [], joined=["@alice123"]),
+        )
+
+        self.channel_layer.group_send.assert_not_awaited()
+
+    async def test_new_window_after_flush(self):
+        broadcaster = ParticipantsBroadcaster(window=0, deltas=False)
+
+        await broadcaster.announce_roster(self.channel_layer, "ROOM0001", ["@alice123"])
+        await broadcaster.announce_roster(self.channel_layer, "ROOM0001", [])
+
+        self.assertEqual(self.channel_layer.group_send.await_count, 2)
+
+
+@override_settings(ROOM_PARTICIPANTS_DELTAS=True)
+class ParticipantsDeltaConsumerTests(TestCase):
+    fixtures = [
+        'api/tests/fixtures/default_user.json'
+    ]
+
+    def setUp(self):
+        self.user = User.objects.get(username='@alice123')
+
+    async def test_connect_sends_snapshot_and_applies_deltas(self):
+        study_session = await database_sync_to_async(StudySession.objects.create)(
+            createdBy=self.user, sessionName="Test Room")
+        await database_sync_to_async(study_session.participants.add)(self.user)
+
+        communicator = WebsocketCommunicator(application, f"ws/room/{study_session.roomCode}/")
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        response = await communicator.receive_json_from()
+        self.assertEqual(response, {
+            "type": "participants_update",
+            "participants": ["@alice123"],
+        })
+
+        await get_channel_layer().group_send(f"room_{study_session.roomCode}", {
+            "type": "participants_delta",
+            "joined": ["@bob456"],
+            "left": ["@alice123"],
+        })
+        response = await communicator.receive_json_from()
+        self.assertEqual(response, {
+            "type": "participants_delta",
+            "joined": ["@bob456"],
+            "left": ["@alice123"],
+        })
+        self.assertEqual(room_rosters.get(study_session.roomCode), ["@bob456"])
+
+        await communicator.disconnect()
@@ -0,0 +1,120 @@
+from datetime import timedelta
+from io import StringIO
+from channels.testing import WebsocketCommunicator
+from channels.db import database_sync_to_async
+from channels.routing import URLRouter
+from django.core.management import call_command
+from django.db import connection
+from django.urls import re_path
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import now
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.consumers import RoomConsumer
+from api.models import DailyStudy, List, SessionUser, StudyInterval, StudySession, User
+from api.realtime import JWTAuthMiddleware
+
+"""
+Tests for room socket heartbeats and reaping ghost participants
+"""
+
+application = JWTAuthMiddleware(URLRouter([
+    re_path(r"ws/room/(?P<room_code>\w+)/$", RoomConsumer.as_asgi()),
+]))
+
+
+class PresenceTests(TestCase):
+    fixtures = [
+        'api/tests/fixtures/default_user.json'
+    ]
+
+    def setUp(self):
+        self.alice = User.objects.get(username='@alice123')
+        self.bob = User.objects.get(username='@bob456')
+        self.john = User.objects.get(username='@john789')
+        self.study_session = StudySession.objects.create(createdBy=self.alice, sessionName="Test Room")
+
+    def join(self, user, seconds_ago=0):
+        self.study_session.participants.add(user)
+        return SessionUser.objects.create(
+            user=user, session=self.study_session, last_seen=now() - timedelta(seconds=seconds_ago))
+
+    async def test_heartbeat_updates_last_seen(self):
+        session_user = await database_sync_to_async(self.join)(self.alice, seconds_ago=300)
+        token = str(AccessToken.for_user(self.alice))
+        communicator = WebsocketCommunicator(application, f"ws/room/{self.study_session.roomCode}/?token={token}")
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        await communicator.receive_json_from()
+
+        await database_sync_to_async(SessionUser.objects.filter(pk=session_user.pk).update)(
+            last_seen=now() - timedelta(seconds=300))
+        await communicator.send_json_to({"type": "heartbeat"})
+        self.assertEqual(await communicator.receive_json_from(), {"type": "heartbeat"})
+
+        await database_sync_to_async(session_user.refresh_from_db)()
+        self.assertLess(now() - session_user.last_seen, timedelta(seconds=10))
+        await communicator.disconnect()
+
+    def test_heartbeat_without_open_session(self):
+        self.assertFalse(SessionUser.heartbeat(self.alice, self.study_session.roomCode))
+        self.join(self.alice)
+        self.assertTrue(SessionUser.heartbeat(self.alice, self.study_session.roomCode))
+
+    def test_close_stale_in_batches(self):
+        self.join(self.alice)
+        self.join(self.bob, seconds_ago=120)
+        self.join(self.john, seconds_ago=90)
+        cutoff = now() - timedelta(seconds=60)
+
+        self.assertEqual(SessionUser.close_stale(cutoff, 1), {self.study_session.roomCode: ["@bob456"]})
+        self.assertEqual(SessionUser.close_stale(cutoff, 1), {self.study_session.roomCode: ["@john789"]})
+        self.assertEqual(SessionUser.close_stale(cutoff, 1), {})
+        self.assertEqual(
+            list(self.study_session.participants.values_list("username", flat=True)), ["@alice123"])
+        self.assertEqual(list(SessionUser.objects.values_list("user__username", flat=True)), ["@alice123"])
+
+    def test_close_stale_records_the_batch_at_once(self):
+        current_time = now()
+        for user in (self.bob, self.john):
+            session_user = self.join(user)
+            SessionUser.objects.filter(pk=session_user.pk).update(
+                joined_at=current_time - timedelta(minutes=30), last_seen=current_time - timedelta(minutes=10))
+
+        with CaptureQueriesContext(connection) as queries:
+            SessionUser.close_stale(now() - timedelta(seconds=60), 10)
+
+        inserts = [query for query in queries if query["sql"].startswith('INSERT INTO "api_studyinterval"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(sorted(StudyInterval.objects.values_list("user__username", "minutes")),
+                         [("@bob456", 20), ("@john789", 20)])
+        for user in (self.bob, self.john):
+            minutes_before = user.minutes_studied
+            user.refresh_from_db()
+            self.assertEqual(user.minutes_studied, minutes_before + 20)
+            self.assertEqual(DailyStudy.objects.get(user=user).minutes, 20)
+        self.assertFalse(SessionUser.objects.exists())
+
+    def test_reaper_removes_ghosts(self):
+        self.join(self.alice)
+        self.join(self.bob, seconds_ago=120)
+        self.join(self.john, seconds_ago=120)
+
+        out = StringIO()
+        call_command("reap_participants", "--ttl", "60", "--batch-size", "1", stdout=out)
+        self.assertIn("Reaped 2 ghost participant(s)", out.getvalue())
+        self.assertEqual(
+            list(self.study_session.participants.values_list("username", flat=True)), ["@alice123"])
+
+    def test_reaper_empties_rooms(self):
+        self.join(self.bob, seconds_ago=120)
+        list_id = self.study_session.Task_id
+
+        call_command("reap_participants", "--ttl", "60", stdout=StringIO())
+        self.study_session.refresh_from_db()
+        self.assertIsNotNone(self.study_session.emptied_at)
+
+        call_command("reap_rooms", "--grace", "0", stdout=StringIO())
+        self.assertFalse(StudySession.objects.filter(pk=self.study_session.pk).exists())
+        self.assertFalse(List.objects.filter(pk=list_id).exists())
@@ -0,0 +1,173 @@
+from channels.testing import WebsocketCommunicator
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from channels.routing import URLRouter
+from django.urls import re_path
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from api.consumers import RoomConsumer
+from api.models import StudySession, Task, User
+from api.realtime import RoomEventRegistry, room_events, resume_since
+
+"""
+Tests for the per-room event log and resuming group study room websockets
+"""
+
+application = URLRouter([
+    re_path(r"ws/room/(?P<room_code>\w+)/$", RoomConsumer.as_asgi()),
+])
+
+
+class RoomEventRegistryTests(SimpleTestCase):
+
+    def setUp(self):
+        self.events = RoomEventRegistry(size=2)
+
+    def test_events_are_sequenced_per_room(self):
+        first = self.events.event("ROOM1", "chat_message", message="Hi", sender="@alice123")
+        second = self.events.event("ROOM1", "chat_message", message="Hey", sender="@bob456")
+        self.assertEqual(second["seq"], first["seq"] + 1)
+        self.assertIn('"seq": %d' % second["seq"], second["frame"])
+        self.assertEqual(self.events.current("ROOM1"), second["seq"])
+
+        other = self.events.event("ROOM2", "study_update", update="break")
+        self.assertEqual(self.events.current("ROOM1"), second["seq"])
+        self.assertEqual(self.events.current("ROOM2"), other["seq"])
+
+    def test_replay_missed_events(self):
+        first = self.events.event("ROOM1", "remove_task", task_id=1)
+        second = self.events.event("ROOM1", "remove_task", task_id=2)
+        self.assertEqual(self.events.replay("ROOM1", first["seq"]), (second["seq"], [second]))
+        self.assertEqual(self.events.replay("ROOM1", second["seq"]), (second["seq"], []))
+
+    def test_replay_after_events_were_evicted(self):
+        first = self.events.event("ROOM1", "remove_task", task_id=1)
+        second = self.events.event("ROOM1", "remove_task", task_id=2)
+        third = self.events.event("ROOM1", "remove_task", task_id=3)
+
+        # The second event is still in the buffer, the first one is not
+        self.assertEqual(self.events.replay("ROOM1", first["seq"]), (third["seq"], [second, third]))
+        self.assertEqual(self.events.replay("ROOM1", first["seq"] - 1), (third["seq"], None))
+        self.assertEqual(self.events.replay("ROOM1", third["seq"] + 1), (third["seq"], None))
+
+    def test_discarded_log_does_not_reuse_sequence_numbers(self):
+        event = self.events.event("ROOM1", "remove_task", task_id=1)
+        self.events.discard("ROOM1")
+        self.assertGreater(self.events.current("ROOM1"), event["seq"])
+        self.assertIsNone(self.events.replay("ROOM1", event["seq"])[1])
+
+    def test_resume_since(self):
+        self.assertIsNone(resume_since({"query_string": b""}))
+        self.assertEqual(resume_since({"query_string": b"since=42"}), 42)
+        self.assertEqual(resume_since({"query_string": b"since="}), 0)
+        self.assertEqual(resume_since({"query_string": b"since=abc"}), 0)
+
+
+class RoomResumeConsumerTests(TestCase):
+    fixtures = [
+        'api/tests/fixtures/default_user.json'
+    ]
+
+    def setUp(self):
+        self.user = User.objects.get(username='@alice123')
+
+    async def create_room(self):
+        study_session = await database_sync_to_async(StudySession.objects.create)(
+            createdBy=self.user, sessionName="Test Room")
+        await database_sync_to_async(study_session.participants.add)(self.user)
+        return study_session
+
+    async def connect(self, path):
+        communicator = WebsocketCommunicator(application, path)
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        self.assertEqual((await communicator.receive_json_from())["type"], "participants_update")
+        return communicator
+
+    async def resume(self, path):
+        """
+        Connect with a sequence number to resume from and return the frames
+        sent until the resume completed, leaving out the participants broadcast.
+        """
+        communicator = WebsocketCommunicator(application, path)
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        frames, participants_sent = [], False
+        while not (participants_sent and frames and frames[-1]["type"] == "resumed"):
+            frame = await communicator.receive_json_from()
+            if frame["type"] == "participants_update":
+                participants_sent = True
+            else:
+                frames.append(frame)
+        return communicator, frames
+
+    async def send_chat(self, communicator, message):
+        await communicator.send_json_to({
+            "type": "chat_message",
+            "message": message,
+            "sender": "@alice123",
+        })
+        return await communicator.receive_json_from()
+
+    async def test_fresh_client_learns_current_sequence(self):
+        study_session = await self.create_room()
+        communicator, frames = await self.resume(f"ws/room/{study_session.roomCode}/?since=")
+        self.assertEqual(frames, [{
+            "type": "resumed",
+            "seq": room_events.current(study_session.roomCode),
+            "replayed": 0,
+        }])
+        await communicator.disconnect()
+
+    async def test_reconnect_replays_missed_events(self):
+        study_session = await self.create_room()
+        room_code = study_session.roomCode
+        staying = await self.connect(f"ws/room/{room_code}/")
+        dropped = await self.connect(f"ws/room/{room_code}/")
+        await staying.receive_json_from()
+
+        last_seen = (await self.send_chat(staying, "Before the drop"))["seq"]
+        await dropped.receive_json_from()
+        await dropped.disconnect()
+        await staying.receive_json_from()
+
+        missed = [await self.send_chat(staying, "During the drop"), await self.send_chat(staying, "Still gone")]
+
+        communicator, frames = await self.resume(f"ws/room/{room_code}/?since={last_seen}")
+        self.assertEqual(frames, missed + [{
+            "type": "resumed",
+            "seq": missed[1]["seq"],
+            "replayed": 2,
+        }])
+        self.assertTrue(await communicator.receive_nothing())
+
+        await communicator.disconnect()
+        await staying.disconnect()
+
+    @override_settings(ROOM_EVENT_LOG_SIZE=2)
+    async def test_snapshot_when_buffer_exceeded(self):
+        study_session = await self.create_room()
+        room_code = study_session.roomCode
+        task = await database_sync_to_async(Task.objects.create)(
+            list=study_session.Task, title="Revise", content="Chapter 1")
+
+        channel_layer = get_channel_layer()
+        first = room_events.event(room_code, "toggle_task", task_id=task.pk, is_completed=True)
+        await channel_layer.group_send(f"room_{room_code}", first)
+        for _ in range(2):
+            await channel_layer.group_send(f"room_{room_code}", room_events.event(
+                room_code, "toggle_task", task_id=task.pk, is_completed=False))
+
+        communicator, frames = await self.resume(f"ws/room/{room_code}/?since={first['seq'] - 1}")
+        self.assertEqual(frames, [{
+            "type": "room_snapshot",
+            "seq": first["seq"] + 2,
+            "participants": ["@alice123"],
+            "list_id": study_session.Task.pk,
+            "tasks": [{"id": task.pk, "title": "Revise", "content": "Chapter 1", "is_completed": False}],
+        }, {
+            "type": "resumed",
+            "seq": first["seq"] + 2,
+            "replayed": 0,
+        }])
+        await communicator.disconnect()
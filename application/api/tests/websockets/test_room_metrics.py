@@ -0,0 +1,94 @@
+from channels.testing import WebsocketCommunicator
+from channels.routing import URLRouter
+from django.urls import re_path
+from django.test import SimpleTestCase, TestCase
+
+from api.consumers import RoomConsumer
+from api.models import StudySession, User
+from api.realtime import RoomMetrics, room_metrics
+from api.realtime.metrics import Counter, Gauge, Histogram
+
+"""
+Tests for the instrumentation of group study room websockets
+"""
+
+application = URLRouter([
+    re_path(r"ws/room/(?P<room_code>\w+)/$", RoomConsumer.as_asgi()),
+])
+
+
+class MetricsTests(SimpleTestCase):
+
+    def test_counter(self):
+        counter = Counter("room_messages_received_total", "Messages received.", ["type"])
+        counter.inc(type="chat_message")
+        counter.inc(2, type="chat_message")
+        self.assertEqual(counter.render(), [
+            "# HELP room_messages_received_total Messages received.",
+            "# TYPE room_messages_received_total counter",
+            'room_messages_received_total{type="chat_message"} 3',
+        ])
+
+    def test_gauge_goes_up_and_down(self):
+        gauge = Gauge("room_sockets", "Room sockets open in this process.")
+        gauge.inc()
+        gauge.inc()
+        gauge.dec()
+        self.assertEqual(gauge.render()[2], "room_sockets 1")
+        gauge.dec()
+        self.assertEqual(gauge.render()[2], "room_sockets 0")
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = Histogram("room_group_send_seconds", "Broadcast time.", ["type"], buckets=(0.01, 0.1))
+        for seconds in (0.005, 0.05, 0.5):
+            histogram.observe(seconds, type="chat_message")
+        self.assertEqual(histogram.render()[2:], [
+            'room_group_send_seconds_bucket{type="chat_message",le="0.01"} 1',
+            'room_group_send_seconds_bucket{type="chat_message",le="0.1"} 2',
+            'room_group_send_seconds_bucket{type="chat_message",le="+Inf"} 3',
+            'room_group_send_seconds_count{type="chat_message"} 3',
+            'room_group_send_seconds_sum{type="chat_message"} 0.555',
+        ])
+
+    def test_unknown_received_types_share_a_label(self):
+        metrics = RoomMetrics()
+        metrics.received("made_up", 10, 0.001)
+        metrics.received(["chat_message"], 10, 0.001)
+        self.assertEqual(metrics.messages_received.value(type="unknown"), 2)
+
+
+class RoomConsumerMetricsTests(TestCase):
+    fixtures = [
+        'api/tests/fixtures/default_user.json'
+    ]
+
+    def setUp(self):
+        self.user = User.objects.get(username='@alice123')
+        self.study_session = StudySession.objects.create(createdBy=self.user, sessionName="Test Room")
+        self.study_session.participants.add(self.user)
+
+    async def test_messages_and_sockets_are_recorded(self):
+        room_code = self.study_session.roomCode
+        received = room_metrics.messages_received.value(type="chat_message")
+        sent = room_metrics.messages_sent.value(type="chat_message")
+        connects = room_metrics.connects.value(result="accepted")
+        disconnects = room_metrics.disconnects.value()
+        sockets = room_metrics.sockets.value()
+
+        communicator = WebsocketCommunicator(application, f"ws/room/{room_code}/")
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        await communicator.receive_json_from()
+        self.assertEqual(room_metrics.sockets.value(), sockets + 1)
+        self.assertEqual(room_metrics.connects.value(result="accepted"), connects + 1)
+
+        await communicator.send_json_to({"type": "chat_message", "message": "Hello", "sender": "@alice123"})
+        await communicator.receive_json_from()
+        self.assertEqual(room_metrics.messages_received.value(type="chat_message"), received + 1)
+        self.assertEqual(room_metrics.messages_sent.value(type="chat_message"), sent + 1)
+        self.assertGreater(room_metrics.bytes_received.value(type="chat_message"), 0)
+        self.assertGreater(room_metrics.group_send_seconds.value(type="chat_message"), 0)
+
+        await communicator.disconnect()
+        self.assertEqual(room_metrics.sockets.value(), sockets)
+        self.assertEqual(room_metrics.disconnects.value(), disconnects + 1)
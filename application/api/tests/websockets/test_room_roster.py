@@ -0,0 +1,96 @@
+from channels.testing import WebsocketCommunicator
+from channels.db import database_sync_to_async
+from channels.routing import URLRouter
+from channels.layers import get_channel_layer
+from django.urls import re_path
+from django.test import TestCase
+from unittest.mock import patch
+
+from api.consumers import RoomConsumer
+from api.models import StudySession, User
+from api.realtime import RoomRosterRegistry, room_rosters
+from api.realtime.roster import RoomRoster
+
+"""
+Tests for the in-memory room roster used by the group study room websockets
+"""
+
+application = URLRouter([
+    re_path(r"ws/room/(?P<room_code>\w+)/$", RoomConsumer.as_asgi()),
+])
+
+
+class RoomRosterRegistryTests(TestCase):
+
+    def test_uncached_room_is_not_attached(self):
+        registry = RoomRosterRegistry()
+        self.assertFalse(registry.attach("ABCDEFGH"))
+        self.assertIsNone(registry.get("ABCDEFGH"))
+
+    def test_add_and_remove_only_touch_cached_rooms(self):
+        registry = RoomRosterRegistry()
+        registry.add("ABCDEFGH", "@alice123")
+        self.assertIsNone(registry.get("ABCDEFGH"))
+
+        registry._rooms["ABCDEFGH"] = RoomRoster([])
+        registry.add("ABCDEFGH", "@alice123")
+        registry.add("ABCDEFGH", "@alice123")
+        self.assertEqual(registry.get("ABCDEFGH"), ["@alice123"])
+        registry.remove("ABCDEFGH", "@alice123")
+        self.assertEqual(registry.get("ABCDEFGH"), [])
+
+
+class RoomRosterConsumerTests(TestCase):
+    fixtures = [
+        'api/tests/fixtures/default_user.json'
+    ]
+
+    def setUp(self):
+        self.user = User.objects.get(username='@alice123')
+        self.user2 = User.objects.get(username='@bob456')
+
+    async def test_roster_loaded_once_per_room(self):
+        study_session = await database_sync_to_async(StudySession.objects.create)(
+            createdBy=self.user, sessionName="Test Room")
+        await database_sync_to_async(study_session.participants.add)(self.user)
+
+        with patch.object(RoomRosterRegistry, "_fetch_participants",
+                          wraps=RoomRosterRegistry._fetch_participants) as fetch:
+            communicator1 = WebsocketCommunicator(application, f"ws/room/{study_session.roomCode}/")
+            connected, _ = await communicator1.connect()
+            self.assertTrue(connected)
+            await communicator1.receive_json_from()
+
+            communicator2 = WebsocketCommunicator(application, f"ws/room/{study_session.roomCode}/")
+            connected, _ = await communicator2.connect()
+            self.assertTrue(connected)
+            response = await communicator2.receive_json_from()
+
+            # The second connection is served from the cached roster
+            self.assertEqual(fetch.call_count, 1)
+            self.assertEqual(response["participants"], ["@alice123"])
+
+            await communicator1.disconnect()
+            await communicator2.disconnect()
+
+        # Once every socket has left, the roster is dropped
+        self.assertIsNone(room_rosters.get(study_session.roomCode))
+
+    async def test_participants_update_refreshes_roster(self):
+        study_session = await database_sync_to_async(StudySession.objects.create)(
+            createdBy=self.user, sessionName="Test Room")
+
+        communicator = WebsocketCommunicator(application, f"ws/room/{study_session.roomCode}/")
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        await communicator.receive_json_from()
+
+        # A join broadcast from the HTTP views updates the cached roster
+        await get_channel_layer().group_send(f"room_{study_session.roomCode}", {
+            "type": "participants_update",
+            "participants": ["@alice123", "@bob456"],
+        })
+        await communicator.receive_json_from()
+        self.assertEqual(room_rosters.get(study_session.roomCode), ["@alice123", "@bob456"])
+
+        await communicator.disconnect()
@@ -0,0 +1,238 @@
+import json
+from unittest import mock
+from channels.testing import ApplicationCommunicator, WebsocketCommunicator
+from channels.layers import get_channel_layer
+from channels.routing import URLRouter
+from django.urls import re_path
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from api.consumers import RoomConsumer
+from api.models import StudySession, User
+from api.realtime import HashRing, ShardListenerMiddleware, discard_room, room_events, room_shards, room_timers, shard_listener
+
+"""
+Tests for hashing study rooms onto the websocket worker that owns them
+"""
+
+application = URLRouter([
+    re_path(r"ws/room/(?P<room_code>\w+)/$", RoomConsumer.as_asgi()),
+])
+
+ROOMS = [f"ROOM{number:04d}" for number in range(1000)]
+
+
+class HashRingTests(SimpleTestCase):
+
+    def test_rooms_are_spread_between_workers(self):
+        ring = HashRing(["worker-1", "worker-2", "worker-3"])
+        owners = [ring.node(room_code) for room_code in ROOMS]
+        for worker in ring.nodes:
+            self.assertGreater(owners.count(worker), 200)
+        self.assertEqual(owners, [ring.node(room_code) for room_code in ROOMS])
+
+    def test_removing_a_worker_only_moves_its_rooms(self):
+        before = HashRing(["worker-1", "worker-2", "worker-3"])
+        after = HashRing(["worker-1", "worker-3"])
+        for room_code in ROOMS:
+            if before.node(room_code) != "worker-2":
+                self.assertEqual(after.node(room_code), before.node(room_code))
+
+    def test_empty_ring(self):
+        self.assertIsNone(HashRing([]).node("ROOM0001"))
+
+
+class RoomShardingTests(TestCase):
+    fixtures = [
+        'api/tests/fixtures/default_user.json'
+    ]
+
+    def setUp(self):
+        self.user = User.objects.get(username='@alice123')
+        self.study_session = StudySession.objects.create(createdBy=self.user, sessionName="Test Room")
+        self.study_session.participants.add(self.user)
+        self.path = f"ws/room/{self.study_session.roomCode}/"
+
+    def tearDown(self):
+        shard_listener.stop()
+        room_timers.discard(self.study_session.roomCode)
+        room_events.discard(self.study_session.roomCode)
+
+    async def connect(self, path=None):
+        communicator = WebsocketCommunicator(application, path or self.path)
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        return communicator
+
+    async def receive_until(self, communicator, message_type):
+        responses = []
+        while not responses or responses[-1]["type"] != message_type:
+            responses.append(await communicator.receive_json_from())
+        return responses
+
+    async def receive_close(self, communicator):
+        while True:
+            output = await communicator.receive_output()
+            if output["type"] == "websocket.close":
+                return output
+
+    async def serve_forwarded(self, count):
+        """Serve the operations forwarded to worker-1 as if this process were that worker."""
+        channel_layer = get_channel_layer()
+        for _ in range(count):
+            message = await channel_layer.receive(room_shards.channel("worker-1"))
+            with override_settings(ROOM_SHARD_WORKER="worker-1"):
+                await shard_listener.handle(channel_layer, message)
+
+    @override_settings(ROOM_SHARD_WORKERS=["worker-1"], ROOM_SHARD_WORKER="worker-1")
+    async def test_owner_serves_its_rooms(self):
+        with mock.patch.object(room_shards, "forward", wraps=room_shards.forward) as forward:
+            first = await self.connect()
+            second = await self.connect()
+            await self.receive_until(first, "participants_update")
+            await self.receive_until(second, "participants_update")
+
+            # The owner sequences the event itself and broadcasts it to the room's group
+            await first.send_json_to({"type": "chat_message", "message": "Hello", "sender": "@alice123"})
+            chats = [(await self.receive_until(communicator, "chat_message"))[-1] for communicator in (first, second)]
+            self.assertEqual(chats[0], chats[1])
+            self.assertEqual(chats[0]["message"], "Hello")
+            self.assertIsNotNone(chats[0]["seq"])
+            for communicator in (first, second):
+                await communicator.disconnect()
+
+        forward.assert_not_called()
+
+    @override_settings(ROOM_SHARD_WORKERS=["worker-1"], ROOM_SHARD_WORKER="worker-1")
+    async def test_broadcasts_go_through_the_group(self):
+        communicator = await self.connect()
+        await self.receive_until(communicator, "participants_update")
+
+        # Sockets on other workers are only reachable through the group
+        channel_layer = get_channel_layer()
+        other_worker = await channel_layer.new_channel()
+        await channel_layer.group_add(f"room_{self.study_session.roomCode}", other_worker)
+        await communicator.send_json_to({"type": "chat_message", "message": "Hello", "sender": "@alice123"})
+
+        self.assertEqual((await channel_layer.receive(other_worker))["type"], "chat_message")
+        self.assertEqual((await communicator.receive_json_from())["message"], "Hello")
+        await channel_layer.group_discard(f"room_{self.study_session.roomCode}", other_worker)
+        await communicator.disconnect()
+
+    @override_settings(ROOM_SHARD_WORKERS=["worker-1"], ROOM_SHARD_WORKER="web")
+    async def test_other_workers_forward_to_the_owner(self):
+        first = await self.connect()
+        await self.serve_forwarded(1)
+        await self.receive_until(first, "participants_update")
+
+        # Events are sequenced by the owner and reach sockets on other workers through the group
+        await first.send_json_to({"type": "chat_message", "message": "Hello", "sender": "@alice123"})
+        await self.serve_forwarded(1)
+        chat = await first.receive_json_from()
+        self.assertEqual(chat["message"], "Hello")
+
+        await first.send_json_to({
+            "type": "timer",
+            "action": "start",
+            "study_length": 1500,
+            "break_length": 300,
+            "rounds": 4,
+        })
+        await self.serve_forwarded(1)
+        self.assertEqual((await first.receive_json_from())["phase"], "study")
+        self.assertIsNotNone(room_timers.get(self.study_session.roomCode))
+
+        # A reconnecting socket gets the timer and its missed events from the owner
+        second = await self.connect(self.path + f"?since={chat['seq'] - 1}")
+        await self.serve_forwarded(2)
+        responses = await self.receive_until(second, "resumed")
+        self.assertIn("timer_update", [response["type"] for response in responses])
+        self.assertIn({"type": "chat_message", "message": "Hello", "sender": "@alice123", "seq": chat["seq"]},
+                      responses)
+        self.assertEqual(responses[-1], {"type": "resumed", "seq": chat["seq"], "replayed": 1})
+
+        for communicator in (first, second):
+            await communicator.disconnect()
+
+    @override_settings(ROOM_SHARD_WORKERS=["worker-1"], ROOM_SHARD_WORKER="worker-1")
+    async def test_owner_without_sockets_serves_forwarded_operations(self):
+        # The owner starts listening at startup, before any socket of the room connects to it
+        lifespan = ApplicationCommunicator(ShardListenerMiddleware(application), {"type": "lifespan"})
+        await lifespan.send_input({"type": "lifespan.startup"})
+        self.assertEqual(await lifespan.receive_output(), {"type": "lifespan.startup.complete"})
+
+        # A socket on another worker
+        channel_layer = get_channel_layer()
+        other_worker = await channel_layer.new_channel()
+        await channel_layer.group_add(f"room_{self.study_session.roomCode}", other_worker)
+        await room_shards.forward(channel_layer, self.study_session.roomCode, "shard.publish",
+                                  message_type="chat_message", payload={"message": "Hello", "sender": "@alice123"})
+
+        chat = json.loads((await channel_layer.receive(other_worker))["frame"])
+        self.assertEqual((chat["type"], chat["message"]), ("chat_message", "Hello"))
+        self.assertIsNotNone(chat["seq"])
+
+        await channel_layer.group_discard(f"room_{self.study_session.roomCode}", other_worker)
+        await lifespan.send_input({"type": "lifespan.shutdown"})
+        self.assertEqual(await lifespan.receive_output(), {"type": "lifespan.shutdown.complete"})
+
+    @override_settings(ROOM_SHARD_WORKERS=["worker-1"], ROOM_SHARD_WORKER="worker-1")
+    async def test_missed_events_are_replayed_in_one_message(self):
+        channel_layer = get_channel_layer()
+        events = [room_events.event(self.study_session.roomCode, "chat_message", message=f"Message {number}")
+                  for number in range(3)]
+        reply_to = await channel_layer.new_channel()
+        await shard_listener.handle(channel_layer, {
+            "type": "shard.resume",
+            "room_code": self.study_session.roomCode,
+            "since": events[0]["seq"] - 1,
+            "reply_to": reply_to,
+        })
+
+        resumed = await channel_layer.receive(reply_to)
+        self.assertEqual(resumed["type"], "room_resumed")
+        self.assertEqual(resumed["events"], events)
+        self.assertEqual(resumed["seq"], events[-1]["seq"])
+
+    @override_settings(ROOM_SHARD_WORKERS=["worker-1"], ROOM_SHARD_WORKER="web", ROOM_RESUME_TIMEOUT=0.1)
+    async def test_unanswered_resume_disconnects_the_client(self):
+        communicator = await self.connect(self.path + "?since=1")
+        # The owner never answers the timer and resume requests
+        channel_layer = get_channel_layer()
+        for _ in range(2):
+            await channel_layer.receive(room_shards.channel("worker-1"))
+
+        self.assertEqual(await self.receive_close(communicator), {"type": "websocket.close", "code": 4008})
+        await communicator.disconnect()
+
+    @override_settings(ROOM_SHARD_WORKERS=["worker-1"], ROOM_SHARD_WORKER="web", ROOM_EVENT_LOG_SIZE=2)
+    async def test_events_held_beyond_the_log_size_disconnect_the_client(self):
+        communicator = await self.connect(self.path + "?since=1")
+        channel_layer = get_channel_layer()
+        for _ in range(2):
+            await channel_layer.receive(room_shards.channel("worker-1"))
+
+        for number in range(3):
+            await channel_layer.group_send(f"room_{self.study_session.roomCode}", room_events.event(
+                self.study_session.roomCode, "chat_message", message=f"Message {number}", sender="@bob456"))
+
+        self.assertEqual(await self.receive_close(communicator), {"type": "websocket.close", "code": 4008})
+        await communicator.disconnect()
+
+    @override_settings(ROOM_SHARD_WORKERS=["worker-1"], ROOM_SHARD_WORKER="web")
+    async def test_rooms_left_empty_are_forgotten_by_the_owner(self):
+        first = await self.connect()
+        await self.serve_forwarded(1)
+        await first.send_json_to({
+            "type": "timer",
+            "action": "start",
+            "study_length": 1500,
+            "break_length": 300,
+            "rounds": 4,
+        })
+        await self.serve_forwarded(1)
+        await first.disconnect()
+        self.assertIsNotNone(room_timers.get(self.study_session.roomCode))
+
+        await discard_room(get_channel_layer(), self.study_session.roomCode)
+        await self.serve_forwarded(1)
+        self.assertIsNone(room_timers.get(self.study_session.roomCode))
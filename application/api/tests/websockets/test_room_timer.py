@@ -0,0 +1,177 @@
+from unittest.mock import patch
+
+from channels.testing import WebsocketCommunicator
+from channels.routing import URLRouter
+from django.urls import re_path
+from django.test import SimpleTestCase, TestCase
+
+from api.consumers import RoomConsumer
+from api.models import StudySession, User
+from api.realtime import RoomTimer, room_timers
+from api.realtime.timer import MAX_ROUNDS
+
+"""
+Tests for the server-authoritative Pomodoro timer of group study rooms
+"""
+
+application = URLRouter([
+    re_path(r"ws/room/(?P<room_code>\w+)/$", RoomConsumer.as_asgi()),
+])
+
+
+class RoomTimerTests(SimpleTestCase):
+
+    def test_phases_follow_absolute_deadlines(self):
+        timer = RoomTimer(study_length=1500, break_length=300, rounds=2, now=1000)
+        self.assertEqual((timer.phase, timer.round, timer.deadline), ("study", 1, 2500))
+
+        timer.advance()
+        self.assertEqual((timer.phase, timer.round, timer.deadline), ("break", 1, 2800))
+        timer.advance()
+        self.assertEqual((timer.phase, timer.round, timer.deadline), ("study", 2, 4300))
+        timer.advance()
+        self.assertEqual((timer.phase, timer.deadline), ("completed", None))
+
+    def test_rounds_without_breaks(self):
+        timer = RoomTimer(study_length=60, break_length=0, rounds=3, now=0)
+        timer.advance()
+        self.assertEqual((timer.phase, timer.round, timer.deadline), ("study", 2, 120))
+
+    def test_catch_up_skips_missed_phases(self):
+        timer = RoomTimer(study_length=60, break_length=30, rounds=3, now=0)
+        self.assertFalse(timer.catch_up(59))
+        self.assertTrue(timer.catch_up(100))
+        self.assertEqual((timer.phase, timer.round, timer.deadline), ("study", 2, 150))
+
+    def test_pause_and_resume(self):
+        timer = RoomTimer(study_length=60, break_length=30, rounds=1, now=0)
+        self.assertTrue(timer.pause(20))
+        self.assertFalse(timer.pause(25))
+        self.assertEqual(timer.state(30)["remaining"], 40)
+        self.assertIsNone(timer.state(30)["deadline"])
+
+        self.assertTrue(timer.resume(100))
+        self.assertEqual((timer.deadline, timer.remaining), (140, None))
+
+
+class RoomTimerConsumerTests(TestCase):
+    fixtures = [
+        'api/tests/fixtures/default_user.json'
+    ]
+
+    def setUp(self):
+        self.user = User.objects.get(username='@alice123')
+        self.study_session = StudySession.objects.create(createdBy=self.user, sessionName="Test Room")
+        self.study_session.participants.add(self.user)
+        self.path = f"ws/room/{self.study_session.roomCode}/"
+
+    def tearDown(self):
+        room_timers.discard(self.study_session.roomCode)
+
+    async def connect(self, path=None):
+        communicator = WebsocketCommunicator(application, path or self.path)
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        return communicator
+
+    async def receive_timer(self, communicator, timeout=1):
+        while True:
+            response = await communicator.receive_json_from(timeout=timeout)
+            if response["type"] == "timer_update":
+                return response
+
+    @patch("api.realtime.timer.MIN_PHASE_LENGTH", 0.1)
+    async def test_transitions_are_broadcast(self):
+        communicator = await self.connect()
+        await communicator.send_json_to({
+            "type": "timer",
+            "action": "start",
+            "study_length": 0.2,
+            "break_length": 0.1,
+            "rounds": 2,
+        })
+
+        started = await self.receive_timer(communicator)
+        self.assertEqual((started["phase"], started["round"]), ("study", 1))
+        self.assertAlmostEqual(started["deadline"], started["server_time"] + 0.2)
+
+        phases = []
+        for _ in range(3):
+            update = await self.receive_timer(communicator)
+            phases.append((update["phase"], update["round"]))
+        self.assertEqual(phases, [("break", 1), ("study", 2), ("completed", 2)])
+        self.assertTrue(await communicator.receive_nothing(timeout=0.3))
+
+        await communicator.disconnect()
+
+    async def test_late_joiner_gets_current_phase(self):
+        first = await self.connect()
+        await first.send_json_to({
+            "type": "timer",
+            "action": "start",
+            "study_length": 1500,
+            "break_length": 300,
+            "rounds": 4,
+        })
+        started = await self.receive_timer(first)
+
+        second = await self.connect()
+        snapshot = await self.receive_timer(second)
+        self.assertEqual(snapshot["phase"], "study")
+        self.assertEqual(snapshot["deadline"], started["deadline"])
+
+        await first.send_json_to({"type": "timer", "action": "pause"})
+        paused = await self.receive_timer(second)
+        self.assertIsNone(paused["deadline"])
+        self.assertGreater(paused["remaining"], 1490)
+
+        # Clients not subscribed to the study topic do not get the timer
+        third = await self.connect(self.path + "?topics=chat")
+        self.assertTrue(await third.receive_nothing())
+
+        await first.send_json_to({"type": "timer", "action": "stop"})
+        self.assertEqual((await self.receive_timer(second))["phase"], "idle")
+        self.assertIsNone(room_timers.get(self.study_session.roomCode))
+
+        for communicator in (first, second, third):
+            await communicator.disconnect()
+
+    async def test_invalid_commands_are_ignored(self):
+        communicator = await self.connect()
+        await communicator.receive_json_from()
+        for command in [
+            {"action": "pause"},
+            {"action": "start", "study_length": 0, "break_length": 60, "rounds": 1},
+            {"action": "start", "study_length": "soon", "break_length": 60, "rounds": 1},
+            {"action": "rewind"},
+        ]:
+            await communicator.send_json_to({"type": "timer", **command})
+        self.assertTrue(await communicator.receive_nothing())
+        await communicator.disconnect()
+
+    async def test_phase_lengths_below_one_second_are_rejected(self):
+        communicator = await self.connect()
+        await communicator.receive_json_from()
+        for command in [
+            {"action": "start", "study_length": 0.001, "break_length": 60, "rounds": 1},
+            {"action": "start", "study_length": 60, "break_length": 0.5, "rounds": 1},
+        ]:
+            await communicator.send_json_to({"type": "timer", **command})
+        self.assertTrue(await communicator.receive_nothing())
+
+        await communicator.send_json_to({"type": "timer", "action": "start", "study_length": 1, "break_length": 0, "rounds": 1})
+        update = await self.receive_timer(communicator)
+        self.assertEqual((update["phase"], update["study_length"]), ("study", 1))
+        await communicator.disconnect()
+
+    async def test_rounds_are_capped(self):
+        communicator = await self.connect()
+        await communicator.receive_json_from()
+        for rounds in (0, MAX_ROUNDS + 1):
+            await communicator.send_json_to({"type": "timer", "action": "start", "study_length": 60, "break_length": 0, "rounds": rounds})
+        self.assertTrue(await communicator.receive_nothing())
+
+        await communicator.send_json_to({"type": "timer", "action": "start", "study_length": 60, "break_length": 0, "rounds": MAX_ROUNDS})
+        update = await self.receive_timer(communicator)
+        self.assertEqual(update["rounds"], MAX_ROUNDS)
+        await communicator.disconnect()
@@ -0,0 +1,142 @@
+from channels.testing import WebsocketCommunicator
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from channels.routing import URLRouter
+from django.urls import re_path
+from django.test import SimpleTestCase, TestCase
+
+from api.consumers import RoomConsumer
+from api.models import StudySession, User
+from api.realtime import TOPICS, event_topic, group_event, parse_topics, initial_topics
+
+"""
+Tests for topic subscriptions on the multiplexed group study room websocket
+"""
+
+application = URLRouter([
+    re_path(r"ws/room/(?P<room_code>\w+)/$", RoomConsumer.as_asgi()),
+    re_path(r"ws/todolist/(?P<room_code>\w+)/$", RoomConsumer.as_asgi(), {"topics": "tasks"}),
+])
+
+
+class TopicTests(SimpleTestCase):
+
+    def test_event_topic(self):
+        self.assertEqual(event_topic("chat_message"), "chat")
+        self.assertEqual(event_topic("participants_delta"), "participants")
+        self.assertEqual(event_topic("toggle_task"), "tasks")
+        self.assertEqual(event_topic("file_deleted"), "files")
+        self.assertIsNone(event_topic("subscriptions"))
+
+    def test_parse_topics_ignores_unknown_names(self):
+        self.assertEqual(parse_topics("chat, tasks,music"), {"chat", "tasks"})
+        self.assertEqual(parse_topics(["files"]), {"files"})
+        self.assertEqual(parse_topics(None), set())
+
+    def test_initial_topics(self):
+        self.assertEqual(initial_topics({"query_string": b""}), TOPICS)
+        self.assertEqual(initial_topics({"query_string": b"topics=chat,files"}), {"chat", "files"})
+        self.assertEqual(initial_topics({"query_string": b"topics="}), set())
+        self.assertEqual(initial_topics({
+            "query_string": b"",
+            "url_route": {"kwargs": {"room_code": "ABC", "topics": "tasks"}},
+        }), {"tasks"})
+
+
+class RoomTopicConsumerTests(TestCase):
+    fixtures = [
+        'api/tests/fixtures/default_user.json'
+    ]
+
+    def setUp(self):
+        self.user = User.objects.get(username='@alice123')
+
+    async def create_room(self):
+        study_session = await database_sync_to_async(StudySession.objects.create)(
+            createdBy=self.user, sessionName="Test Room")
+        await database_sync_to_async(study_session.participants.add)(self.user)
+        return study_session.roomCode
+
+    async def test_socket_only_receives_subscribed_topics(self):
+        room_code = await self.create_room()
+        communicator = WebsocketCommunicator(application, f"ws/room/{room_code}/?topics=tasks")
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+
+        channel_layer = get_channel_layer()
+        await channel_layer.group_send(f"room_{room_code}", group_event(
+            "chat_message", message="Hello", sender="@alice123"))
+        await channel_layer.group_send(f"room_{room_code}", group_event(
+            "toggle_task", task_id=1, is_completed=True))
+
+        # The participants broadcast and the chat message are filtered out
+        self.assertEqual(await communicator.receive_json_from(), {
+            "type": "toggle_task",
+            "task_id": 1,
+            "is_completed": True,
+        })
+        self.assertTrue(await communicator.receive_nothing())
+
+        await communicator.disconnect()
+
+    async def test_subscribe_and_unsubscribe(self):
+        room_code = await self.create_room()
+        communicator = WebsocketCommunicator(application, f"ws/room/{room_code}/?topics=tasks")
+        await communicator.connect()
+
+        await communicator.send_json_to({"type": "subscribe", "topics": ["chat"]})
+        self.assertEqual(await communicator.receive_json_from(), {
+            "type": "subscriptions",
+            "topics": ["chat", "tasks"],
+        })
+
+        await communicator.send_json_to({"type": "unsubscribe", "topics": ["tasks"]})
+        self.assertEqual(await communicator.receive_json_from(), {
+            "type": "subscriptions",
+            "topics": ["chat"],
+        })
+
+        channel_layer = get_channel_layer()
+        await channel_layer.group_send(f"room_{room_code}", group_event(
+            "remove_task", task_id=1))
+        await communicator.send_json_to({
+            "type": "chat_message",
+            "message": "Hello",
+            "sender": "@alice123",
+        })
+        response = await communicator.receive_json_from()
+        self.assertIsInstance(response.pop("seq"), int)
+        self.assertEqual(response, {
+            "type": "chat_message",
+            "message": "Hello",
+            "sender": "@alice123",
+        })
+        self.assertTrue(await communicator.receive_nothing())
+
+        await communicator.disconnect()
+
+    async def test_todolist_route_only_receives_tasks(self):
+        room_code = await self.create_room()
+        room_socket = WebsocketCommunicator(application, f"ws/room/{room_code}/")
+        await room_socket.connect()
+        self.assertEqual((await room_socket.receive_json_from())["type"], "participants_update")
+
+        # Older clients still open a to-do list socket, which only carries task events
+        todolist_socket = WebsocketCommunicator(application, f"ws/todolist/{room_code}/")
+        await todolist_socket.connect()
+        self.assertEqual((await room_socket.receive_json_from())["type"], "participants_update")
+
+        await room_socket.send_json_to({
+            "type": "chat_message",
+            "message": "Hello",
+            "sender": "@alice123",
+        })
+        self.assertEqual((await room_socket.receive_json_from())["type"], "chat_message")
+        self.assertTrue(await todolist_socket.receive_nothing())
+
+        await get_channel_layer().group_send(f"room_{room_code}", group_event(
+            "remove_task", task_id=1))
+        self.assertEqual((await todolist_socket.receive_json_from())["type"], "remove_task")
+
+        await todolist_socket.disconnect()
+        await room_socket.disconnect()
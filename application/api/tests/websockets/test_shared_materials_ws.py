@@ -56,6 +56,7 @@ class SharedMaterialsConsumerTests(TestCase):
 
         # Receive the file uploaded event back
         response = await communicator.receive_json_from()
+        self.assertIsInstance(response.pop("seq"), int)
         self.assertEqual(response, {
             "type": "file_uploaded",
             "file": {"name": "testfile.txt", "url": "http://example.com/testfile.txt", "type": "text/plain"},
@@ -89,6 +90,7 @@ class SharedMaterialsConsumerTests(TestCase):
 
         # Receive the file deleted event back
         response = await communicator.receive_json_from()
+        self.assertIsInstance(response.pop("seq"), int)
         self.assertEqual(response, {
             "type": "file_deleted",
             "fileName": "testfile.txt",
@@ -0,0 +1,82 @@
+from channels.testing import WebsocketCommunicator
+from channels.db import database_sync_to_async
+from channels.routing import URLRouter
+from django.urls import re_path
+from django.test import TestCase, override_settings
+
+from api.consumers import RoomConsumer
+from api.models import StudySession, User
+from api.realtime import typing_throttle
+
+"""
+Tests for the throttling and expiry of typing indicators in the group study room
+"""
+
+application = URLRouter([
+    re_path(r"ws/room/(?P<room_code>\w+)/$", RoomConsumer.as_asgi()),
+])
+
+
+class TypingThrottleTests(TestCase):
+    fixtures = [
+        'api/tests/fixtures/default_user.json'
+    ]
+
+    def setUp(self):
+        self.user = User.objects.get(username='@alice123')
+
+    async def connect(self):
+        study_session = await database_sync_to_async(StudySession.objects.create)(
+            createdBy=self.user, sessionName="Test Room")
+        communicator = WebsocketCommunicator(application, f"ws/room/{study_session.roomCode}/")
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        await communicator.receive_json_from()
+        return study_session, communicator
+
+    @override_settings(ROOM_TYPING_INTERVAL=10, ROOM_TYPING_EXPIRY=0.2)
+    async def test_keystrokes_are_throttled_then_expire(self):
+        study_session, communicator = await self.connect()
+
+        for _ in range(5):
+            await communicator.send_json_to({"type": "typing", "sender": "@alice123"})
+
+        response = await communicator.receive_json_from()
+        self.assertEqual(response, {"type": "typing", "sender": "@alice123"})
+
+        # The remaining keystrokes are dropped, then the indicator expires
+        response = await communicator.receive_json_from()
+        self.assertEqual(response, {"type": "typing_stopped", "sender": "@alice123"})
+        self.assertTrue(await communicator.receive_nothing(0.3))
+
+        await communicator.disconnect()
+
+    @override_settings(ROOM_TYPING_INTERVAL=0, ROOM_TYPING_EXPIRY=10)
+    async def test_typing_relayed_after_interval(self):
+        study_session, communicator = await self.connect()
+
+        await communicator.send_json_to({"type": "typing", "sender": "@alice123"})
+        await communicator.send_json_to({"type": "typing", "sender": "@alice123"})
+
+        self.assertEqual((await communicator.receive_json_from())["type"], "typing")
+        self.assertEqual((await communicator.receive_json_from())["type"], "typing")
+
+        await communicator.disconnect()
+        self.assertFalse(typing_throttle.is_typing(study_session.roomCode, "@alice123"))
+
+    @override_settings(ROOM_TYPING_INTERVAL=1, ROOM_TYPING_EXPIRY=10)
+    async def test_disconnect_stops_typing(self):
+        study_session, communicator = await self.connect()
+        listener = WebsocketCommunicator(application, f"ws/room/{study_session.roomCode}/")
+        connected, _ = await listener.connect()
+        self.assertTrue(connected)
+
+        await communicator.send_json_to({"type": "typing", "sender": "@alice123"})
+        await communicator.receive_json_from()
+        await communicator.disconnect()
+
+        responses = [await listener.receive_json_from() for _ in range(3)]
+        self.assertIn({"type": "typing", "sender": "@alice123"}, responses)
+        self.assertIn({"type": "typing_stopped", "sender": "@alice123"}, responses)
+
+        await listener.disconnect()
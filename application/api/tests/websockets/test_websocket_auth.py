@@ -0,0 +1,111 @@
+import time
+from unittest import mock
+from channels.testing import WebsocketCommunicator
+from channels.db import database_sync_to_async
+from channels.routing import URLRouter
+from django.contrib.auth.models import AnonymousUser
+from django.urls import re_path
+from django.test import SimpleTestCase, TestCase
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.consumers import RoomConsumer
+from api.models import StudySession, User
+from api.realtime import JWTAuthMiddleware, WebsocketTokenCache
+from api.realtime.auth import websocket_token
+
+"""
+Tests for authenticating group study room websockets with SimpleJWT access tokens
+"""
+
+application = JWTAuthMiddleware(URLRouter([
+    re_path(r"ws/room/(?P<room_code>\w+)/$", RoomConsumer.as_asgi()),
+]))
+
+
+class WebsocketTokenTests(SimpleTestCase):
+
+    def test_token_from_query_string(self):
+        self.assertEqual(websocket_token({"query_string": b"since=&token=abc.def"}), ("abc.def", False))
+
+    def test_token_from_subprotocols(self):
+        scope = {"query_string": b"", "subprotocols": ["msgpack", "bearer", "abc.def"]}
+        self.assertEqual(websocket_token(scope), ("abc.def", True))
+
+    def test_no_token(self):
+        self.assertEqual(websocket_token({"query_string": b"", "subprotocols": ["bearer"]}), (None, False))
+
+    def test_expired_entries_are_dropped(self):
+        tokens = WebsocketTokenCache(size=2)
+        tokens.set("expired", "@alice123", time.time() - 1)
+        self.assertIsNone(tokens.get("expired"))
+
+    def test_least_recently_used_entries_are_evicted(self):
+        tokens = WebsocketTokenCache(size=2)
+        expires_at = time.time() + 60
+        tokens.set("first", "@alice123", expires_at)
+        tokens.set("second", "@bob456", expires_at)
+        tokens.get("first")
+        tokens.set("third", "@john789", expires_at)
+        self.assertEqual(tokens.get("first"), "@alice123")
+        self.assertIsNone(tokens.get("second"))
+
+
+class WebsocketAuthTests(TestCase):
+    fixtures = [
+        'api/tests/fixtures/default_user.json'
+    ]
+
+    def setUp(self):
+        self.user = User.objects.get(username='@alice123')
+        self.token = str(AccessToken.for_user(self.user))
+        self.study_session = StudySession.objects.create(createdBy=self.user, sessionName="Test Room")
+        self.study_session.participants.add(self.user)
+
+    async def test_authenticated_sender(self):
+        communicator = WebsocketCommunicator(
+            application, f"ws/room/{self.study_session.roomCode}/?token={self.token}")
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        await communicator.receive_json_from()
+
+        # The sender given by the client is replaced by the authenticated user
+        await communicator.send_json_to({
+            "type": "chat_message",
+            "message": "Hello",
+            "sender": "@bob456",
+        })
+        response = await communicator.receive_json_from()
+        self.assertEqual(response["sender"], "@alice123")
+
+        await communicator.disconnect()
+
+    async def test_token_as_subprotocol(self):
+        communicator = WebsocketCommunicator(
+            application, f"ws/room/{self.study_session.roomCode}/", subprotocols=["bearer", self.token])
+        connected, subprotocol = await communicator.connect()
+        self.assertTrue(connected)
+        self.assertEqual(subprotocol, "bearer")
+        await communicator.disconnect()
+
+    async def test_missing_or_invalid_token_is_rejected(self):
+        for path in ["", "?token=invalid"]:
+            communicator = WebsocketCommunicator(application, f"ws/room/{self.study_session.roomCode}/{path}")
+            connected, _ = await communicator.connect()
+            self.assertFalse(connected)
+
+    async def test_validated_tokens_are_cached(self):
+        tokens = WebsocketTokenCache()
+        with mock.patch.object(JWTAuthentication, "get_user", autospec=True,
+                               side_effect=JWTAuthentication.get_user) as get_user:
+            first = await tokens.authenticate(self.token)
+            second = await tokens.authenticate(self.token)
+        self.assertEqual(first, self.user)
+        self.assertIs(second, first)
+        self.assertEqual(get_user.call_count, 1)
+
+    async def test_deleted_user_is_anonymous(self):
+        tokens = WebsocketTokenCache()
+        token = str(AccessToken.for_user(await database_sync_to_async(User.objects.get)(username='@bob456')))
+        await database_sync_to_async(User.objects.filter(username='@bob456').delete)()
+        self.assertIsInstance(await tokens.authenticate(token), AnonymousUser)
@@ -1,19 +1,54 @@
+from datetime import timedelta
 from django.utils import timezone
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.shortcuts import get_object_or_404
 from rest_framework import status
-from api.models import Rewards
+from api.models import DailyStudy, Rewards, StudyInterval
 from django.db import models
 
+# Days covered by the weekly and monthly windows of the analytics
+WEEK_DAYS = 7
+MONTH_DAYS = 30
+
+def study_window(days, start, end, rooms_joined):
+    '''
+    Totals and averages of the daily study rows from start to end inclusive.
+    Rooms studied in on several days count once, so `rooms_joined` is counted
+    over the whole window rather than summed from the rows.
+    '''
+    rows = [day for day in days if start <= day["date"] <= end]
+    minutes = sum(day["minutes"] for day in rows)
+    sessions = sum(day["sessions"] for day in rows)
+    return {
+        "minutes": minutes,
+        "sessions": sessions,
+        "rooms_joined": rooms_joined,
+        "tasks_completed": sum(day["tasks_completed"] for day in rows),
+        "average_daily_minutes": round(minutes / ((end - start).days + 1), 2),
+        "average_session_minutes": round(minutes / sessions, 2) if sessions > 0 else 0,
+    }
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 
 def get_analytics(request):
-    '''Fetch and return user analytics including streaks, study hours, and earned badges.'''
+    '''Fetch and return user analytics including streaks, study hours, weekly and monthly study, and earned badges.'''
     user = request.user
 
+    # One range scan over the daily rollup covers the charts and both windows
+    today = timezone.localdate()
+    week_start = today - timedelta(days=WEEK_DAYS - 1)
+    month_start = today - timedelta(days=MONTH_DAYS - 1)
+    days = DailyStudy.window(user, month_start, today)
+    rooms = StudyInterval.rooms_studied(user, weekly=(week_start, today), monthly=(month_start, today))
+    minutes_by_date = {day["date"]: day["minutes"] for day in days}
+    daily_minutes = [
+        {"date": date.strftime("%Y-%m-%d"), "minutes": minutes_by_date.get(date, 0)}
+        for date in (month_start + timedelta(days=offset) for offset in range(MONTH_DAYS))
+    ]
+
     # Calculate average study hours per session
     avg_study_hours = user.hours_studied / user.total_sessions if user.total_sessions > 0 else 0
 
@@ -51,6 +86,9 @@ def get_analytics(request):
         "total_hours_studied": user.hours_studied,
         "is_sharable": user.share_analytics,
         "average_study_hours": round(avg_study_hours, 2),
+        "weekly": study_window(days, week_start, today, rooms["weekly"]),
+        "monthly": study_window(days, month_start, today, rooms["monthly"]),
+        "daily_minutes": daily_minutes,
         "earned_badges": earned_badges
     })
 
@@ -0,0 +1,237 @@
+import json
+from functools import wraps
+from asgiref.sync import sync_to_async
+from channels.layers import get_channel_layer
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
+from ..models import List, StudySession, Task, User
+from .. import rooms
+from ..realtime import room_rosters, room_shards, room_snapshots
+from .groupStudyRoom import forget_room
+
+'''
+    Native async versions of the study room endpoints and the shared to-do list mutations.
+
+    The sync DRF views run in a worker thread under daphne and reach the channel
+    layer through async_to_sync, so every broadcast costs a thread hop and holds
+    a thread while it waits. These views run on the event loop: reads and single
+    row writes use the async ORM and task broadcasts are awaited directly. Membership
+    changes still run the transactional room service in one sync_to_async call,
+    as Django transactions cannot span async code, and are announced by the
+    notification outbox like those of the sync views.
+'''
+
+jwt_authentication = JWTAuthentication()
+
+async def bearer_user(request):
+    '''
+    Return the active user of the request's JWT access token, or None.
+    '''
+    header = jwt_authentication.get_header(request)
+    raw_token = jwt_authentication.get_raw_token(header) if header is not None else None
+    if raw_token is None:
+        return None
+    try:
+        token = jwt_authentication.get_validated_token(raw_token)
+        user = await User.objects.aget(**{api_settings.USER_ID_FIELD: token[api_settings.USER_ID_CLAIM]})
+    except (InvalidToken, TokenError, KeyError, User.DoesNotExist):
+        return None
+    return user if user.is_active else None
+
+def async_api_view(methods):
+    '''
+    Async counterpart of api_view with IsAuthenticated: only accepts the given
+    methods and requests carrying a valid access token, setting request.user.
+    '''
+    def decorator(view):
+        @csrf_exempt
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                return JsonResponse({"detail": f'Method "{request.method}" not allowed.'}, status=405)
+            user = await bearer_user(request)
+            if user is None:
+                return JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+            request.user = user
+            return await view(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+def request_data(request):
+    '''
+    Return the JSON or form data of the request body.
+    '''
+    if request.content_type == "application/json":
+        try:
+            return json.loads(request.body or b"{}")
+        except ValueError:
+            return {}
+    return request.POST
+
+async def announce_change(change):
+    '''
+    Update the cached participants of the changed rooms and forget the rooms left empty.
+    The rooms are notified by the outbox, where the room service recorded the change.
+    '''
+    for room_code, participants in change.participants.items():
+        room_rosters.set(room_code, participants)
+        await room_snapshots.ainvalidate(room_code)
+    for study_session in change.emptied:
+        forget_room(study_session.roomCode)
+
+
+@async_api_view(['POST'])
+async def create_room(request):
+    '''
+    Creates a new study room. Required Authentication.
+    '''
+    session_name = request_data(request).get('sessionName', "Untitled Study Session - maybe something went wrong?")
+    if session_name == "":
+        session_name = "We couldn't think of anything :)"
+
+    try:
+        change = await sync_to_async(rooms.create)(request.user, session_name)
+    except Exception as e:
+        return JsonResponse({"error": f"Failed to create room: {str(e)}"}, status=400)
+
+    await announce_change(change)
+    return JsonResponse({"roomCode": change.room.roomCode, "roomList": change.room.Task_id})
+
+
+@async_api_view(['POST'])
+async def join_room(request):
+    '''
+    Allows Users to join an existing study session. Required Authentication.
+    '''
+    try:
+        change = await sync_to_async(rooms.join)(request.user, request_data(request).get('roomCode'))
+    except StudySession.DoesNotExist:
+        return JsonResponse({"error": "Room not found"}, status=404)
+
+    await announce_change(change)
+    return JsonResponse({"message": "Joined successfully!"})
+
+
+@async_api_view(['POST'])
+async def leave_room(request):
+    '''
+    Leave a study session room. Required Authentication.
+    '''
+    try:
+        change = await sync_to_async(rooms.leave)(request.user, request_data(request).get('roomCode'))
+    except StudySession.DoesNotExist:
+        return JsonResponse({"error": "Room not found"}, status=404)
+
+    await announce_change(change)
+    if not change.had_session:
+        return JsonResponse({"error": "User is not in the session"}, status=404)
+    return JsonResponse({"message": "Left successfully!", "username": request.user.username})
+
+
+@async_api_view(['GET'])
+async def get_room_details(request):
+    '''
+    Retrieve details of a study session room, e.g. name and to-do list ID.
+    '''
+    try:
+        study_session = await StudySession.objects.only("sessionName", "Task").aget(
+            roomCode=request.GET.get('roomCode'))
+    except StudySession.DoesNotExist as e:
+        return JsonResponse({"error": f"Failed to retrieve room details: {str(e)}"}, status=400)
+    return JsonResponse({"sessionName": study_session.sessionName, "roomList": study_session.Task_id})
+
+
+async def shared_room_code(todo_list):
+    '''
+    Return the code of the room sharing the list, or None for a personal list.
+    '''
+    if not todo_list.is_shared:
+        return None
+    room_code = await StudySession.objects.filter(Task=todo_list).values_list("roomCode", flat=True).afirst()
+    if room_code is None:
+        raise StudySession.DoesNotExist
+    return room_code
+
+
+@async_api_view(['POST'])
+async def create_task(request):
+    '''
+    Create a new task and notify all participants if the list is shared
+    '''
+    data = request_data(request)
+    todo_list = await List.objects.filter(pk=data.get("list_id")).afirst()
+    if todo_list is None:
+        return JsonResponse({"error": "List doesn't exist"}, status=400)
+
+    try:
+        room_code = await shared_room_code(todo_list)
+    except StudySession.DoesNotExist:
+        return JsonResponse({"error": "No study session found for this list"}, status=400)
+
+    try:
+        task = await Task.objects.acreate(title=data.get("title"), content=data.get("content"), list=todo_list)
+    except Exception as e:
+        return JsonResponse({"error": "Invalid request", "details": str(e)}, status=400)
+    task_data = {
+        "id": task.pk,
+        "title": task.title,
+        "content": task.content,
+        "is_completed": task.is_completed,
+        "list_id": todo_list.pk,
+    }
+    if room_code is not None:
+        await room_shards.publish(get_channel_layer(), room_code, "add_task", task=task_data)
+        await room_snapshots.ainvalidate(room_code)
+
+    return JsonResponse({
+        "listId": todo_list.pk,
+        "id": task.pk,
+        "title": task.title,
+        "content": task.content,
+        "is_completed": task.is_completed,
+    })
+
+
+@async_api_view(['PATCH'])
+async def toggle_task(request, task_id):
+    '''
+    Toggle the completion status of a task and notify participants if the list is shared
+    '''
+    try:
+        task = await Task.objects.select_related("list").aget(pk=task_id)
+        room_code = await shared_room_code(task.list)
+    except Task.DoesNotExist:
+        return JsonResponse({"error": "Task not found"}, status=400)
+    except StudySession.DoesNotExist:
+        return JsonResponse({"error": "No study session found for this list"}, status=400)
+
+    await sync_to_async(task.toggle_completion)(request.user)
+    if room_code is not None:
+        await room_shards.publish(
+            get_channel_layer(), room_code, "toggle_task", task_id=task_id, is_completed=task.is_completed
+        )
+        await room_snapshots.ainvalidate(room_code)
+    return JsonResponse({"is_completed": task.is_completed})
+
+
+@async_api_view(['DELETE'])
+async def delete_task(request, task_id):
+    '''
+    Delete a specific task and notify participants if the list is shared.
+    '''
+    task = await Task.objects.select_related("list").filter(pk=task_id).afirst()
+    if task is None:
+        return JsonResponse({"error": "Task doesn't exist"}, status=400)
+    try:
+        room_code = await shared_room_code(task.list)
+    except StudySession.DoesNotExist:
+        return JsonResponse({"error": "No study session found for this list"}, status=400)
+
+    await task.adelete()
+    if room_code is not None:
+        await room_shards.publish(get_channel_layer(), room_code, "remove_task", task_id=task_id)
+        await room_snapshots.ainvalidate(room_code)
+    return JsonResponse({"data": task_id})
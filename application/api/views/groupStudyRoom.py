@@ -2,11 +2,9 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
-from ..models import SessionUser, User, Task
 from ..models.study_session import StudySession
-from .to_do_list import ViewToDoList
-from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
+from .. import rooms
+from ..realtime import room_rosters, room_snapshots, notification_outbox
 from unittest.mock import patch
 
 '''
@@ -30,40 +28,16 @@ def create_room(request):
     if session_name == "":
         session_name = "We couldn't think of anything :)"
 
-    # Ensures the user is not already in a session, if so removes them 
-    if SessionUser.objects.filter(user=user).exists():
-        
-        # Remove users from existing sessions
-        session_users = SessionUser.objects.filter(user=user)
-        for session_user in session_users:
-            previous_session = session_user.session
-            user = session_user.user
-            previous_session.participants.remove(user)
-            session_user.delete()
-                
     try:
-         
-        # Creates a new study session
-        room = StudySession.objects.create(createdBy = user,sessionName = session_name)
-        room.participants.add(user)
-        room.save()
-
-        # Create or update a SessionUser Instance
-        if SessionUser.objects.filter(user=user, session=room).exists():
-            session_user = SessionUser.objects.filter(user=user, session=room).first()
-            session_user.rejoin_session(user, room)
-        else:
-            session_user = SessionUser.objects.create(
-                user=user,
-                session=room,
-            )
-        # Update user's streak after creating a room
-        user.update_study_streak()
-
-        return Response({"roomCode" : room.roomCode,"roomList": room.Task.id})
+        # Creates the study session, moving the user out of any existing session
+        change = rooms.create(user, session_name)
     except Exception as e:
         return Response({"error": f"Failed to create room: {str(e)}"}, status=400)
 
+    announce_change(change)
+    room = change.room
+    return Response({"roomCode" : room.roomCode,"roomList": room.Task_id})
+
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
@@ -77,42 +51,16 @@ def join_room(request):
     if not user.is_authenticated:
         return Response({"error": "User must be logged in"}, status=401)
 
-    # Removes the user from all existing rooms
-    if SessionUser.objects.filter(user=user).exists():
-        session_users = SessionUser.objects.filter(user=user)
-        for session_user in session_users:
-            previous_session = session_user.session
-            user = session_user.user
-            previous_session.participants.remove(user)
-            session_user.delete()
-            print(" user removed from old session")
-
     room_code = request.data.get('roomCode')
-    if StudySession.objects.filter(roomCode=room_code).exists():
-        study_session = StudySession.objects.get(roomCode=room_code)
-        study_session.participants.add(user)
-        study_session.save()
-
-        # Notify all participants of the new join
-        participants = study_session.participants.all()
-        notify_participants(room_code, participants)
-
-        # Create or Update the Instance of SessionUser
-        if SessionUser.objects.filter(user=user, session=study_session).exists():
-            session_user = SessionUser.objects.filter(
-                user=user, session=study_session).first()
-            session_user.rejoin_session(user, study_session)
-        else:
-            session_user = SessionUser.objects.create(
-                user=user,
-                session=study_session,
-            )
-        
-        # Update user's streak after creating a room
-        user.update_study_streak()
-        
-        return Response({"message": "Joined successfully!"})
-    return Response({"error": "Room not found"}, status=404)
+    try:
+        # Moves the user into the room and out of all existing rooms
+        change = rooms.join(user, room_code)
+    except StudySession.DoesNotExist:
+        return Response({"error": "Room not found"}, status=404)
+
+    # Notify all participants of the new join
+    announce_change(change)
+    return Response({"message": "Joined successfully!"})
 
 
 @api_view(['GET'])
@@ -147,60 +95,52 @@ def leave_room(request):
         return Response({"error": "User must be logged in"}, status=401)
 
     room_code = request.data.get('roomCode')
-    if StudySession.objects.filter(roomCode=room_code).exists():
-        study_session = StudySession.objects.get(roomCode=room_code)
-        study_session.participants.remove(user)
-        study_session.save()
-
-        # Fetch Updated participants list
-        participants = study_session.participants.all()
-
-        # Notify all participants in the room of user leaving
-        notify_participants(room_code, participants)
-
-        try:
-            session_user = SessionUser.objects.get(user=user, session=study_session)
-            session_user.leave_session()
+    try:
+        change = rooms.leave(user, room_code)
+    except StudySession.DoesNotExist:
+        return Response({"error": "Room not found"}, status=404)
 
-            # Destroy room if no particpants remain inside
-            if (study_session.participants.count() == 0):
-                destroy_room(request, study_session)
+    # Notify all participants in the room of user leaving, the room is deleted later by reap_rooms if it stays empty
+    announce_change(change)
+    if not change.had_session:
+        return Response({"error": "User is not in the session"}, status=404)
+    return Response({"message": "Left successfully!", "username": user.username})
 
-            user1 = session_user.user
-            return Response({"message": "Left successfully!", "username": user.username})
-        except SessionUser.DoesNotExist:
-            return Response({"error": "User is not in the session"}, status=404)
-    return Response({"error": "Room not found"}, status=404)
+def announce_change(change):
+    '''
+    Update the cached participants of the rooms changed by a committed membership
+    change, and forget the realtime state of the rooms that were left empty.
+    The rooms themselves are notified by the outbox, where the change was recorded.
+    '''
+    for room_code, participants in change.participants.items():
+        room_rosters.set(room_code, participants)
+        room_snapshots.invalidate(room_code)
+    for study_session in change.emptied:
+        forget_room(study_session.roomCode)
 
-def notify_participants(room_code, participants):
+def notify_participants(room_code, participants, joined=(), left=()):
     '''
-    Update the participants in real time as someone joins the room, and leaves the room
+    Update the participants in real time as someone joins the room, and leaves the room.
+    `participants` are the usernames in the room after the change. The update is
+    sent by the outbox once the current transaction commits, and changes made to
+    the same room within the broadcast window are sent as one update.
     '''
-    channel_layer = get_channel_layer()
-    async_to_sync(channel_layer.group_send)(
-        f"room_{room_code}",
-        {
-            'type': 'participants_update',
-            'participants': [participant.username for participant in participants],
-        }
-    )
+    usernames = list(participants)
+    notification_outbox.announce_change(room_code, usernames, joined=joined, left=left)
+    room_rosters.set(room_code, usernames)
+    room_snapshots.invalidate(room_code)
 
 
 
-def destroy_room(request, study_session):
+def forget_room(room_code):
     '''
-    Destroy study session room and it's to-do-list if no participants remain
+    Drop this process's cached roster of a room left with no participants. Its event
+    log and timer are dropped by the worker owning the room, once the outbox sends
+    the room_forget recorded with the change.
+    The room and its to-do-list stay in the database until reap_rooms deletes them,
+    so leaving costs no more when the last participant leaves.
     '''
-    toDo = ViewToDoList()
-
-    # Delete the to-do-list within the room
-    Task = study_session.Task.pk
-    if hasattr(study_session, 'Task') and study_session.Task:
-    # if Task:
-        toDo.delete_list(request = request, list_id = Task)
-    
-    # Delete the Study Session 
-    study_session.delete()
+    room_rosters.discard(room_code)
 
 
 
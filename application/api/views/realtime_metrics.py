@@ -0,0 +1,20 @@
+import hmac
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from ..realtime import room_metrics
+
+def realtime_metrics(request):
+    '''
+    Expose the study room websocket metrics of this process in the Prometheus
+    text format. Scrapers authenticate with the ROOM_METRICS_TOKEN bearer token;
+    without a token configured the endpoint is only served in DEBUG mode.
+    '''
+    token = getattr(settings, "ROOM_METRICS_TOKEN", None)
+    if token:
+        authorization = request.headers.get("Authorization", "")
+        if not hmac.compare_digest(authorization.encode(), f"Bearer {token}".encode()):
+            return HttpResponseForbidden()
+    elif not settings.DEBUG:
+        return HttpResponseForbidden()
+
+    return HttpResponse(room_metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,33 @@
+import time
+from django.utils.http import parse_etags
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from ..realtime import room_snapshots
+
+'''
+    API returning everything the group study page needs about a room in one request,
+    cached per room and revalidated with ETags
+'''
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_room_snapshot(request):
+    '''
+    Retrieve the name, to-do list, participants, tasks and timer of a study room.
+    Answers 304 Not Modified when the If-None-Match header has the room's current ETag.
+    The room is read from the cache, but the JWT authentication still loads the user
+    from the database, so even a 304 makes one query.
+    '''
+    room_code = request.query_params.get('roomCode')
+    cached = room_snapshots.get(room_code) if room_code else None
+    if cached is None:
+        return Response({"error": "Room not found"}, status=404)
+
+    etag, snapshot = cached
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if_none_match = parse_etags(request.headers.get("If-None-Match", ""))
+    if etag in if_none_match or "*" in if_none_match:
+        return Response(status=304, headers=headers)
+    # The server time lets clients count down to the timer's deadline with their own clock
+    return Response({**snapshot, "server_time": time.time()}, headers=headers)
@@ -6,9 +6,9 @@ from rest_framework.response import Response
 from rest_framework import status
 from django.views import View
 from rest_framework.permissions import IsAuthenticated
-from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
+from django.db import transaction
 from api.models import StudySession
+from api.realtime import notification_outbox, room_snapshots
 
 class ViewToDoList(APIView):
     '''
@@ -34,25 +34,17 @@ class ViewToDoList(APIView):
                 is_shared=False
                 )
 
-        # Format the response data
-        response_data = []
-        for todo_list in user_lists:
-            tasks = Task.objects.filter(list=todo_list)
-            response_data.append({
-                "id": todo_list.pk,
-                "name": todo_list.name,
-                "is_shared": todo_list.is_shared,
-                "tasks": [
-                    {
-                        "id": task.pk,
-                        "title": task.title,
-                        "content": task.content,
-                        "is_completed": task.is_completed,
-                        "creation_date": task.creation_date
-                    }
-                    for task in tasks
-                ]
-            })
+        # Format the response data, reading the lists and then the tasks of all of them in one query each
+        response_data = list(user_lists.order_by("pk").values("id", "name", "is_shared"))
+        tasks_by_list = {}
+        for todo_list in response_data:
+            todo_list["tasks"] = tasks_by_list[todo_list["id"]] = []
+
+        tasks = Task.objects.filter(list_id__in=list(tasks_by_list)).order_by("pk").values(
+            "id", "list_id", "title", "content", "is_completed", "creation_date"
+        )
+        for task in tasks:
+            tasks_by_list[task.pop("list_id")].append(task)
         return Response(response_data, status=status.HTTP_200_OK)
 
     def post(self, request):
@@ -95,15 +87,13 @@ class ViewToDoList(APIView):
                     except StudySession.DoesNotExist:
                         return Response({"error": "No study session found for this list"}, status=status.HTTP_400_BAD_REQUEST)
 
-                    channel_layer = get_channel_layer()
-                    async_to_sync(channel_layer.group_send)(
-                        f"room_{room_code}",
-                        {
-                            "type": "remove_task",
-                            "task_id": task_id,
-                        }
-                    )
-                Task.objects.get(pk=task_id).delete()
+                # The notification is sent by the outbox once the delete has committed
+                with transaction.atomic():
+                    Task.objects.get(pk=task_id).delete()
+                    if task.list.is_shared:
+                        notification_outbox.publish(room_code, "remove_task", task_id=task_id)
+                if task.list.is_shared:
+                    room_snapshots.invalidate(room_code)
                 return Response({"data": task_id}, status=status.HTTP_200_OK)
             else:
                 return Response({"error": "Task doesn't exist"}, status=status.HTTP_400_BAD_REQUEST)           
@@ -137,34 +127,32 @@ class ViewToDoList(APIView):
 
             if List.objects.filter(pk=list_id).exists():
                 list_obj = List.objects.get(pk=list_id)
-                task = Task.objects.create(
-                    title=title, content=content, list=list_obj
-                )
-                task.save()
 
-                # Send WebSocket update if the list is shared
-                if task.list.is_shared:
+                # Find the room of a shared list before writing anything
+                if list_obj.is_shared:
                     try:
-                        study_session = StudySession.objects.get(Task=list_obj)  
+                        study_session = StudySession.objects.get(Task=list_obj)
                         room_code = study_session.roomCode  # Get the correct room code
                     except StudySession.DoesNotExist:
                         return Response({"error": "No study session found for this list"}, status=status.HTTP_400_BAD_REQUEST)
 
-                    # Now send WebSocket message using room_code
-                    channel_layer = get_channel_layer() 
-                    async_to_sync(channel_layer.group_send)(
-                        f"room_{room_code}",
-                        {
-                            "type": "add_task",
-                            "task": {
-                                "id": task.pk,
-                                "title": task.title,
-                                "content": task.content,
-                                "is_completed": task.is_completed,
-                                "list_id": task.list.pk,
-                            },
-                        }
+                with transaction.atomic():
+                    task = Task.objects.create(
+                        title=title, content=content, list=list_obj
                     )
+                    task.save()
+
+                    # Send WebSocket update if the list is shared, through the outbox once the task has committed
+                    if task.list.is_shared:
+                        notification_outbox.publish(room_code, "add_task", task={
+                            "id": task.pk,
+                            "title": task.title,
+                            "content": task.content,
+                            "is_completed": task.is_completed,
+                            "list_id": task.list.pk,
+                        })
+                if task.list.is_shared:
+                    room_snapshots.invalidate(room_code)
                 response_data = {
                     "listId": task.list.pk,
                     "id": task.pk,
@@ -212,12 +200,9 @@ class ViewToDoList(APIView):
         '''
         try:
             # This line throws DoesNotExist if not found
-            task = Task.objects.get(pk=task_id)
-            new_task_status = not task.is_completed
-            task.is_completed = new_task_status
-            task.save()
+            task = Task.objects.select_related("list").get(pk=task_id)
 
-            # Sends WebSocket Update
+            # Find the room of a shared list before writing anything
             if task.list.is_shared:
                 try:
                     study_session = StudySession.objects.get(Task=task.list)
@@ -225,15 +210,16 @@ class ViewToDoList(APIView):
                 except StudySession.DoesNotExist:
                     return Response({"error": "No study session found for this list"}, status=status.HTTP_400_BAD_REQUEST)
 
-                channel_layer = get_channel_layer()
-                async_to_sync(channel_layer.group_send)(
-                    f"room_{room_code}",
-                    {
-                        "type": "toggle_task",
-                        "task_id": task_id,
-                        "is_completed": task.is_completed,
-                    }
-                )
+            with transaction.atomic():
+                task.toggle_completion(request.user)
+
+                # Sends WebSocket Update, through the outbox once the change has committed
+                if task.list.is_shared:
+                    notification_outbox.publish(
+                        room_code, "toggle_task", task_id=task_id, is_completed=task.is_completed
+                    )
+            if task.list.is_shared:
+                room_snapshots.invalidate(room_code)
 
             return Response({"is_completed": task.is_completed}, status=status.HTTP_200_OK)
         except Task.DoesNotExist:  # Catch the specific exception
@@ -1,17 +1,31 @@
 import os
+import sys
 from django.core.asgi import get_asgi_application
-from channels.routing import ProtocolTypeRouter, URLRouter
-from api.routing import websocket_urlpatterns
 
 # Set default Django settings module
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
+# Initialise Django before importing anything that uses the models
+django_asgi_app = get_asgi_application()
+
+from channels.routing import ProtocolTypeRouter, URLRouter
+from channels.layers import get_channel_layer
+from api.realtime import JWTAuthMiddleware, OutboxMiddleware, ShardListenerMiddleware, shard_listener
+from api.routing import websocket_urlpatterns
+
 # ASGI application router that handles both HTTP and WebSocket protocols
-application = ProtocolTypeRouter({
+application = ShardListenerMiddleware(ProtocolTypeRouter({
 
-    # Standard HTTP requests -> Django ASGI application
-    "http": get_asgi_application(),
+    # Standard HTTP requests -> Django ASGI application, whose event loop
+    # sends the notifications the views record in the outbox
+    "http": OutboxMiddleware(django_asgi_app),
     
-    # WebSocket connections -> Custom URL routing from api/routing.py
-    "websocket": URLRouter(websocket_urlpatterns),
-})
\ No newline at end of file
+    # WebSocket connections -> Custom URL routing from api/routing.py,
+    # authenticated with the SimpleJWT access token given in the handshake
+    "websocket": JWTAuthMiddleware(URLRouter(websocket_urlpatterns)),
+}))
+
+# daphne sends no lifespan events, so serve the rooms this worker owns as soon as its reactor runs
+if "daphne.server" in sys.modules:
+    from twisted.internet import reactor
+    reactor.callLater(0, shard_listener.ensure_started, get_channel_layer())
@@ -0,0 +1,90 @@
+"""
+Channel layer configuration for the study room websockets.
+
+The in-memory layer keeps groups inside a single daphne process, so it only
+works while we run one worker. The Redis layers share groups between workers,
+which lets notify_participants (or any group_send) reach sockets held by
+another process and the websocket tier be scaled horizontally.
+
+Supported backends:
+    memory        channels.layers.InMemoryChannelLayer (default, single process)
+    redis         channels_redis.core.RedisChannelLayer
+    redis-pubsub  channels_redis.pubsub.RedisPubSubChannelLayer
+    fakeredis     RedisChannelLayer against an in-process Redis stand-in, for tests
+"""
+
+from django.core.exceptions import ImproperlyConfigured
+
+# Shared by every fakeredis layer in the process, so they behave like workers on one Redis
+_fake_server = None
+
+
+def fake_redis_hosts():
+    """Connection settings for an in-process, Redis-compatible server (fakeredis)."""
+    global _fake_server
+    import fakeredis
+    from fakeredis.aioredis import FakeConnection
+
+    if _fake_server is None:
+        _fake_server = fakeredis.FakeServer()
+    return [{"connection_class": FakeConnection, "server": _fake_server}]
+
+
+def build_channel_layers(backend, redis_url=None, hosts=None, max_connections=50,
+                         capacity=200, expiry=30, group_expiry=43200, prefix="studyroom"):
+    """
+    Build the CHANNEL_LAYERS setting.
+
+    max_connections  size of the Redis connection pool per worker and event loop
+    capacity         messages buffered per channel before new ones are dropped
+    expiry           seconds an undelivered message is kept
+    group_expiry     seconds a socket stays in a room group without being re-added;
+                     must be longer than the longest study session
+    """
+    if backend == "memory":
+        return {
+            "default": {
+                "BACKEND": "channels.layers.InMemoryChannelLayer",
+                "CONFIG": {
+                    "capacity": capacity,
+                    "expiry": expiry,
+                    "group_expiry": group_expiry,
+                },
+            }
+        }
+
+    if backend == "fakeredis":
+        backend = "redis"
+        hosts = hosts or fake_redis_hosts()
+
+    if hosts is None:
+        if not redis_url:
+            raise ImproperlyConfigured(f"REDIS_URL must be set to use the '{backend}' channel layer.")
+        hosts = [{"address": redis_url, "max_connections": max_connections}]
+
+    if backend == "redis":
+        return {
+            "default": {
+                "BACKEND": "channels_redis.core.RedisChannelLayer",
+                "CONFIG": {
+                    "hosts": hosts,
+                    "prefix": prefix,
+                    "capacity": capacity,
+                    "expiry": expiry,
+                    "group_expiry": group_expiry,
+                },
+            }
+        }
+
+    if backend == "redis-pubsub":
+        return {
+            "default": {
+                "BACKEND": "channels_redis.pubsub.RedisPubSubChannelLayer",
+                "CONFIG": {
+                    "hosts": hosts,
+                    "prefix": prefix,
+                },
+            }
+        }
+
+    raise ImproperlyConfigured(f"Unknown channel layer backend '{backend}'.")
@@ -1,6 +1,7 @@
 import os
 from pathlib import Path
 from datetime import timedelta
+from .channel_layers import build_channel_layers
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -70,13 +71,52 @@ REST_FRAMEWORK = {
 }
 
 ASGI_APPLICATION = "backend.asgi.application"
-CHANNEL_LAYERS = {
-        "default": {
-            "BACKEND": "channels.layers.InMemoryChannelLayer", # when we deploy change to redis?
-            # "BACKEND": "channels_redis.core.RedisChannelLayer", ?
-        }
+
+# Channel layer: "memory" only works with a single daphne process, use "redis" (with REDIS_URL)
+# to share room groups between workers. See backend/channel_layers.py for the other backends.
+CHANNEL_LAYER = os.environ.get("CHANNEL_LAYER", "memory")
+REDIS_URL = os.environ.get("REDIS_URL")
+CHANNEL_LAYERS = build_channel_layers(
+    CHANNEL_LAYER,
+    redis_url=REDIS_URL,
+    max_connections=int(os.environ.get("REDIS_MAX_CONNECTIONS", 50)),  # Connection pool size per worker
+    capacity=int(os.environ.get("CHANNEL_LAYER_CAPACITY", 200)),  # Messages buffered per socket
+    expiry=int(os.environ.get("CHANNEL_LAYER_EXPIRY", 30)),  # Seconds before undelivered messages are dropped
+    group_expiry=int(os.environ.get("CHANNEL_LAYER_GROUP_EXPIRY", 43200)),  # Seconds a socket stays in a room group
+)
+
+# Cache holding room snapshots, shared between workers through Redis when REDIS_URL is set
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": REDIS_URL,
+    } if REDIS_URL else {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
 }
 
+# Study room websockets
+ROOM_BROADCAST_WINDOW = 0.03  # Seconds over which participants broadcasts for a room are coalesced
+ROOM_PARTICIPANTS_DELTAS = False  # Broadcast who joined/left instead of the full participants list
+ROOM_TYPING_INTERVAL = 1.0  # Minimum seconds between relayed typing events from the same sender
+ROOM_TYPING_EXPIRY = 3.0  # Seconds without typing before a typing_stopped event is sent
+ROOM_EVENT_LOG_SIZE = 256  # Recent events per room kept for replaying to reconnecting sockets
+ROOM_TOKEN_CACHE_SIZE = 10000  # Validated websocket access tokens kept until they expire
+ROOM_OUTBOUND_QUEUE_SIZE = 512  # Frames waiting to be written to one socket, kept above ROOM_EVENT_LOG_SIZE for replays
+ROOM_OUTBOUND_MAX_LAG = 10.0  # Seconds a frame may wait for a slow socket before the client is disconnected
+ROOM_PRESENCE_TTL = 60  # Seconds without a heartbeat before reap_participants removes a user from their room
+ROOM_REAPER_BATCH_SIZE = 200  # Stale sessions closed, or empty rooms deleted, per transaction by the reapers
+ROOM_EMPTY_GRACE = 300  # Seconds a room stays empty before reap_rooms deletes it
+ROOM_SHARD_WORKERS = [name for name in os.environ.get("ROOM_SHARD_WORKERS", "").split(",") if name]  # Workers rooms are hashed onto, empty to disable room affinity
+ROOM_SHARD_WORKER = os.environ.get("ROOM_SHARD_WORKER")  # Name of this worker in ROOM_SHARD_WORKERS
+ROOM_RESUME_TIMEOUT = 5  # Seconds a socket waits for the worker owning its room to replay missed events before it is disconnected
+ROOM_SNAPSHOT_TTL = 300  # Seconds a cached room snapshot is kept, even if the room is never changed
+ROOM_CODE_BLOCK_SIZE = 1000  # Room codes a process reserves from the shared sequence at once
+ROOM_OUTBOX_BATCH_SIZE = 100  # Outbox events claimed and sent to the rooms per batch
+ROOM_OUTBOX_CLAIM_TIMEOUT = 60  # Seconds before outbox events claimed by a dispatcher that never sent them are claimed again
+ROOM_OUTBOX_RETRY_DELAY = 5  # Seconds the dispatcher waits before retrying outbox events that failed to send
+ROOM_METRICS_TOKEN = os.environ.get("ROOM_METRICS_TOKEN")  # Bearer token for scraping /api/realtime-metrics/, only served in DEBUG without one
+
 ROOT_URLCONF = 'backend.urls'
 
 CORS_ALLOW_CREDENTIALS = True
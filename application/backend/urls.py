@@ -10,6 +10,9 @@ from api.views.analytics import get_analytics, update_analytics
 from api.views.groupStudyRoom import create_room, join_room
 from api.views.calendar import EventViewSet
 from api.views.shared_materials_view import get_current_session
+from api.views.realtime_metrics import realtime_metrics
+from api.views import async_rooms
+from api.views.room_snapshot import get_room_snapshot
 
 # Event ViewSet endpoints configuration
 from api.views.spotify_view import AuthURL, spotify_callback, IsAuthenticated
@@ -46,6 +49,19 @@ urlpatterns = [
     path('api/get-room-details/', get_room_details),
     path('api/get-participants/', get_participants),
     path('api/leave-room/', leave_room),
+    path('api/room-snapshot/', get_room_snapshot, name='room_snapshot'),
+
+    # Async study room and shared to-do list endpoints, served on the event loop
+    path('api/async/create-room/', async_rooms.create_room, name='async_create_room'),
+    path('api/async/join-room/', async_rooms.join_room, name='async_join_room'),
+    path('api/async/get-room-details/', async_rooms.get_room_details, name='async_get_room_details'),
+    path('api/async/leave-room/', async_rooms.leave_room, name='async_leave_room'),
+    path('api/async/new_task/', async_rooms.create_task, name='async_create_new_task'),
+    path('api/async/update_task/<int:task_id>/', async_rooms.toggle_task, name='async_update_task_status'),
+    path('api/async/delete_task/<int:task_id>/', async_rooms.delete_task, name='async_delete_task'),
+
+    # Study room websocket metrics, scraped by Prometheus
+    path('api/realtime-metrics/', realtime_metrics, name='realtime_metrics'),
 
     #todo list endpoint
     path('api/todolists/', views.ViewToDoList.as_view(), name='to_do_list'),
@@ -74,6 +74,9 @@ function ChatBox({ socket, roomCode }) {
         setTimeout(() => {
           setTypingUser("");
         }, 3000);
+      // Server tells us once the user has stopped typing
+      } else if (data.type === "typing_stopped") {
+        setTypingUser((current) => (current === data.sender ? "" : current));
       }
     };
 
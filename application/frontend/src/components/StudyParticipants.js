@@ -36,7 +36,7 @@ function StudyParticipants({ socket, roomCode }) {
     const handleWebSocketMessage = async (event) => {
       try {
         const data = JSON.parse(event.data);
-        if (data.type === "participants_update") {
+        if (data.type === "participants_update" || data.type === "room_snapshot") {
           const updatedParticipants = await Promise.all(
             data.participants.map(async (username) => {
               const imageUrl = await fetchParticipantData(username);
@@ -44,6 +44,22 @@ function StudyParticipants({ socket, roomCode }) {
             })
           );
           setParticipants(updatedParticipants);
+        } else if (data.type === "participants_delta") {
+          // Only the users who joined or left are sent, apply them to the current list
+          const joinedParticipants = await Promise.all(
+            data.joined.map(async (username) => {
+              const imageUrl = await fetchParticipantData(username);
+              return { username, imageUrl };
+            })
+          );
+          setParticipants((prev) => [
+            ...prev.filter(
+              (participant) =>
+                !data.left.includes(participant.username) &&
+                !data.joined.includes(participant.username)
+            ),
+            ...joinedParticipants,
+          ]);
         }
       } catch (error) {
         console.error("WebSocket message handling error:", error);
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import 'tailwindcss';
 import '@fontsource/vt323';
 import '@fontsource/press-start-2p';
@@ -7,19 +7,19 @@ import '../styles/StudyTimer.css'; // Import the CSS file
 import { ToastContainer, toast } from "react-toastify";
 import "react-toastify/dist/ReactToastify.css";
 
-// Study Timer in the Group Study Room
-const StudyTimer = ({ roomId, isHost, onClose, "data-testid": dataTestId }) => {
+// Study Timer in the Group Study Room. The timer runs on the server and is
+// shared by everyone in the room: this component sends the room's timer
+// commands over the socket and counts down to the deadlines it broadcasts.
+const StudyTimer = ({ roomId, isHost, onClose, socket, "data-testid": dataTestId }) => {
   // State variables for timer settings
   const [studyLength, setStudyLength] = useState(25); // Study duration - deafault 25 mins
   const [breakLength, setBreakLength] = useState(5);
   const [rounds, setRounds] = useState(4);  // Total no. of rounds of study+break
-  const [currentRound, setCurrentRound] = useState(1);
-  const [isBreak, setIsBreak] = useState(false);
-  const [timeLeft, setTimeLeft] = useState(studyLength * 60); // Time left in seconds
-  const [isRunning, setIsRunning] = useState(false);  // Whether timer is running or not
-  const [currentPage, setCurrentPage] = useState('welcome');
+  const [timer, setTimer] = useState(null); // The room timer's last timer_update
+  const timerRef = useRef(null);
+  const [clockOffset, setClockOffset] = useState(0); // Seconds the server's clock is ahead of ours
+  const [now, setNow] = useState(Date.now());
   const [isMinimized, setIsMinimized] = useState(false);  // If timer is minimised or not
-  const [isPaused, setIsPaused] = useState(false);
   const [playSound, setPlaySound] = useState(true); //Play sound on timer completion
   const [studyTime, setStudyTime] = useState({ hours: 0, minutes: 25, seconds: 0 });  // Study time input
   const [breakTime, setBreakTime] = useState({ hours: 0, minutes: 5, seconds: 0 });
@@ -28,6 +28,19 @@ const StudyTimer = ({ roomId, isHost, onClose, "data-testid": dataTestId }) => {
   // Sound effect for timer completion
   const completionSound = new Audio('https://www.soundjay.com/misc/sounds/bell-ringing-05.mp3');
 
+  // Derived from the room timer's phase
+  const phase = timer ? timer.phase : 'idle';
+  const isRunning = phase === 'study' || phase === 'break';
+  const isBreak = phase === 'break';
+  const isPaused = isRunning && timer.remaining !== null && timer.remaining !== undefined;
+  const currentPage = phase === 'completed' ? 'completed' : isRunning ? 'timer' : 'welcome';
+  const currentRound = timer && timer.round ? timer.round : 1;
+  // Whole milliseconds to the deadline on our clock, so the seconds shown do not flicker on rounding
+  const millisecondsLeft = isRunning && !isPaused ? Math.round((timer.deadline - clockOffset) * 1000 - now) : 0;
+  const timeLeft = !isRunning ? 0 : isPaused
+    ? Math.ceil(timer.remaining)
+    : Math.max(0, Math.ceil(millisecondsLeft / 1000));
+
   // On component mount, load the saved settings from localStorage
   useEffect(() => {
     const savedStudyLength = localStorage.getItem('studyLength');
@@ -39,6 +52,45 @@ const StudyTimer = ({ roomId, isHost, onClose, "data-testid": dataTestId }) => {
     if (savedRounds) setRounds(parseInt(savedRounds));
   }, []);
 
+  // Follow the room timer's updates, sent on every command and phase change and on joining
+  useEffect(() => {
+    if (!socket) return;
+
+    const handleMessage = (event) => {
+      const data = JSON.parse(event.data);
+      if (data.type !== 'timer_update') return;
+
+      setClockOffset(data.server_time - Date.now() / 1000);
+      setNow(Date.now());
+      // Ring when a running phase reached its deadline, not when someone pressed a button
+      const previous = timerRef.current;
+      if (playSound && previous && previous.deadline && data.server_time >= previous.deadline) {
+        completionSound.play();
+      }
+      timerRef.current = data;
+      setTimer(data);
+    };
+
+    socket.addEventListener('message', handleMessage);
+    return () => socket.removeEventListener('message', handleMessage);
+  }, [socket, playSound]);
+
+  // Redraw the countdown while a phase is running; the deadline itself comes from the server
+  useEffect(() => {
+    let interval;
+    if (isRunning && !isPaused) {
+      interval = setInterval(() => setNow(Date.now()), 250);
+    }
+    return () => clearInterval(interval);
+  }, [isRunning, isPaused]);
+
+  // Send a command for the room's timer
+  const sendTimer = (action, settings = {}) => {
+    if (socket && socket.readyState === WebSocket.OPEN) {
+      socket.send(JSON.stringify({ type: 'timer', action, ...settings }));
+    }
+  };
+
   // Save settings to localStorage
   const saveSettings = () => {
     localStorage.setItem('studyLength', studyLength);
@@ -63,7 +115,7 @@ const StudyTimer = ({ roomId, isHost, onClose, "data-testid": dataTestId }) => {
     return true;
   };
 
-  // Start the timer if all valid
+  // Start the room's timer if all valid
   const startTimer = () => {
     if (!validateTimeInput(studyTime, 'study') || !validateTimeInput(breakTime, 'break')) {
       return;
@@ -87,58 +139,18 @@ const StudyTimer = ({ roomId, isHost, onClose, "data-testid": dataTestId }) => {
       breakTime.seconds
     );
 
-    // Set timer state
-    setTimeLeft(totalStudySeconds);
     setStudyLength(totalStudySeconds);
     setBreakLength(totalBreakSeconds);
-    setCurrentRound(1);
-    setIsBreak(false);
-    setIsRunning(true);
-    setCurrentPage('timer');
-    
+    sendTimer('start', {
+      study_length: totalStudySeconds,
+      break_length: totalBreakSeconds,
+      rounds: rounds,
+    });
+
     // Save settings
     saveSettings();
   };
 
-  useEffect(() => {
-    let interval;
-    if (isRunning && !isPaused) {
-      interval = setInterval(() => {
-        setTimeLeft((prevTime) => {
-          if (prevTime <= 1) {
-            clearInterval(interval);
-            if (playSound) {
-              completionSound.play();
-            }
-
-            // When timer is completed
-            if (!isBreak) {
-              if (currentRound >= rounds) {
-                setCurrentPage('completed');
-                setIsRunning(false);
-                return 0;
-              }
-              setIsBreak(true);
-              // Special case: If break length is 0, immediately go to next round
-              if (breakLength === 0) {
-                setCurrentRound(prev => prev + 1);
-                setIsBreak(false);
-                return studyLength;
-              }
-              return breakLength;
-            } else {
-              setCurrentRound(prev => prev + 1);
-              setIsBreak(false);
-              return studyLength;
-            }
-          }
-          return prevTime - 1;
-        });
-      }, 1000);
-    }
-    return () => clearInterval(interval);
-  }, [isRunning, isPaused, isBreak, currentRound, rounds, breakLength, studyLength, playSound]);
-
   const formatTime = (seconds) => {
     const hours = Math.floor(seconds / 3600);
     const minutes = Math.floor((seconds % 3600) / 60);
@@ -152,32 +164,17 @@ const StudyTimer = ({ roomId, isHost, onClose, "data-testid": dataTestId }) => {
 
   // Toggle pause/resume
   const toggleTimer = () => {
-    setIsPaused(!isPaused);
+    sendTimer(isPaused ? 'resume' : 'pause');
   };
 
-  // Reset the timer
+  // Restart the timer from its first round
   const resetTimer = () => {
-    const totalStudySeconds = (
-      studyTime.hours * 3600 +
-      studyTime.minutes * 60 +
-      studyTime.seconds
-    );
-
-    setTimeLeft(totalStudySeconds);
-    setCurrentRound(1);
-    setIsBreak(false);
-    setIsRunning(true);
-    setIsPaused(false);
+    sendTimer('reset');
   };
 
-  // Handle back button click
+  // Handle back button click: stop the room's timer
   const handleBack = () => {
-    setIsRunning(false);
-    setIsPaused(false);
-    setTimeLeft(studyLength * 60);
-    setCurrentRound(1);
-    setIsBreak(false);
-    setCurrentPage('welcome');
+    sendTimer('stop');
   };
 
   const clearError = () => {
@@ -242,13 +239,7 @@ const StudyTimer = ({ roomId, isHost, onClose, "data-testid": dataTestId }) => {
                 padding: "0 10px 20px 10px"
               }}>
                 <button
-                  onClick={() => {
-                    setCurrentPage('welcome');
-                    setCurrentRound(1);
-                    setIsBreak(false);
-                    setTimeLeft(studyLength);
-                    setIsRunning(false);
-                  }}
+                  onClick={() => sendTimer('stop')}
                   className="w-full text-white rounded-lg"
                   style={{
                     backgroundColor: '#d1cbed',
@@ -558,7 +549,7 @@ const StudyTimer = ({ roomId, isHost, onClose, "data-testid": dataTestId }) => {
                     display: 'block',
                     paddingTop: '5px'
                   }}>
-                    Round {currentRound}/{rounds}
+                    Round {currentRound}/{timer.rounds}
                   </span>
                 </div>
 
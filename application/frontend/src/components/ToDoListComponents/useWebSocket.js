@@ -1,22 +1,13 @@
 import { useEffect } from 'react';
 
-// Custom hook for managing WebSocket connections and handling real-time updates in to-do list
+// Custom hook for handling real-time updates of the to-do list received on the room WebSocket
 const useWebSocket = (isShared, socket, listId, setLists, roomCode) => {
     useEffect(() => {
-        if (!isShared) return;
-
-        const wsSocket = new WebSocket(`ws://localhost:8000/ws/todolist/${roomCode}/`);
-
-        wsSocket.onopen = () => {
-            console.log("WebSocket connected");
-        };
-
-        wsSocket.close = () => {
-            console.log("Disconnected from WebSocket");
-        };
+        // Task events arrive on the room's socket, so no second connection is opened
+        if (!isShared || !socket) return;
 
         // Handle incoming messages from the WebSocket server
-        wsSocket.onmessage = (event) => {
+        const handleMessage = (event) => {
             const data = JSON.parse(event.data);
 
             // Update the lists based on the received data
@@ -24,6 +15,11 @@ const useWebSocket = (isShared, socket, listId, setLists, roomCode) => {
                 return prevLists.map(list => {
                     if (list.id !== listId) return list;
 
+                    // Sent on reconnect when the missed task events can no longer be replayed
+                    if (data.type === "room_snapshot" && data.list_id === list.id) {
+                        return { ...list, tasks: data.tasks };
+                    }
+
                     if (data.type === "remove_task") {
                         return {
                             ...list,
@@ -54,11 +50,13 @@ const useWebSocket = (isShared, socket, listId, setLists, roomCode) => {
             });
         };
 
-        // Cleanup function to close the WebSocket connection when the component unmounts or when dependencies change
+        socket.addEventListener("message", handleMessage);
+
+        // Cleanup function to stop listening when the component unmounts or when dependencies change
         return () => {
-            wsSocket.close();
+            socket.removeEventListener("message", handleMessage);
         };
-    }, [isShared, roomCode, listId, setLists]);
+    }, [isShared, socket, roomCode, listId, setLists]);
 
     // Return the WebSocket socket object for further use if needed
     return socket;
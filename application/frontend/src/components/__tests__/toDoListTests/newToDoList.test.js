@@ -142,6 +142,8 @@ describe('ToDoList Component', () => {
 
         const mockSocket = {
             readyState: WebSocket.OPEN, 
+            addEventListener: jest.fn(),
+            removeEventListener: jest.fn(),
             send: jest.fn((message) => {
                 console.log('WebSocket message sent:', message);
             }),
@@ -282,6 +284,8 @@ describe('ToDoList Component', () => {
         
         const mockSocket = {
             readyState: WebSocket.OPEN, 
+            addEventListener: jest.fn(),
+            removeEventListener: jest.fn(),
             send: jest.fn((message) => {
                 console.log('WebSocket message sent:', message); 
             }),
@@ -344,6 +348,8 @@ describe('ToDoList Component', () => {
         
         const mockSocket = {
             readyState: WebSocket.CLOSED,
+            addEventListener: jest.fn(),
+            removeEventListener: jest.fn(),
             send: jest.fn(),
         };
 
@@ -365,6 +371,8 @@ describe('ToDoList Component', () => {
     test('WebSocket message is correctly formatted when deleting a task', async () => {
         const mockSocket = {
             readyState: WebSocket.OPEN, 
+            addEventListener: jest.fn(),
+            removeEventListener: jest.fn(),
             send: jest.fn(),
         };
 
@@ -460,6 +468,8 @@ describe('ToDoList Component', () => {
     test('does not send WebSocket message when socket is not open in shared mode', async () => {
         const mockSocket = {
             readyState: WebSocket.CLOSED, 
+            addEventListener: jest.fn(),
+            removeEventListener: jest.fn(),
             send: jest.fn(),
         };
 
@@ -484,6 +494,8 @@ describe('ToDoList Component', () => {
         
         const mockSocket = {
             readyState: WebSocket.OPEN, 
+            addEventListener: jest.fn(),
+            removeEventListener: jest.fn(),
             send: jest.fn((message) => {
                 console.log('WebSocket message sent:', message); 
             }),
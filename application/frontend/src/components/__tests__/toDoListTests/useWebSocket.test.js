@@ -2,22 +2,25 @@ import { renderHook, act } from "@testing-library/react";
 import useWebSocket from "../../ToDoListComponents/useWebSocket";
 
 
-global.WebSocket = jest.fn().mockImplementation(() => {
-    const instance = {
-        onopen: jest.fn(),
-        onmessage: jest.fn(),
-        onclose: jest.fn(() => {
-            console.log("WebSocket onclose called");
+global.WebSocket = jest.fn();
+
+// Mock of the room socket passed down from the group study page
+const createMockSocket = () => {
+    const listeners = {};
+    return {
+        addEventListener: jest.fn((type, listener) => {
+            listeners[type] = listener;
         }),
-        close: jest.fn().mockImplementation(function () {
-            console.log("WebSocket close called");
-            if (typeof this.onclose === 'function') {
-                this.onclose(); 
+        removeEventListener: jest.fn((type, listener) => {
+            if (listeners[type] === listener) {
+                delete listeners[type];
             }
         }),
+        onmessage(event) {
+            listeners.message(event);
+        },
     };
-    return instance;
-});
+};
 
 describe("useWebSocket Hook", () => {
     let mockSetLists;
@@ -28,37 +31,35 @@ describe("useWebSocket Hook", () => {
         jest.clearAllMocks(); 
         jest.spyOn(console, 'log').mockImplementation(() => { }); 
         mockSetLists = jest.fn();
-        mockSocket = {}; 
+        mockSocket = createMockSocket(); 
     });
       
-    // Test case to verify that WebSocket is not connected when 'isShared' is false
-    test("does not connect WebSocket if isShared is false", () => {
+    // Test case to verify that the socket is not listened to when 'isShared' is false
+    test("does not listen to the socket if isShared is false", () => {
         act(() => {
             renderHook(() => useWebSocket(false, mockSocket, 1, mockSetLists, "room123"));
         });
-         expect(global.WebSocket).not.toHaveBeenCalled();
+        expect(mockSocket.addEventListener).not.toHaveBeenCalled();
     });
      
-    // Test case to verify WebSocket connection when 'isShared' is true
-    test("connects WebSocket when isShared is true", () => {
+    // Test case to verify the room socket is reused instead of opening a second connection
+    test("listens to the room socket when isShared is true", () => {
         act(() => {
             renderHook(() => useWebSocket(true, mockSocket, 1, mockSetLists, "room123"));
         });
-         expect(global.WebSocket).toHaveBeenCalledWith("ws://localhost:8000/ws/todolist/room123/");
+        expect(mockSocket.addEventListener).toHaveBeenCalledWith("message", expect.any(Function));
+        expect(global.WebSocket).not.toHaveBeenCalled();
     });
 
-    // Test case to verify logging when WebSocket connection is successfully opened
-    test("logs WebSocket connection when opened", () => {
-         const consoleLogSpy = jest.spyOn(console, 'log').mockImplementation(() => { });
-         act(() => {
-            renderHook(() => useWebSocket(true, {}, 1, jest.fn(), "room123"));
-        });
-         const wsInstance = global.WebSocket.mock.instances[0];
-         act(() => {
-            wsInstance.onopen();
+    // Test case to verify the listener is removed when the component unmounts
+    test("stops listening when unmounted", () => {
+        let hook;
+        act(() => {
+            hook = renderHook(() => useWebSocket(true, mockSocket, 1, mockSetLists, "room123"));
         });
-         expect(consoleLogSpy).toHaveBeenCalledWith("WebSocket connected");
-         consoleLogSpy.mockRestore();
+        const listener = mockSocket.addEventListener.mock.calls[0][1];
+        hook.unmount();
+        expect(mockSocket.removeEventListener).toHaveBeenCalledWith("message", listener);
     });
 
     // Test case to verify that WebSocket messages are properly handled
@@ -68,7 +69,7 @@ describe("useWebSocket Hook", () => {
         act(() => {
             renderHook(() => useWebSocket(true, mockSocket, 1, mockSetLists, "room123"));
         });
-         const wsInstance = global.WebSocket.mock.instances[0];
+         const wsInstance = mockSocket;
          act(() => {
             wsInstance.onmessage(mockMessage);
         });
@@ -105,10 +106,10 @@ describe("useWebSocket Hook", () => {
         };
 
         act(() => {
-            renderHook(() => useWebSocket(true, {}, 1, mockSetLists, "room123"));
+            renderHook(() => useWebSocket(true, mockSocket, 1, mockSetLists, "room123"));
         });
 
-        const wsInstance = global.WebSocket.mock.instances[0];
+        const wsInstance = mockSocket;
         act(() => {
             wsInstance.onmessage(mockMessage);
         });
@@ -161,9 +162,9 @@ describe("useWebSocket Hook", () => {
             }),
         };
         act(() => {
-            renderHook(() => useWebSocket(true, {}, 1, mockSetLists, "room123"));
+            renderHook(() => useWebSocket(true, mockSocket, 1, mockSetLists, "room123"));
         });
-        const wsInstance = global.WebSocket.mock.instances[0];
+        const wsInstance = mockSocket;
         act(() => {
             wsInstance.onmessage(mockMessage);
         });
@@ -213,9 +214,9 @@ describe("useWebSocket Hook", () => {
             }),
         };
         act(() => {
-            renderHook(() => useWebSocket(true, {}, 1, mockSetLists, "room123"));
+            renderHook(() => useWebSocket(true, mockSocket, 1, mockSetLists, "room123"));
         });
-        const wsInstance = global.WebSocket.mock.instances[0];
+        const wsInstance = mockSocket;
         act(() => {
             wsInstance.onmessage(mockMessage);
         });
@@ -266,9 +267,9 @@ describe("useWebSocket Hook", () => {
             }),
         };
         act(() => {
-            renderHook(() => useWebSocket(true, {}, 1, mockSetLists, "room123"));
+            renderHook(() => useWebSocket(true, mockSocket, 1, mockSetLists, "room123"));
         });
-        const wsInstance = global.WebSocket.mock.instances[0];
+        const wsInstance = mockSocket;
         act(() => {
             wsInstance.onmessage(mockMessage);
         });
@@ -304,9 +305,9 @@ describe("useWebSocket Hook", () => {
             }),
         };
         act(() => {
-            renderHook(() => useWebSocket(true, {}, 1, mockSetLists, "room123"));
+            renderHook(() => useWebSocket(true, mockSocket, 1, mockSetLists, "room123"));
         });
-        const wsInstance = global.WebSocket.mock.instances[0];
+        const wsInstance = mockSocket;
         act(() => {
             wsInstance.onmessage(mockMessage);
         });
@@ -4,7 +4,7 @@ import MotivationalMessage from "./Motivation";
 import ToDoList from "../components/ToDoListComponents/newToDoList";
 import StudyTimer from "../components/StudyTimer.js";
 import StudyParticipants from "../components/StudyParticipants.js";
-import { getAuthenticatedRequest } from "../utils/authService";
+import { getAuthenticatedRequest, getAccessToken } from "../utils/authService";
 import { useParams, useLocation, useNavigate } from "react-router-dom";
 import { ToastContainer, toast } from "react-toastify";
 import "../styles/ChatBox.css";
@@ -69,6 +69,12 @@ function GroupStudyPage() {
   // Determines whether or not to auto-reconnect user to websocket server
   const [shouldReconnect, setShouldReconnect] = useState(true);
 
+  // Milliseconds between heartbeats sent on the room socket
+  const HEARTBEAT_INTERVAL = 20000;
+
+  // Sequence number of the last room event received, so a reconnect only replays missed events
+  const lastSeqRef = useRef("");
+
   // Created initial websocket connection and saves it as socket
   useEffect(() => {
     // Ensure room code is given
@@ -103,18 +109,37 @@ function GroupStudyPage() {
       return; // Reuse the existing connection
     }
 
-    const ws = new WebSocket(`ws://localhost:8000/ws/room/${finalRoomCode}/`);
+    // The server authenticates the socket with the user's access token
+    const token = getAccessToken();
+    const auth = token ? `&token=${encodeURIComponent(token)}` : "";
+    const ws = new WebSocket(
+      `ws://localhost:8000/ws/room/${finalRoomCode}/?since=${lastSeqRef.current}${auth}`
+    );
+
+    ws.addEventListener("message", (event) => {
+      const data = JSON.parse(event.data);
+      if (typeof data.seq === "number") {
+        lastSeqRef.current = data.seq;
+      }
+    });
+
+    // Heartbeats keep the user in the room, the server removes users it has not heard from in a minute
+    let heartbeat = null;
 
     //Logs when connection is established
     ws.onopen = () => {
       console.log("Connected to Websocket");
       setSocket(ws);
       console.log("socket", ws);
+      heartbeat = setInterval(() => {
+        ws.send(JSON.stringify({ type: "heartbeat" }));
+      }, HEARTBEAT_INTERVAL);
     };
 
     //Logs when the connection is closed
     ws.onclose = () => {
       console.log("Disconnected from WebSocket");
+      clearInterval(heartbeat);
       if (shouldReconnect) {
         console.log("Reconnecting");
         setTimeout(connectWebSocket, 1000); // Attempt to reconnect after 1 seconds
@@ -188,6 +213,7 @@ function GroupStudyPage() {
           <StudyTimer
             roomId={finalRoomCode}
             isHost={true}
+            socket={socket}
             onClose={() => console.log("Timer closed")}
             data-testid="studyTimer-container"
           />
@@ -130,6 +130,7 @@ global.WebSocket = jest.fn(() => ({
   onopen: jest.fn(),
   onclose: jest.fn(),
   close: jest.fn(),
+  addEventListener: jest.fn(),
 }));
 
 // Mock assets if needed
@@ -158,7 +159,8 @@ describe("GroupStudyPage", () => {
     mockSocket = {
         onopen: jest.fn(),
         onclose: jest.fn(),
-        close: jest.fn()
+        close: jest.fn(),
+        addEventListener: jest.fn()
     };
     originalUseState = React.useState;
     global.WebSocket.mockImplementation(() => mockSocket);
@@ -233,7 +235,7 @@ describe("GroupStudyPage", () => {
     });
 
     expect(global.WebSocket).toHaveBeenCalledWith(
-      "ws://localhost:8000/ws/room/TEST123/"
+      "ws://localhost:8000/ws/room/TEST123/?since="
     );
   });
 
@@ -368,7 +370,8 @@ describe("GroupStudyPage", () => {
     const mockSocket = {
       onopen: jest.fn(),
       onclose: jest.fn(),
-      close: jest.fn()
+      close: jest.fn(),
+      addEventListener: jest.fn()
     };
     global.WebSocket.mockImplementation(() => mockSocket);
 
@@ -401,7 +404,8 @@ describe("GroupStudyPage", () => {
     const mockSocket = {
       onopen: jest.fn(),
       onclose: jest.fn(),
-      close: jest.fn()
+      close: jest.fn(),
+      addEventListener: jest.fn()
     };
     global.WebSocket.mockImplementation(() => mockSocket);
 